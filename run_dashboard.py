@@ -1,50 +1,199 @@
+import argparse
+import hashlib
 import http.server
-import socketserver
 import os
 import sys
+import time
 
-# サーバーの設定
+# サーバーの設定（--port / --bind で変更可能）
 PORT = 8000
+BIND = ""
+# keep-alive 接続が無通信のまま残る秒数
+KEEP_ALIVE_TIMEOUT = 30
 # プロジェクトのルートディレクトリを取得
 ROOT_DIR = os.path.dirname(os.path.abspath(__file__))
 os.chdir(ROOT_DIR)
 
+sys.path.insert(0, os.path.join(ROOT_DIR, 'scripts'))
+from precompress_data import is_fresh
+
+# 事前圧縮ファイル（scripts/precompress_data.py で作成）。優先度の高い順
+PRECOMPRESSED = (('br', '.br'), ('gzip', '.gz'))
+# パス -> ((mtime, サイズ), ETag)。内容が変わらない限りハッシュを再計算しない
+ETAG_CACHE = {}
+
+
+def file_etag(path, st):
+    """ファイル内容のハッシュから強い ETag を作る"""
+    stamp = (st.st_mtime_ns, st.st_size)
+    cached = ETAG_CACHE.get(path)
+    if cached and cached[0] == stamp:
+        return cached[1]
+    digest = hashlib.sha256()
+    with open(path, 'rb') as f:
+        for chunk in iter(lambda: f.read(1 << 20), b''):
+            digest.update(chunk)
+    etag = f'"{digest.hexdigest()[:32]}"'
+    ETAG_CACHE[path] = (stamp, etag)
+    return etag
+
+
+def accepted_encodings(header):
+    """Accept-Encoding から q=0 以外のエンコーディング名を取り出す"""
+    encodings = set()
+    for part in (header or '').split(','):
+        name, _, params = part.partition(';')
+        name = name.strip().lower()
+        q = 1.0
+        for param in params.split(';'):
+            key, _, value = param.strip().partition('=')
+            if key == 'q':
+                try:
+                    q = float(value)
+                except ValueError:
+                    q = 0.0
+        if name and q > 0:
+            encodings.add(name)
+    return encodings
+
+
+def etag_matches(header, etag):
+    if not header:
+        return False
+    if header.strip() == '*':
+        return True
+    # If-None-Match は弱い比較（W/ を無視する）
+    return any(tag.strip().removeprefix('W/') == etag for tag in header.split(','))
+
+
 class MyHandler(http.server.SimpleHTTPRequestHandler):
+    # HTTP/1.1 で keep-alive を有効にする（画像・JSONの並列取得で接続を使い回す）
+    protocol_version = 'HTTP/1.1'
+    timeout = KEEP_ALIVE_TIMEOUT
+
     def do_GET(self):
         if self.path == '/' or self.path == '':
             self.send_response(301)
             self.send_header('Location', '/web/index.html')
+            self.send_header('Content-Length', '0')
             self.end_headers()
             return
         super().do_GET()
 
+    def parse_request(self):
+        # リクエスト行を読み終えた時点から計測する（keep-alive の待ち時間は含めない）
+        self._request_start = time.perf_counter()
+        self._status = None
+        return super().parse_request()
+
+    def handle_one_request(self):
+        # parse_request より前に send_error される場合（414・400）も計測できるようにしておく
+        self._request_start = time.perf_counter()
+        self._status = None
+        super().handle_one_request()
+        if self._status is not None:
+            elapsed = (time.perf_counter() - self._request_start) * 1000
+            print(f"[{time.strftime('%H:%M:%S')}] {self.command or '-'} {getattr(self, 'path', '-')} {self._status} "
+                  f"{elapsed:.1f}ms", flush=True)
+
+    def log_request(self, code='-', size='-'):
+        # 標準のアクセスログの代わりに、応答完了後に処理時間付きで1行出力する
+        self._status = int(code) if isinstance(code, int) else code
+
+    def copyfile(self, source, outputfile):
+        # 静的ファイルは sendfile でカーネルから直接送る（未対応の環境では通常の送信）
+        try:
+            self.connection.sendfile(source)
+        except (AttributeError, OSError, ValueError):
+            super().copyfile(source, outputfile)
+
+    def send_head(self):
+        """
+        通常ファイルは ETag 付きで返し、If-None-Match が一致すれば 304 を返す。
+        新しい事前圧縮ファイルがあれば Accept-Encoding に応じてそちらを返す。
+        """
+        path = self.translate_path(self.path)
+        if not os.path.isfile(path) or self.path.split('?', 1)[0].endswith('/'):
+            return super().send_head()
+
+        serve_path, encoding = path, None
+        has_variants = any(os.path.exists(path + suffix) for _, suffix in PRECOMPRESSED)
+        if has_variants:
+            accepted = accepted_encodings(self.headers.get('Accept-Encoding'))
+            for name, suffix in PRECOMPRESSED:
+                if name in accepted and is_fresh(path, path + suffix):
+                    serve_path, encoding = path + suffix, name
+                    break
+
+        try:
+            f = open(serve_path, 'rb')
+        except OSError:
+            self.send_error(404, "File not found")
+            return None
+
+        try:
+            st = os.fstat(f.fileno())
+            etag = file_etag(serve_path, st)
+            if etag_matches(self.headers.get('If-None-Match'), etag):
+                f.close()
+                self.send_response(304)
+                self.send_header('ETag', etag)
+                if has_variants:
+                    self.send_header('Vary', 'Accept-Encoding')
+                self.end_headers()
+                return None
+
+            self.send_response(200)
+            self.send_header('Content-type', self.guess_type(path))
+            if encoding:
+                self.send_header('Content-Encoding', encoding)
+            if has_variants:
+                self.send_header('Vary', 'Accept-Encoding')
+            self.send_header('Content-Length', str(st.st_size))
+            self.send_header('Last-Modified', self.date_time_string(st.st_mtime))
+            self.send_header('ETag', etag)
+            self.end_headers()
+            return f
+        except Exception:
+            f.close()
+            raise
+
     def end_headers(self):
-        # リクエストパスをログに出力（標準の datetime を使用）
-        from datetime import datetime
-        print(f"[{datetime.now().strftime('%H:%M:%S')}] GET: {self.path}")
-        # キャッシュを無効化するヘッダーを追加
-        self.send_header('Cache-Control', 'no-store, no-cache, must-revalidate, max-age=0')
-        self.send_header('Pragma', 'no-cache')
-        self.send_header('Expires', '0')
+        # キャッシュは残しつつ、毎回 ETag で更新の有無を確認させる
+        self.send_header('Cache-Control', 'no-cache')
         # CORSを許可
         self.send_header('Access-Control-Allow-Origin', '*')
         super().end_headers()
 
-# サーバーの起動
-print("--- 鰹相場ダッシュボード 起動スクリプト ---")
-try:
-    with socketserver.TCPServer(("", PORT), MyHandler) as httpd:
-        print(f"\n[1] サーバーが正常に起動しました（ポート: {PORT}）")
-        print("\n[2] 以下のURLをコピーしてブラウザ（Chromeなど）のアドレスバーに貼り付けてください:")
-        print(f"    http://localhost:{PORT}/web/index.html")
-        print("\n[3] 終了するには、この画面で Ctrl + C を押してください。")
-        httpd.serve_forever()
-except OSError as e:
-    if e.errno == 98 or e.errno == 10048:
-        print(f"\n[エラー] ポート {PORT} が既に使用されています。")
-        print("他のPowerShell画面でサーバーを既に起動している可能性があります。")
-        print("一度すべての画面を閉じるか、Ctrl + C で終了してから再度お試しください。")
-    else:
-        print(f"\n[エラー] 起動に失敗しました: {e}")
-except Exception as e:
-    print(f"\n[予期しないエラー] {e}")
+def main():
+    parser = argparse.ArgumentParser(description='鰹相場ダッシュボードのローカルサーバー')
+    parser.add_argument('--port', type=int, default=PORT, help=f'待ち受けポート（既定: {PORT}）')
+    parser.add_argument('--bind', default=BIND, help='待ち受けアドレス（既定: すべてのアドレス）')
+    args = parser.parse_args()
+    port = args.port
+
+    # サーバーの起動
+    print("--- 鰹相場ダッシュボード 起動スクリプト ---")
+    try:
+        # 1リクエストごとにスレッドを立てるので、遅いクライアントが他の利用者を待たせない
+        with http.server.ThreadingHTTPServer((args.bind, port), MyHandler) as httpd:
+            print(f"\n[1] サーバーが正常に起動しました（ポート: {port}）")
+            print("\n[2] 以下のURLをコピーしてブラウザ（Chromeなど）のアドレスバーに貼り付けてください:")
+            print(f"    http://localhost:{port}/web/index.html")
+            print("\n[3] 終了するには、この画面で Ctrl + C を押してください。")
+            httpd.serve_forever()
+    except KeyboardInterrupt:
+        print("\nサーバーを終了しました。")
+    except OSError as e:
+        if e.errno == 98 or e.errno == 10048:
+            print(f"\n[エラー] ポート {port} が既に使用されています。")
+            print("他のPowerShell画面でサーバーを既に起動している可能性があります。")
+            print("一度すべての画面を閉じるか、Ctrl + C で終了してから再度お試しください。")
+        else:
+            print(f"\n[エラー] 起動に失敗しました: {e}")
+    except Exception as e:
+        print(f"\n[予期しないエラー] {e}")
+
+
+if __name__ == "__main__":
+    main()
@@ -1,10 +1,13 @@
 import json
 import os
+import sys
 from datetime import datetime
 
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), 'scripts'))
+from bid_store import upsert_bids
+
 # ファイルパス
 MARKET_DATA_PATH = r"c:\Users\yabuk\OneDrive\デスクトップ\Antigravity（鰹相場グラフ）\data\katsuo_market_data.json"
-BID_SCHEDULE_PATH = r"c:\Users\yabuk\OneDrive\デスクトップ\Antigravity（鰹相場グラフ）\data\bid_schedule.json"
 
 def load_json(path):
     with open(path, 'r', encoding='utf-8') as f:
@@ -76,8 +79,6 @@ def update_market_data():
     print("Market data updated successfully.")
 
 def update_bid_schedule():
-    data = load_json(BID_SCHEDULE_PATH)
-    
     # 新規エントリの作成
     new_entry = {
         "id": "20260427_wakabamaru7",
@@ -106,23 +107,12 @@ def update_bid_schedule():
         "total_volume": 900.0
     }
     
-    # 既存の is_latest を False に
-    for entry in data:
-        entry["is_latest"] = False
-        
-    # 重複チェック (IDで)
-    if not any(e["id"] == new_entry["id"] for e in data):
-        data.insert(0, new_entry)
+    # 変更のあった入札予定の分割ファイルだけを書き直す（bid_schedule.json は次のビルドで書き出される）
+    added, _ = upsert_bids([new_entry], latest_id=new_entry["id"])
+    if added:
         print(f"Added Bid Schedule for {new_entry['vessel_name']} on {new_entry['bid_date']}")
     else:
-        # すでにある場合は is_latest だけ更新
-        for e in data:
-            if e["id"] == new_entry["id"]:
-                e["is_latest"] = True
-                break
         print(f"Bid Schedule for {new_entry['id']} already exists, updated is_latest.")
-
-    save_json(BID_SCHEDULE_PATH, data)
     print("Bid schedule updated successfully.")
 
 if __name__ == "__main__":
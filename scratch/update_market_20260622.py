@@ -1,11 +1,12 @@
 import csv
-import json
+import sys
 from pathlib import Path
 import subprocess
 
 ROOT = Path(__file__).resolve().parents[1]
+sys.path.insert(0, str(ROOT / "scripts"))
+from bid_store import upsert_bids
 MARKET_CSV = ROOT / "data" / "market_input.csv"
-BID_SCHEDULE = ROOT / "data" / "bid_schedule.json"
 INDEX_HTML = ROOT / "web" / "index.html"
 
 DATE_YAMAKAWA = "2026-06-19"
@@ -66,13 +67,6 @@ def add_market_rows():
     return added
 
 def update_bid_schedule():
-    with BID_SCHEDULE.open("r", encoding="utf-8") as f:
-        schedules = json.load(f)
-
-    # Set is_latest = False for all existing
-    for entry in schedules:
-        entry["is_latest"] = False
-
     new_entries = [
         {
             "id": "20260624_genfukumaru18",
@@ -120,22 +114,8 @@ def update_bid_schedule():
         }
     ]
 
-    existing_ids = {entry.get("id") for entry in schedules}
-    added = 0
-    for entry in reversed(new_entries):
-        if entry["id"] not in existing_ids:
-            schedules.insert(0, entry)
-            added += 1
-        else:
-            # If exists, set is_latest = True
-            for e in schedules:
-                if e["id"] == entry["id"]:
-                    e["is_latest"] = True
-
-    with BID_SCHEDULE.open("w", encoding="utf-8") as f:
-        json.dump(schedules, f, ensure_ascii=False, indent=2)
-        f.write("\n")
-
+    # 変更のあった入札予定の分割ファイルだけを書き直す（bid_schedule.json は次のビルドで書き出される）
+    added, _ = upsert_bids(new_entries)
     return added
 
 def update_version():
@@ -1,11 +1,15 @@
 import csv
 import json
 import os
+import sys
 from pathlib import Path
 
 ROOT = Path(__file__).resolve().parents[1]
+sys.path.insert(0, str(ROOT / "scripts"))
+from bid_store import upsert_bids
+from market_repository import MarketRepository
+
 MARKET_CSV = ROOT / "data" / "market_input.csv"
-BID_SCHEDULE = ROOT / "data" / "bid_schedule.json"
 INDEX_HTML = ROOT / "web" / "index.html"
 MARKET_JSON = ROOT / "data" / "katsuo_market_data.json"
 
@@ -52,37 +56,11 @@ def add_market_rows():
         ["2026-07-13", "枕崎", "大キズ", "265.0", "0.0", "55岬洋丸"],
     ]
 
-    with MARKET_CSV.open("r", encoding="utf-8", newline="") as f:
-        rows = list(csv.reader(f))
-
-    header, data = rows[0], rows[1:]
-    existing = {tuple(row) for row in data}
-    added = 0
-    for row in new_rows:
-        key = tuple(row)
-        if key not in existing:
-            data.append(row)
-            existing.add(key)
-            added += 1
-
-    # Sort data by Date, Port, Size, Vessel
-    data.sort(key=lambda r: (r[0], r[1], r[2], r[5] if len(r) > 5 else ""))
-
-    with MARKET_CSV.open("w", encoding="utf-8", newline="") as f:
-        writer = csv.writer(f)
-        writer.writerow(header)
-        writer.writerows(data)
-
+    # 既存キーは残したまま、追加分だけソート済みの位置へマージする
+    added, _ = MarketRepository(str(MARKET_CSV)).upsert(new_rows, overwrite=False)
     return added
 
 def update_bid_schedule():
-    with BID_SCHEDULE.open("r", encoding="utf-8") as f:
-        schedules = json.load(f)
-
-    # Set is_latest = False for all existing
-    for entry in schedules:
-        entry["is_latest"] = False
-
     new_entries = [
         # 2026-07-13: 55岬洋丸 (枕崎)
         {
@@ -212,23 +190,8 @@ def update_bid_schedule():
         }
     ]
 
-    existing_ids = {entry.get("id") for entry in schedules}
-    added = 0
-    # Prepend newest entries in reverse chronological order so 20260713 is at index 0.
-    for entry in reversed(new_entries):
-        if entry["id"] not in existing_ids:
-            schedules.insert(0, entry)
-            added += 1
-        else:
-            # If it already exists, update properties just in case
-            for e in schedules:
-                if e["id"] == entry["id"]:
-                    e["is_latest"] = entry["is_latest"]
-
-    with BID_SCHEDULE.open("w", encoding="utf-8") as f:
-        json.dump(schedules, f, ensure_ascii=False, indent=2)
-        f.write("\n")
-
+    # 変更のあった入札予定の分割ファイルだけを書き直す（bid_schedule.json は次のビルドで書き出される）
+    added, _ = upsert_bids(new_entries)
     return added
 
 def update_version():
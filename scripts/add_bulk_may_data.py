@@ -1,37 +1,16 @@
 import sys
 import os
-import csv
 
 sys.path.insert(0, os.path.dirname(__file__))
 from update_data import add_market_data, add_bid_schedule, bump_version
+from market_repository import MarketRepository
 
 CSV_PATH = os.path.join(os.path.dirname(__file__), '..', 'data', 'market_input.csv')
+REPOSITORY = MarketRepository(CSV_PATH)
 
 def safe_append_csv(rows):
     """CSVに重複チェックしながら追加"""
-    existing = set()
-    all_rows = []
-    with open(CSV_PATH, 'r', encoding='utf-8') as f:
-        reader = csv.reader(f)
-        header = next(reader)
-        for row in reader:
-            key = (row[0], row[1], row[2], row[5] if len(row) > 5 else '')
-            existing.add(key)
-            all_rows.append(row)
-
-    added = 0
-    for row in rows:
-        key = (row[0], row[1], row[2], row[5] if len(row) > 5 else '')
-        if key not in existing:
-            all_rows.append(row)
-            existing.add(key)
-            added += 1
-
-    all_rows.sort(key=lambda x: x[0])
-    with open(CSV_PATH, 'w', encoding='utf-8', newline='') as f:
-        writer = csv.writer(f)
-        writer.writerow(header)
-        writer.writerows(all_rows)
+    added, _ = REPOSITORY.upsert(rows, overwrite=False)
     print(f"  CSV: {added} 件追加")
     return added
 
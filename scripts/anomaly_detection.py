@@ -0,0 +1,264 @@
+"""
+相場データの異常値検知（ビルド後に実行し、レポートを書き出すだけでビルドは止めない）
+
+    価格の外れ値   (港, サイズ) ごとに直前 WINDOW 件の価格の中央値・MAD から
+                   ロバストZスコア 0.6745 * (価格 - 中央値) / MAD を求め、|Z| > Z_THRESHOLD を検知
+    数量の急増     直前 WINDOW 件の数量の中央値の VOLUME_RATIO 倍を超える数量
+    他港との乖離   同じ日付・同じサイズの他港の価格の平均から CROSS_PORT_RATIO 以上離れた価格
+
+結果は data/anomaly_report.json に書き出す。
+直前 WINDOW 件の値と検知結果は data/anomaly_state.json に系列ごとに保存しておき、
+次回は系列の末尾に追加されたレコードだけを計算する（過去のレコードが変わった系列だけ全件を計算し直す）。
+
+    python scripts/anomaly_detection.py [--full]
+"""
+import argparse
+import hashlib
+import json
+import os
+import sys
+from datetime import datetime
+
+import numpy as np
+from numpy.lib.stride_tricks import sliding_window_view
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+MARKET_JSON = os.path.join(ROOT, 'data', 'katsuo_market_data.json')
+REPORT_PATH = os.path.join(ROOT, 'data', 'anomaly_report.json')
+STATE_PATH = os.path.join(ROOT, 'data', 'anomaly_state.json')
+STATE_VERSION = 1
+
+WINDOW = 8
+MIN_PERIODS = 4
+Z_THRESHOLD = 3.5
+# MAD が 0 に近い（直前の価格がほぼ同じ）系列で、1〜2%程度の値動きを外れ値にしない
+MIN_MAD = 1.0
+MIN_MAD_RATIO = 0.02
+VOLUME_RATIO = 5.0
+MIN_SPIKE_VOLUME = 50.0
+CROSS_PORT_RATIO = 0.25
+
+
+def rolling_flags(history, values, min_mad=MIN_MAD, min_mad_ratio=MIN_MAD_RATIO,
+                  window=WINDOW, min_periods=MIN_PERIODS):
+    """
+    history（直前の値）に続く values の各値について、直前 window 件の中央値・MAD を求める。
+    MAD は min_mad・中央値の min_mad_ratio 倍を下限とする。
+    戻り値は (中央値, MAD) の配列（直前の件数が min_periods 未満の位置は NaN）。
+    """
+    series = np.concatenate([np.full(window, np.nan), np.asarray(history, float), np.asarray(values, float)])
+    # 位置 i の窓は values[i] の直前 window 件
+    windows = sliding_window_view(series[:-1], window)[-len(values):] if len(values) else np.empty((0, window))
+    counts = np.sum(~np.isnan(windows), axis=1)
+    valid = counts >= min_periods
+    medians = np.full(len(values), np.nan)
+    mads = np.full(len(values), np.nan)
+    if valid.any():
+        medians[valid] = np.nanmedian(windows[valid], axis=1)
+        mads[valid] = np.maximum(
+            np.nanmedian(np.abs(windows[valid] - medians[valid][:, None]), axis=1),
+            np.maximum(min_mad, min_mad_ratio * np.abs(medians[valid])),
+        )
+    return medians, mads
+
+
+def detect_series(port, size, records, history_prices=(), history_volumes=()):
+    """records（日付順）の価格の外れ値・数量の急増を検知する"""
+    if not records:
+        return []
+    prices = np.array([record['price'] for record in records], float)
+    volumes = np.array([record.get('volume') or 0 for record in records], float)
+
+    price_median, price_mad = rolling_flags(history_prices, prices)
+    scores = 0.6745 * (prices - price_median) / price_mad
+    volume_median, _ = rolling_flags(history_volumes, volumes, min_mad=0.0, min_mad_ratio=0.0)
+    with np.errstate(divide='ignore', invalid='ignore'):
+        ratios = volumes / volume_median
+
+    anomalies = []
+    for i in np.flatnonzero(np.abs(np.nan_to_num(scores)) > Z_THRESHOLD):
+        anomalies.append(_anomaly('price_outlier', port, size, records[i], {
+            'median': round(float(price_median[i]), 2),
+            'mad': round(float(price_mad[i]), 2),
+            'score': round(float(scores[i]), 2),
+        }))
+    spikes = (volumes >= MIN_SPIKE_VOLUME) & (np.nan_to_num(ratios, posinf=np.inf) > VOLUME_RATIO)
+    for i in np.flatnonzero(spikes):
+        anomalies.append(_anomaly('volume_spike', port, size, records[i], {
+            'median_volume': round(float(volume_median[i]), 2),
+            'ratio': round(float(ratios[i]), 2) if np.isfinite(ratios[i]) else None,
+        }))
+    return anomalies
+
+
+def detect_cross_port(data, dates=None):
+    """
+    同じ日付・サイズの他港の平均価格から大きく離れた価格を検知する。
+    dates を渡した場合はその日付だけを調べる。
+    """
+    by_date_size = {}
+    for port, sizes in data.items():
+        for size, records in sizes.items():
+            for record in records:
+                if dates is None or record['date'] in dates:
+                    by_date_size.setdefault((record['date'], size), []).append((port, record))
+
+    anomalies = []
+    for (date, size), entries in sorted(by_date_size.items()):
+        if len(entries) < 2:
+            continue
+        prices = np.array([record['price'] for _, record in entries], float)
+        others = (prices.sum() - prices) / (len(prices) - 1)
+        deviations = (prices - others) / others
+        for i in np.flatnonzero(np.abs(deviations) > CROSS_PORT_RATIO):
+            port, record = entries[i]
+            anomalies.append(_anomaly('cross_port', port, size, record, {
+                'other_ports_mean': round(float(others[i]), 2),
+                'deviation': round(float(deviations[i]), 3),
+            }))
+    return anomalies
+
+
+def _anomaly(kind, port, size, record, detail):
+    anomaly = {
+        'type': kind,
+        'port': port,
+        'size': size,
+        'date': record['date'],
+        'price': record['price'],
+        'volume': record.get('volume'),
+    }
+    if record.get('vessel'):
+        anomaly['vessel'] = record['vessel']
+    anomaly.update(detail)
+    return anomaly
+
+
+def _records_hash(records):
+    payload = json.dumps(records, ensure_ascii=False, separators=(',', ':'), sort_keys=True)
+    return hashlib.sha256(payload.encode('utf-8')).hexdigest()
+
+
+def _load_state(path):
+    """(系列ごとの状態, 他港との比較結果) を返す"""
+    if not os.path.exists(path):
+        return {}, []
+    try:
+        with open(path, 'r', encoding='utf-8') as f:
+            state = json.load(f)
+    except (OSError, ValueError):
+        return {}, []
+    if state.get('version') != STATE_VERSION:
+        return {}, []
+    return state.get('series', {}), state.get('cross_port', [])
+
+
+def _write_json(path, data):
+    tmp_path = f"{path}.tmp"
+    with open(tmp_path, 'w', encoding='utf-8') as f:
+        json.dump(data, f, ensure_ascii=False, indent=2)
+    os.replace(tmp_path, path)
+
+
+def run_detection(data, report_path=REPORT_PATH, state_path=STATE_PATH, full=False):
+    """
+    data（港 -> サイズ -> 日付順レコード）を検知してレポートを書き出す。
+    戻り値はレポート（'anomalies' と件数・再計算した系列数など）。
+    """
+    old_state, old_cross = ({}, []) if full else _load_state(state_path)
+    state = {}
+    anomalies = []
+    new_dates = set()
+    recomputed = 0
+    appended = 0
+
+    for port, sizes in data.items():
+        for size, records in sizes.items():
+            key = f"{port}|{size}"
+            old = old_state.get(key)
+            count = old['count'] if old else 0
+            if old and len(records) >= count and _records_hash(records[:count]) == old['hash']:
+                # 追加されたレコードだけを、保存しておいた直前 WINDOW 件に続けて計算する
+                new_records = records[count:]
+                series_anomalies = old['anomalies'] + detect_series(
+                    port, size, new_records, old['prices'], old['volumes'])
+                appended += len(new_records)
+            else:
+                new_records = records
+                series_anomalies = detect_series(port, size, records)
+                recomputed += 1
+            new_dates.update(record['date'] for record in new_records)
+
+            tail = records[-WINDOW:]
+            state[key] = {
+                'count': len(records),
+                'hash': _records_hash(records),
+                'prices': [record['price'] for record in tail],
+                'volumes': [record.get('volume') or 0 for record in tail],
+                'anomalies': series_anomalies,
+            }
+            anomalies.extend(series_anomalies)
+
+    # 他港との比較は、前回の結果のうち今回調べ直さない日付のものを引き継ぐ
+    cross = [a for a in old_cross if a['date'] not in new_dates and _still_present(data, a)]
+    cross += detect_cross_port(data, new_dates)
+    anomalies.extend(cross)
+
+    anomalies.sort(key=lambda a: (a['date'], a['port'], a['size'], a['type']), reverse=True)
+    counts = {}
+    for anomaly in anomalies:
+        counts[anomaly['type']] = counts.get(anomaly['type'], 0) + 1
+    report = {
+        'generated_at': datetime.now().isoformat(timespec='seconds'),
+        'parameters': {
+            'window': WINDOW, 'min_periods': MIN_PERIODS, 'z_threshold': Z_THRESHOLD, 'min_mad_ratio': MIN_MAD_RATIO,
+            'volume_ratio': VOLUME_RATIO, 'cross_port_ratio': CROSS_PORT_RATIO,
+        },
+        'counts': counts,
+        'anomalies': anomalies,
+    }
+    _write_json(report_path, report)
+    _write_json(state_path, {'version': STATE_VERSION, 'series': state, 'cross_port': cross})
+    report['recomputed_series'] = recomputed
+    report['appended_records'] = appended
+    return report
+
+
+def _still_present(data, anomaly):
+    """前回の検知対象のレコードが（同じ価格で）まだあるか"""
+    records = data.get(anomaly['port'], {}).get(anomaly['size'], [])
+    return any(r['date'] == anomaly['date'] and r['price'] == anomaly['price'] for r in records)
+
+
+def check_market_data(data, **kwargs):
+    """
+    ビルドから呼ぶ入口。検知で例外が起きてもビルドは止めずに None を返す。
+    """
+    try:
+        report = run_detection(data, **kwargs)
+    except Exception as e:
+        print(f"Anomaly detection skipped: {e}")
+        return None
+    counts = ', '.join(f"{kind} {count}" for kind, count in sorted(report['counts'].items())) or 'none'
+    print(f"Anomaly report updated ({counts}; {report['recomputed_series']} series recomputed, "
+          f"{report['appended_records']} new records checked).")
+    return report
+
+
+def main():
+    parser = argparse.ArgumentParser(description='相場データの異常値を検知して data/anomaly_report.json に書き出す')
+    parser.add_argument('--full', action='store_true', help='保存済みの状態を使わずに全件を計算する')
+    args = parser.parse_args()
+
+    with open(MARKET_JSON, 'r', encoding='utf-8') as f:
+        data = json.load(f)
+    report = run_detection(data, full=args.full)
+    print(f"{len(report['anomalies'])} anomalies written to {REPORT_PATH}")
+    for anomaly in report['anomalies'][:20]:
+        detail = {k: v for k, v in anomaly.items() if k not in ('type', 'port', 'size', 'date')}
+        print(f"  {anomaly['date']} {anomaly['port']} {anomaly['size']} {anomaly['type']}: {detail}")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
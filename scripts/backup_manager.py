@@ -1,36 +1,428 @@
+"""
+data フォルダの重要ファイルのバックアップ（内容アドレス方式）
+
+    data/backups/objects/<ハッシュ先頭2文字>/<残り>   チャンク本体（zlib 圧縮）
+    data/backups/snapshots/<YYYYMMDD_HHMMSS>.json     スナップショットのマニフェスト
+
+ファイルは行単位の内容依存チャンク（行のハッシュで区切る）に分けて保存する。
+行の追加・修正があっても変わったチャンクだけが増え、同じ内容は1回しか保存されない。
+前回と全く同じ内容の場合はスナップショットを作らない。
+
+以前の形式（data/backups/<YYYYMMDD_HHMMSS>/ に丸ごとコピー）のフォルダもそのまま読める。
+
+    python scripts/backup_manager.py                       # バックアップを作成
+    python scripts/backup_manager.py list
+    python scripts/backup_manager.py diff 20260512_082248 20260518_153344
+    python scripts/backup_manager.py restore 20260518_153344 --dest /tmp/restore
+    python scripts/backup_manager.py prune --hourly 24 --daily 14 --weekly 8 --dry-run
+"""
+import argparse
+import hashlib
+import json
 import os
 import shutil
+import sys
+import zlib
 from datetime import datetime
 
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+BACKUP_ROOT = os.path.join(ROOT, 'data', 'backups')
+TARGET_FILES = [
+    os.path.join(ROOT, 'data', 'market_input.csv'),
+    os.path.join(ROOT, 'data', 'katsuo_market_data.json'),
+    os.path.join(ROOT, 'data', 'bid_schedule.json'),
+]
+TIMESTAMP_FORMAT = "%Y%m%d_%H%M%S"
+
+# チャンクの区切り: 行のハッシュの下位ビットが 0 の行の後（平均 CHUNK_DIVISOR 行ごと）。
+# 小さすぎ・大きすぎるチャンクを避けるため最小・最大サイズを設ける
+CHUNK_DIVISOR = 64
+MIN_CHUNK = 1024
+MAX_CHUNK = 64 * 1024
+
+# 既定の保持ルール（期間ごとに、直近 N 区間それぞれの最新スナップショットを残す）
+RETENTION = {'hourly': 24, 'daily': 14, 'weekly': 8}
+PERIOD_KEYS = {
+    'hourly': lambda t: t.strftime("%Y%m%d%H"),
+    'daily': lambda t: t.strftime("%Y%m%d"),
+    'weekly': lambda t: t.strftime("%G-W%V"),
+}
+
+
+def chunk_lines(data):
+    """バイト列を行単位の内容依存チャンクに分ける"""
+    chunks = []
+    start = 0
+    pos = 0
+    size = len(data)
+    while pos < size:
+        end = data.find(b'\n', pos)
+        end = size if end < 0 else end + 1
+        length = end - start
+        if length >= MAX_CHUNK or (
+            length >= MIN_CHUNK and zlib.crc32(data[pos:end]) % CHUNK_DIVISOR == 0
+        ):
+            chunks.append(data[start:end])
+            start = end
+        pos = end
+    if start < size:
+        chunks.append(data[start:])
+    return chunks
+
+
+class BackupStore:
+    def __init__(self, root=BACKUP_ROOT):
+        self.root = root
+        self.objects_dir = os.path.join(root, 'objects')
+        self.snapshots_dir = os.path.join(root, 'snapshots')
+
+    # --- チャンク ---
+
+    def _object_path(self, digest):
+        return os.path.join(self.objects_dir, digest[:2], digest[2:])
+
+    def put_chunk(self, chunk):
+        """チャンクを保存してハッシュを返す（既にあれば書かない）。新規に書いたかも返す"""
+        digest = hashlib.sha256(chunk).hexdigest()
+        path = self._object_path(digest)
+        if os.path.exists(path):
+            return digest, False
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        tmp_path = f"{path}.tmp"
+        with open(tmp_path, 'wb') as f:
+            f.write(zlib.compress(chunk, 9))
+        os.replace(tmp_path, path)
+        return digest, True
+
+    def get_chunk(self, digest):
+        with open(self._object_path(digest), 'rb') as f:
+            return zlib.decompress(f.read())
+
+    # --- スナップショット ---
+
+    def _manifest_path(self, snapshot_id):
+        return os.path.join(self.snapshots_dir, f"{snapshot_id}.json")
+
+    def store_ids(self):
+        """新形式スナップショットの ID を古い順に返す"""
+        if not os.path.isdir(self.snapshots_dir):
+            return []
+        return sorted(name[:-5] for name in os.listdir(self.snapshots_dir) if name.endswith('.json'))
+
+    def snapshot_ids(self):
+        """スナップショット ID（新形式・旧形式フォルダの両方）を古い順に返す"""
+        ids = set(self.store_ids())
+        if os.path.isdir(self.root):
+            ids.update(name for name in os.listdir(self.root) if self._is_legacy(name))
+        return sorted(ids)
+
+    def _is_legacy(self, snapshot_id):
+        path = os.path.join(self.root, snapshot_id)
+        if snapshot_id in ('objects', 'snapshots') or not os.path.isdir(path):
+            return False
+        try:
+            datetime.strptime(snapshot_id[:15], TIMESTAMP_FORMAT)
+        except ValueError:
+            return False
+        return True
+
+    def load_manifest(self, snapshot_id):
+        """
+        {'id', 'created_at', 'legacy', 'files': {ファイル名: {'size', 'sha256', 'chunks'}}} を返す。
+        旧形式のフォルダでは chunks の代わりに path を持つ。
+        """
+        path = self._manifest_path(snapshot_id)
+        if os.path.exists(path):
+            with open(path, 'r', encoding='utf-8') as f:
+                manifest = json.load(f)
+            manifest['legacy'] = False
+            return manifest
+
+        if not self._is_legacy(snapshot_id):
+            raise KeyError(f"Snapshot not found: {snapshot_id}")
+        folder = os.path.join(self.root, snapshot_id)
+        files = {}
+        for name in sorted(os.listdir(folder)):
+            file_path = os.path.join(folder, name)
+            if os.path.isfile(file_path):
+                with open(file_path, 'rb') as f:
+                    data = f.read()
+                files[name] = {
+                    'size': len(data),
+                    'sha256': hashlib.sha256(data).hexdigest(),
+                    'path': file_path,
+                }
+        created_at = datetime.strptime(snapshot_id[:15], TIMESTAMP_FORMAT).isoformat()
+        return {'id': snapshot_id, 'created_at': created_at, 'legacy': True, 'files': files}
+
+    def iter_snapshots(self):
+        """マニフェストを古い順に返す"""
+        for snapshot_id in self.snapshot_ids():
+            yield self.load_manifest(snapshot_id)
+
+    def read_file(self, snapshot_id, name, manifest=None):
+        """スナップショット内のファイルの内容（バイト列）を返す"""
+        manifest = manifest or self.load_manifest(snapshot_id)
+        entry = manifest['files'][name]
+        if 'path' in entry:
+            with open(entry['path'], 'rb') as f:
+                return f.read()
+        data = b''.join(self.get_chunk(digest) for digest in entry['chunks'])
+        if hashlib.sha256(data).hexdigest() != entry['sha256']:
+            raise ValueError(f"Checksum mismatch: {snapshot_id}/{name}")
+        return data
+
+    def create_snapshot(self, file_paths, now=None):
+        """
+        ファイルを取り込んでスナップショットを作る。
+        (スナップショットID, 新規チャンク数, 新規バイト数) を返す。
+        前回の新形式スナップショットと全く同じ内容なら作らずに前回の ID を返す。
+        """
+        now = now or datetime.now()
+        files = {}
+        new_chunks = 0
+        new_bytes = 0
+        for file_path in file_paths:
+            if not os.path.exists(file_path):
+                continue
+            with open(file_path, 'rb') as f:
+                data = f.read()
+            digests = []
+            for chunk in chunk_lines(data):
+                digest, created = self.put_chunk(chunk)
+                digests.append(digest)
+                if created:
+                    new_chunks += 1
+                    new_bytes += len(chunk)
+            files[os.path.basename(file_path)] = {
+                'size': len(data),
+                'sha256': hashlib.sha256(data).hexdigest(),
+                'chunks': digests,
+            }
+
+        latest = self.latest_manifest()
+        if latest is not None and latest['files'] == files:
+            return latest['id'], 0, 0
+
+        snapshot_id = now.strftime(TIMESTAMP_FORMAT)
+        suffix = 1
+        while os.path.exists(self._manifest_path(snapshot_id)) or self._is_legacy(snapshot_id):
+            suffix += 1
+            snapshot_id = f"{now.strftime(TIMESTAMP_FORMAT)}_{suffix}"
+        manifest = {
+            'id': snapshot_id,
+            'created_at': now.isoformat(timespec='seconds'),
+            'files': files,
+        }
+        os.makedirs(self.snapshots_dir, exist_ok=True)
+        path = self._manifest_path(snapshot_id)
+        tmp_path = f"{path}.tmp"
+        with open(tmp_path, 'w', encoding='utf-8') as f:
+            json.dump(manifest, f, ensure_ascii=False, indent=2)
+        os.replace(tmp_path, path)
+        return snapshot_id, new_chunks, new_bytes
+
+    def latest_manifest(self):
+        """最新の新形式スナップショット（無ければ None）"""
+        ids = self.store_ids()
+        return self.load_manifest(ids[-1]) if ids else None
+
+    # --- 復元・比較 ---
+
+    def restore(self, snapshot_id, dest_dir, names=None):
+        """スナップショットのファイルを dest_dir に書き出し、書き出したパスのリストを返す"""
+        manifest = self.load_manifest(snapshot_id)
+        os.makedirs(dest_dir, exist_ok=True)
+        restored = []
+        for name in names or sorted(manifest['files']):
+            if name not in manifest['files']:
+                print(f"Not in snapshot {snapshot_id}: {name}")
+                continue
+            data = self.read_file(snapshot_id, name, manifest)
+            path = os.path.join(dest_dir, name)
+            tmp_path = f"{path}.tmp"
+            with open(tmp_path, 'wb') as f:
+                f.write(data)
+            os.replace(tmp_path, path)
+            restored.append(path)
+        return restored
+
+    def diff(self, old_id, new_id):
+        """
+        2つのスナップショットのファイルごとの差分を返す:
+        {ファイル名: {'status': added/removed/changed/unchanged, 'old_size', 'new_size', 'shared_chunks', 'new_chunks'}}
+        """
+        old = self.load_manifest(old_id)['files']
+        new = self.load_manifest(new_id)['files']
+        result = {}
+        for name in sorted(set(old) | set(new)):
+            before, after = old.get(name), new.get(name)
+            if before is None:
+                status = 'added'
+            elif after is None:
+                status = 'removed'
+            elif before['sha256'] == after['sha256']:
+                status = 'unchanged'
+            else:
+                status = 'changed'
+            entry = {
+                'status': status,
+                'old_size': before['size'] if before else None,
+                'new_size': after['size'] if after else None,
+            }
+            if before and after and 'chunks' in before and 'chunks' in after:
+                old_chunks = set(before['chunks'])
+                entry['shared_chunks'] = sum(1 for d in after['chunks'] if d in old_chunks)
+                entry['new_chunks'] = len(after['chunks']) - entry['shared_chunks']
+            result[name] = entry
+        return result
+
+    # --- 保持ルール・掃除 ---
+
+    def select_retained(self, policy=RETENTION):
+        """保持ルールで残す新形式スナップショットの ID の集合（最新は常に残す）"""
+        ids = self.store_ids()[::-1]
+        keep = set(ids[:1])
+        for period, count in policy.items():
+            seen = set()
+            for snapshot_id in ids:
+                if len(seen) >= count:
+                    break
+                key = PERIOD_KEYS[period](datetime.strptime(snapshot_id[:15], TIMESTAMP_FORMAT))
+                if key not in seen:
+                    seen.add(key)
+                    keep.add(snapshot_id)
+        return keep
+
+    def prune(self, policy=RETENTION, dry_run=False):
+        """
+        保持ルールに入らない新形式スナップショットを削除し、どこからも参照されないチャンクを消す。
+        旧形式のフォルダは対象外。(削除したスナップショット ID, 削除したチャンク数) を返す。
+        """
+        keep = self.select_retained(policy)
+        removed = [snapshot_id for snapshot_id in self.store_ids() if snapshot_id not in keep]
+        if dry_run:
+            return removed, 0
+        for snapshot_id in removed:
+            os.remove(self._manifest_path(snapshot_id))
+        return removed, self.collect_garbage()
+
+    def collect_garbage(self):
+        referenced = set()
+        for snapshot_id in self.store_ids():
+            for entry in self.load_manifest(snapshot_id)['files'].values():
+                referenced.update(entry.get('chunks', []))
+        deleted = 0
+        if not os.path.isdir(self.objects_dir):
+            return deleted
+        for prefix in os.listdir(self.objects_dir):
+            prefix_dir = os.path.join(self.objects_dir, prefix)
+            for name in os.listdir(prefix_dir):
+                if prefix + name not in referenced:
+                    os.remove(os.path.join(prefix_dir, name))
+                    deleted += 1
+            if not os.listdir(prefix_dir):
+                os.rmdir(prefix_dir)
+        return deleted
+
+    def migrate_legacy(self, remove=False):
+        """
+        旧形式のフォルダを同じ ID の新形式スナップショットに取り込む。
+        remove=True の場合、復元結果が一致したフォルダを削除する。
+        """
+        migrated = []
+        for snapshot_id in self.snapshot_ids():
+            if not self._is_legacy(snapshot_id) or os.path.exists(self._manifest_path(snapshot_id)):
+                continue
+            legacy = self.load_manifest(snapshot_id)
+            files = {}
+            for name, entry in legacy['files'].items():
+                with open(entry['path'], 'rb') as f:
+                    data = f.read()
+                files[name] = {
+                    'size': entry['size'],
+                    'sha256': entry['sha256'],
+                    'chunks': [self.put_chunk(chunk)[0] for chunk in chunk_lines(data)],
+                }
+            manifest = {'id': snapshot_id, 'created_at': legacy['created_at'], 'files': files}
+            os.makedirs(self.snapshots_dir, exist_ok=True)
+            with open(self._manifest_path(snapshot_id), 'w', encoding='utf-8') as f:
+                json.dump(manifest, f, ensure_ascii=False, indent=2)
+            if remove:
+                # 取り込んだ内容から元のファイルが復元できることを確かめてから消す
+                for name, entry in legacy['files'].items():
+                    self.read_file(snapshot_id, name, manifest)
+                shutil.rmtree(os.path.join(self.root, snapshot_id))
+            migrated.append(snapshot_id)
+        return migrated
+
+
 def create_backup():
     """
-    dataフォルダ内の重要なファイルを backups フォルダにコピーする
+    dataフォルダ内の重要なファイルを backups フォルダに保存する
     """
-    # 1. フォルダの準備
-    backup_root = "data/backups"
-    timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
-    backup_dir = os.path.join(backup_root, timestamp)
-    
-    if not os.path.exists(backup_dir):
-        os.makedirs(backup_dir)
-        
-    # 2. 対象ファイルのリスト
-    target_files = [
-        "data/market_input.csv",
-        "data/katsuo_market_data.json",
-        "data/bid_schedule.json"
-    ]
-    
-    # 3. コピー実行
-    copied_count = 0
-    for file_path in target_files:
-        if os.path.exists(file_path):
-            filename = os.path.basename(file_path)
-            shutil.copy2(file_path, os.path.join(backup_dir, filename))
-            copied_count += 1
-            
-    print(f"Backup created at: {backup_dir} ({copied_count} files)")
-    return backup_dir
+    store = BackupStore()
+    snapshot_id, new_chunks, new_bytes = store.create_snapshot(TARGET_FILES)
+    print(f"Backup snapshot: {snapshot_id} ({new_chunks} new chunks, {new_bytes} bytes)")
+    return store._manifest_path(snapshot_id)
+
+
+def iter_snapshots(root=BACKUP_ROOT):
+    return BackupStore(root).iter_snapshots()
+
+
+def _format_size(size):
+    return '-' if size is None else f"{size:,}"
+
+
+def main():
+    parser = argparse.ArgumentParser(description='data フォルダのバックアップ（作成・一覧・比較・復元・整理）')
+    sub = parser.add_subparsers(dest='command')
+    sub.add_parser('create', help='バックアップを作成（既定）')
+    sub.add_parser('list', help='スナップショットの一覧')
+    diff_parser = sub.add_parser('diff', help='2つのスナップショットの差分')
+    diff_parser.add_argument('old')
+    diff_parser.add_argument('new')
+    restore_parser = sub.add_parser('restore', help='スナップショットを書き出す')
+    restore_parser.add_argument('snapshot')
+    restore_parser.add_argument('--dest', required=True, help='書き出し先フォルダ')
+    restore_parser.add_argument('--file', action='append', help='書き出すファイル名（複数指定可）')
+    prune_parser = sub.add_parser('prune', help='保持ルールに入らないスナップショットを削除')
+    for period, count in RETENTION.items():
+        prune_parser.add_argument(f'--{period}', type=int, default=count)
+    prune_parser.add_argument('--dry-run', action='store_true')
+    migrate_parser = sub.add_parser('migrate', help='旧形式のフォルダを取り込む')
+    migrate_parser.add_argument('--remove', action='store_true', help='取り込んだフォルダを削除する')
+    args = parser.parse_args()
+
+    store = BackupStore()
+    if args.command in (None, 'create'):
+        create_backup()
+    elif args.command == 'list':
+        for manifest in store.iter_snapshots():
+            size = sum(entry['size'] for entry in manifest['files'].values())
+            kind = 'legacy' if manifest['legacy'] else 'store'
+            print(f"{manifest['id']}\t{kind}\t{len(manifest['files'])} files\t{size:,} bytes")
+    elif args.command == 'diff':
+        for name, entry in store.diff(args.old, args.new).items():
+            detail = ''
+            if 'new_chunks' in entry and entry['status'] == 'changed':
+                detail = f" ({entry['new_chunks']} chunks changed, {entry['shared_chunks']} shared)"
+            print(f"{entry['status']:9} {name}: {_format_size(entry['old_size'])} -> {_format_size(entry['new_size'])}{detail}")
+    elif args.command == 'restore':
+        for path in store.restore(args.snapshot, args.dest, args.file):
+            print(f"Restored: {path}")
+    elif args.command == 'prune':
+        policy = {period: getattr(args, period) for period in RETENTION}
+        removed, deleted = store.prune(policy, dry_run=args.dry_run)
+        print(f"{'Would remove' if args.dry_run else 'Removed'} {len(removed)} snapshots, {deleted} chunks.")
+        for snapshot_id in removed:
+            print(f"  {snapshot_id}")
+    elif args.command == 'migrate':
+        migrated = store.migrate_legacy(remove=args.remove)
+        print(f"Migrated {len(migrated)} legacy backups.")
+    return 0
+
 
 if __name__ == "__main__":
-    create_backup()
+    sys.exit(main())
@@ -0,0 +1,112 @@
+"""
+save_to_json のエクスポート処理のベンチマーク
+
+合成した複数年分のCSV（既定 50万行）を使い、
+従来の港×サイズごとの絞り込み方式と export_grouped を比較する。
+
+    python scripts/bench_export.py --rows 500000
+"""
+import argparse
+import csv
+import os
+import random
+import sys
+import tempfile
+import time
+from datetime import date, timedelta
+
+import pandas as pd
+
+sys.path.insert(0, os.path.dirname(__file__))
+from katsuo_fetcher import KatsuoDataFetcher, export_grouped
+
+PORT_SIZES = {
+    "枕崎": [
+        "8.0kg上", "6.0kg上", "4.5kg上", "2.5kg上", "1.8kg上", "1.8kg下", "0.5kg下",
+        "B品2.5kg上", "B品2.5kg下", "1.5kg上", "1.5kg下ダル混", "キワ・キメ 1.5kg上",
+        "ダルマ1.5kg上", "大キズ", "キメジキス",
+    ],
+    "焼津": ["4.5kg上", "2.5kg上", "1.8kg上", "1.8kg下"],
+    "山川": [
+        "8.0kg上", "6.0kg上", "4.5kg上", "2.5kg上", "1.8kg上", "1.8kg下",
+        "2.5kg上変形", "2.5kg下変形", "キメジ3.0kg下", "メバチ3.0kg下",
+    ],
+}
+VESSELS = ["88福一丸", "55岬洋丸", "7わかば丸", "88明豊丸", "永盛丸", "38常盤丸", ""]
+
+
+def generate_csv(path, rows, seed=0):
+    """1日ごとに全港・全サイズの行を並べた合成CSVを作る（船名は一部空欄）"""
+    rng = random.Random(seed)
+    day = date(2000, 1, 1)
+    written = 0
+    with open(path, 'w', encoding='utf-8', newline='') as f:
+        writer = csv.writer(f)
+        writer.writerow(['date', 'port', 'size', 'price', 'volume', 'vessel'])
+        while written < rows:
+            for port, sizes in PORT_SIZES.items():
+                for size in sizes:
+                    if written >= rows:
+                        break
+                    writer.writerow([
+                        day.isoformat(), port, size,
+                        f"{rng.uniform(150, 450):.1f}", f"{rng.choice([0, 1, 5, 20, 100, 250]):.1f}",
+                        rng.choice(VESSELS),
+                    ])
+                    written += 1
+            day += timedelta(days=1)
+
+
+def export_legacy(df, ports):
+    """従来の save_to_json と同じ絞り込み方式（比較用）"""
+    output = {}
+    for port in ports:
+        port_data = df[df['port'] == port]
+        output[port] = {}
+        for size in port_data['size'].unique():
+            size_data = port_data[port_data['size'] == size].sort_values('date')
+            cols = ['date', 'price', 'volume']
+            if 'vessel' in size_data.columns:
+                cols.append('vessel')
+            records = size_data[cols].to_dict(orient='records')
+            for rec in records:
+                if 'vessel' in rec and pd.isna(rec['vessel']):
+                    del rec['vessel']
+            output[port][size] = records
+    return output
+
+
+def timed(func, *args, repeat=3):
+    best = None
+    result = None
+    for _ in range(repeat):
+        start = time.perf_counter()
+        result = func(*args)
+        elapsed = time.perf_counter() - start
+        best = elapsed if best is None else min(best, elapsed)
+    return best, result
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--rows', type=int, default=500000)
+    parser.add_argument('--repeat', type=int, default=3)
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        ports = KatsuoDataFetcher(data_dir=tmp).ports
+        csv_path = os.path.join(tmp, 'market_input.csv')
+        generate_csv(csv_path, args.rows)
+        df = pd.read_csv(csv_path, encoding='utf-8')
+
+    print(f"rows: {len(df)}  series: {df.groupby(['port', 'size']).ngroups}")
+    legacy_time, legacy = timed(export_legacy, df, ports, repeat=args.repeat)
+    grouped_time, grouped = timed(export_grouped, df, ports, repeat=args.repeat)
+
+    print(f"legacy  : {legacy_time:.3f}s")
+    print(f"grouped : {grouped_time:.3f}s  ({legacy_time / grouped_time:.1f}x)")
+    print(f"same output: {legacy == grouped}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,77 @@
+"""
+焼津相場ページ解析のベンチマーク
+
+scripts/fixtures/yaizu_*.html を各パーサー（PARSER_BACKENDS）で解析して時間を比べ、
+結果が一致することも確認する。
+--tables を指定すると、フィクスチャのテーブルを繰り返した大きなページ
+（過去の相場を並べたアーカイブページを想定）も合成して計測する。
+
+    python scripts/bench_yaizu_parser.py --tables 2000
+"""
+import argparse
+import contextlib
+import glob
+import io
+import os
+import re
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(__file__))
+from yaizu_scraper import PARSER_BACKENDS, parse_yaizu_html
+
+FIXTURE_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'fixtures')
+
+
+def build_archive_page(html, tables):
+    """フィクスチャの見出し+テーブルを繰り返して大きなページを作る"""
+    blocks = re.findall(r'<h3>.*?</table>', html, flags=re.S)
+    body = ''.join(blocks[i % len(blocks)] for i in range(tables))
+    return html.replace('</body>', body + '</body>', 1)
+
+
+def timed(html, backend, repeat):
+    best = None
+    result = None
+    for _ in range(repeat):
+        # 解析中の print は計測に含めない
+        with contextlib.redirect_stdout(io.StringIO()):
+            start = time.perf_counter()
+            result = parse_yaizu_html(html, backend)
+            elapsed = time.perf_counter() - start
+        best = elapsed if best is None else min(best, elapsed)
+    return best, result
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--tables', type=int, default=1000, help='合成アーカイブページのテーブル数（0 で省略）')
+    parser.add_argument('--repeat', type=int, default=5)
+    args = parser.parse_args()
+
+    pages = []
+    for path in sorted(glob.glob(os.path.join(FIXTURE_DIR, 'yaizu_*.html'))):
+        with open(path, 'r', encoding='utf-8') as f:
+            pages.append((os.path.basename(path), f.read()))
+    if not pages:
+        print(f"No fixtures found in {FIXTURE_DIR}")
+        return 1
+    if args.tables:
+        pages.append((f"archive x{args.tables} tables", build_archive_page(pages[0][1], args.tables)))
+
+    print(f"backends: {', '.join(PARSER_BACKENDS)}")
+    for name, html in pages:
+        print(f"\n{name} ({len(html) // 1024} KB)")
+        results = {}
+        baseline = None
+        for backend in PARSER_BACKENDS:
+            elapsed, results[backend] = timed(html, backend, args.repeat)
+            baseline = baseline or elapsed
+            print(f"  {backend:5s}: {elapsed * 1000:8.1f} ms  ({baseline / elapsed:.1f}x)")
+        outputs = list(results.values())
+        print(f"  same output: {all(out == outputs[0] for out in outputs)}")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
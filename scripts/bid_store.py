@@ -0,0 +1,390 @@
+"""
+入札予定の月別分割ストア
+
+    data/bids/active.json             最も新しい入札日から ACTIVE_DAYS 日以内の入札予定（ダッシュボードが最初に読む）
+                                      + アーカイブの月の一覧
+    data/bids/archive/<YYYY-MM>.json  それ以外の入札予定（入札日の月ごと、新しい順）
+    data/bids/index.json              ID -> 格納先（active / 月）・最新(is_latest)の入札ID
+
+active とアーカイブの境目はデータ（最も新しい入札日）だけで決まり、ビルドした日には依存しない。
+追加・更新・is_latest の付け替えは、対象の入札がある分割ファイルだけを読み書きする。
+ダッシュボードは active.json だけを読み、アーカイブは開いたときに月ごとに取得する
+（active_from が今日より後のときだけ、今日以降の予定を含み得る月を先に読む）。
+
+正本は data/bids。更新スクリプトからは upsert_bids()（または下の upsert コマンド）で追加する。
+data/bid_schedule.json（従来の1ファイル形式）はビルド時に export_legacy で書き出す
+（ストアに書き出していない変更があるときだけ）。
+bid_schedule.json が手で編集されていればビルド時に取り込む。更新日時とサイズを
+data/bid_store_state.json に覚えておき、変わっていなければハッシュも計算しない。
+
+    python scripts/bid_store.py import              # bid_schedule.json から作り直す
+    python scripts/bid_store.py upsert new_bids.json --latest 20260822_fukuichimaru128
+    python scripts/bid_store.py rebalance           # active の範囲外になった予定をアーカイブへ移す
+    python scripts/bid_store.py export              # 全件を bid_schedule.json 形式で書き出す
+"""
+import argparse
+import hashlib
+import json
+import os
+import sys
+from datetime import date, timedelta
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+BIDS_DIR = os.path.join(ROOT, 'data', 'bids')
+LEGACY_PATH = os.path.join(ROOT, 'data', 'bid_schedule.json')
+STATE_PATH = os.path.join(ROOT, 'data', 'bid_store_state.json')
+ACTIVE = 'active'
+ACTIVE_DAYS = 14  # active に残す期間（最も新しい入札日からの日数）
+INDEX_VERSION = 2
+
+
+def _sort_key(bid):
+    return (bid.get('bid_date') or '', bid.get('id') or '')
+
+
+def _write_json(path, data):
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    tmp_path = f"{path}.tmp"
+    with open(tmp_path, 'w', encoding='utf-8') as f:
+        json.dump(data, f, ensure_ascii=False, indent=2)
+    os.replace(tmp_path, path)
+
+
+def _file_sha256(path):
+    with open(path, 'rb') as f:
+        return hashlib.sha256(f.read()).hexdigest()
+
+
+def _file_stat(path):
+    stat = os.stat(path)
+    return {'path': os.path.abspath(path), 'mtime_ns': stat.st_mtime_ns, 'size': stat.st_size}
+
+
+class BidStore:
+    def __init__(self, root=BIDS_DIR, state_path=STATE_PATH):
+        self.root = root
+        self.state_path = state_path
+        self.index = self._load_index()
+        self._partitions = {}
+        self._dirty = set()
+        self._legacy_seen = None  # save() 後に state_path へ記録する bid_schedule.json のパス
+
+    # --- 読み込み ---
+
+    def _load_index(self):
+        path = os.path.join(self.root, 'index.json')
+        if os.path.exists(path):
+            try:
+                with open(path, 'r', encoding='utf-8') as f:
+                    index = json.load(f)
+                if index.get('version') == INDEX_VERSION:
+                    return index
+            except (OSError, ValueError):
+                pass
+        return {'version': INDEX_VERSION, 'latest_id': None, 'legacy_sha256': None, 'max_bid_date': None,
+                'months': {}, 'ids': {}}
+
+    def _partition_path(self, name):
+        if name == ACTIVE:
+            return os.path.join(self.root, 'active.json')
+        return os.path.join(self.root, 'archive', f"{name}.json")
+
+    def _partition(self, name):
+        """分割ファイルを初回アクセス時に読み込む（ID -> 入札 の辞書）"""
+        if name not in self._partitions:
+            bids = []
+            path = self._partition_path(name)
+            # 索引に無い分割ファイルは古い形式の残りなので読まない
+            known = 'active' in self.index if name == ACTIVE else name in self.index['months']
+            if known and os.path.exists(path):
+                with open(path, 'r', encoding='utf-8') as f:
+                    payload = json.load(f)
+                bids = payload['bids'] if name == ACTIVE else payload
+            self._partitions[name] = {bid['id']: bid for bid in bids}
+        return self._partitions[name]
+
+    def get(self, bid_id):
+        name = self.index['ids'].get(bid_id)
+        return self._partition(name).get(bid_id) if name else None
+
+    def __len__(self):
+        return len(self.index['ids'])
+
+    def months(self):
+        """入札のあるアーカイブの月（新しい順。保存前の変更も含む）"""
+        months = set(self.index['months'])
+        for name, bids in self._partitions.items():
+            if name != ACTIVE:
+                (months.add if bids else months.discard)(name)
+        return sorted(months, reverse=True)
+
+    def iter_bids(self):
+        """全件を入札日の新しい順に返す（全ての分割ファイルを読む）"""
+        bids = list(self._partition(ACTIVE).values())
+        for month in self.months():
+            bids.extend(self._partition(month).values())
+        return sorted(bids, key=_sort_key, reverse=True)
+
+    # --- 書き込み ---
+
+    def active_from(self):
+        """active に置く最も古い入札日（最も新しい入札日の ACTIVE_DAYS 日前）"""
+        latest = self.index.get('max_bid_date')
+        if not latest:
+            return ''
+        return (date.fromisoformat(latest) - timedelta(days=ACTIVE_DAYS)).isoformat()
+
+    def _target(self, bid):
+        bid_date = bid.get('bid_date') or ''
+        return ACTIVE if bid_date >= self.active_from() else bid_date[:7] or 'unknown'
+
+    def _move(self, bid, name):
+        old = self.index['ids'].get(bid['id'])
+        if old is not None and old != name:
+            del self._partition(old)[bid['id']]
+            self._dirty.add(old)
+        self._partition(name)[bid['id']] = bid
+        self.index['ids'][bid['id']] = name
+        self._dirty.add(name)
+
+    def _set_latest(self, bid_id):
+        """is_latest を付け替える（前の最新と新しい最新の分割ファイルだけを触る）"""
+        previous = self.index.get('latest_id')
+        if previous == bid_id:
+            return
+        if previous and self.get(previous) is not None:
+            self.get(previous)['is_latest'] = False
+            self._dirty.add(self.index['ids'][previous])
+        bid = self.get(bid_id)
+        if bid is not None:
+            bid['is_latest'] = True
+            self._dirty.add(self.index['ids'][bid_id])
+        self.index['latest_id'] = bid_id
+
+    def upsert(self, bids, latest_id=None):
+        """
+        入札予定を追加・更新する（同じIDは置き換え）。戻り値は (追加件数, 更新件数)。
+        latest_id を渡すとその入札を is_latest にする（省略時は is_latest: true の入札）。
+        """
+        added = updated = 0
+        for bid in bids:
+            existing = self.get(bid['id'])
+            if existing == bid:
+                continue
+            if existing is None:
+                added += 1
+            else:
+                updated += 1
+            if bid.get('is_latest') and latest_id is None:
+                latest_id = bid['id']
+            if (bid.get('bid_date') or '') > (self.index.get('max_bid_date') or ''):
+                self.index['max_bid_date'] = bid['bid_date']
+            bid = dict(bid, is_latest=bid['id'] == self.index.get('latest_id'))
+            self._move(bid, self._target(bid))
+        if added or updated or latest_id not in (None, self.index.get('latest_id')):
+            # bid_schedule.json は次のビルドで書き出す
+            self.index['legacy_stale'] = True
+        if latest_id is not None:
+            self._set_latest(latest_id)
+        self.rebalance()
+        return added, updated
+
+    def rebalance(self):
+        """
+        active には active_from 以降の入札予定だけを残し、他は入札日の月のアーカイブへ移す。
+        最も新しい入札が削除されて active_from が前に戻った場合は、範囲内の月から active へ戻す。
+        移した件数を返す。
+        """
+        moved = 0
+        for bid in list(self._partition(ACTIVE).values()):
+            if self._target(bid) != ACTIVE:
+                self._move(bid, self._target(bid))
+                moved += 1
+
+        active_from = self.active_from()
+        previous = self.index.get('active_from')
+        if previous is None or active_from < previous:
+            for month in self.months():
+                if month < active_from[:7]:
+                    break
+                for bid in list(self._partition(month).values()):
+                    if self._target(bid) == ACTIVE:
+                        self._move(bid, ACTIVE)
+                        moved += 1
+        return moved
+
+    def save(self):
+        """変更のあった分割ファイルと active.json・index.json を書き出し、書き出した月を返す"""
+        written = []
+        months = dict(self.index['months'])
+        for name in sorted(self._dirty - {ACTIVE}):
+            bids = sorted(self._partition(name).values(), key=_sort_key, reverse=True)
+            path = self._partition_path(name)
+            if bids:
+                _write_json(path, bids)
+                months[name] = {'path': f"archive/{name}.json", 'count': len(bids)}
+            else:
+                if os.path.exists(path):
+                    os.remove(path)
+                months.pop(name, None)
+            written.append(name)
+        self.index['months'] = {month: months[month] for month in sorted(months, reverse=True)}
+
+        if self._dirty:
+            active = sorted(self._partition(ACTIVE).values(), key=_sort_key, reverse=True)
+            self.index['active_from'] = self.active_from()
+            _write_json(self._partition_path(ACTIVE), {
+                'active_from': self.index['active_from'],
+                'archive_months': [dict(month=month, **info) for month, info in self.index['months'].items()],
+                'bids': active,
+            })
+            self.index['active'] = {'path': 'active.json', 'count': len(active)}
+            _write_json(os.path.join(self.root, 'index.json'), self.index)
+        self._dirty.clear()
+
+        # 取り込み・書き出しを保存し終えてから、bid_schedule.json の更新日時とサイズを記録する
+        if self._legacy_seen is not None:
+            _write_json(self.state_path, _file_stat(self._legacy_seen))
+            self._legacy_seen = None
+        return written
+
+    # --- 従来形式との変換 ---
+
+    def import_legacy(self, path=LEGACY_PATH):
+        """
+        bid_schedule.json の内容に揃える（無くなった入札は削除）。
+        同じIDの別の入札があれば、後のものに _2, _3 ... を付けて両方残す。
+        ストアに書き出していない変更がある場合は、それを消さないよう削除はせずに追加・更新だけ行う。
+        """
+        with open(path, 'r', encoding='utf-8') as f:
+            legacy = json.load(f)
+        bids = []
+        seen = {}
+        for bid in legacy:
+            bid_id = bid['id']
+            seen[bid_id] = seen.get(bid_id, 0) + 1
+            if seen[bid_id] > 1:
+                bid = dict(bid, id=f"{bid_id}_{seen[bid_id]}")
+                print(f"Duplicate bid id {bid_id}: stored as {bid['id']}")
+            bids.append(bid)
+
+        stale = bool(self.index.get('legacy_stale'))
+        if stale:
+            print(f"{path} was edited while the bid store has unexported changes; merging without deletions.")
+        else:
+            keep = {bid['id'] for bid in bids}
+            for bid_id, name in list(self.index['ids'].items()):
+                if bid_id not in keep:
+                    del self._partition(name)[bid_id]
+                    del self.index['ids'][bid_id]
+                    self._dirty.add(name)
+            # 最も新しい入札が無くなっていれば active の範囲を戻す（upsert は新しい日付にしか更新しない）
+            self.index['max_bid_date'] = max((bid.get('bid_date') or '' for bid in bids), default='') or None
+
+        latest = next((bid['id'] for bid in bids if bid.get('is_latest')), None)
+        result = self.upsert(bids, latest_id=latest)
+        self.index['legacy_stale'] = stale
+        self.index['legacy_sha256'] = _file_sha256(path)
+        self._dirty.add(ACTIVE)
+        self._legacy_seen = path
+        return result
+
+    def _load_state(self):
+        if os.path.exists(self.state_path):
+            try:
+                with open(self.state_path, 'r', encoding='utf-8') as f:
+                    return json.load(f)
+            except (OSError, ValueError):
+                pass
+        return {}
+
+    def sync_legacy(self, path=LEGACY_PATH):
+        """
+        bid_schedule.json が手で編集されていれば取り込む（ビルドから呼ぶ）。
+        更新日時とサイズが前回の取り込み・書き出しと同じなら、読み込みもハッシュの計算もしない。
+        """
+        if not os.path.exists(path):
+            return None
+        if self._load_state() == _file_stat(path):
+            return None
+        if self.index.get('legacy_sha256') == _file_sha256(path):
+            # 内容は同じ（チェックアウトし直した等）なので、更新日時とサイズだけ記録し直す
+            self._legacy_seen = path
+            return None
+        return self.import_legacy(path)
+
+    def export_legacy(self, path=LEGACY_PATH):
+        bids = self.iter_bids()
+        _write_json(path, bids)
+        self.index['legacy_sha256'] = _file_sha256(path)
+        self.index['legacy_stale'] = False
+        self._dirty.add(ACTIVE)
+        self._legacy_seen = path
+        return len(bids)
+
+
+def upsert_bids(bids, latest_id=None, bids_dir=BIDS_DIR, legacy_path=LEGACY_PATH, state_path=STATE_PATH):
+    """
+    更新スクリプト用: 入札予定を追加・更新し（同じIDは置き換え）、(追加件数, 更新件数) を返す。
+    変更のあった分割ファイルだけを書き直す。bid_schedule.json は次のビルドで書き出される。
+    """
+    store = BidStore(bids_dir, state_path)
+    # 手で編集された bid_schedule.json の変更を先に取り込む（編集されていなければ stat だけ）
+    store.sync_legacy(legacy_path)
+    result = store.upsert(bids, latest_id)
+    store.save()
+    return result
+
+
+def update_bid_store(bids_dir=BIDS_DIR, legacy_path=LEGACY_PATH, state_path=STATE_PATH):
+    """
+    ビルド用: bid_schedule.json の手での編集の取り込み、active の範囲外になった予定のアーカイブ、
+    ストアに書き出していない変更があれば bid_schedule.json の書き出し
+    """
+    store = BidStore(bids_dir, state_path)
+    store.sync_legacy(legacy_path)
+    store.rebalance()
+    if store.index.get('legacy_stale') or not os.path.exists(legacy_path):
+        count = store.export_legacy(legacy_path)
+        print(f"Exported {count} bids to {legacy_path}.")
+    return store.save()
+
+
+def main():
+    parser = argparse.ArgumentParser(description='入札予定の月別分割ストア')
+    sub = parser.add_subparsers(dest='command', required=True)
+    import_parser = sub.add_parser('import', help='bid_schedule.json から取り込む')
+    import_parser.add_argument('--from', dest='path', default=LEGACY_PATH)
+    upsert_parser = sub.add_parser('upsert', help='JSONファイル（1件または配列）の入札予定を追加・更新')
+    upsert_parser.add_argument('path')
+    upsert_parser.add_argument('--latest', help='最新(is_latest)にする入札ID')
+    sub.add_parser('rebalance', help='active の範囲外になった予定をアーカイブへ移す')
+    export_parser = sub.add_parser('export', help='全件を bid_schedule.json 形式で書き出す')
+    export_parser.add_argument('--to', dest='path', default=LEGACY_PATH)
+    args = parser.parse_args()
+
+    if args.command == 'upsert':
+        # 更新スクリプトと同じ（bid_schedule.json は次のビルドで書き出す）
+        with open(args.path, 'r', encoding='utf-8') as f:
+            payload = json.load(f)
+        added, updated = upsert_bids(payload if isinstance(payload, list) else [payload], args.latest)
+        print(f"{added} added, {updated} updated.")
+        return 0
+
+    store = BidStore()
+    if args.command == 'import':
+        added, updated = store.import_legacy(args.path)
+        print(f"Imported {args.path}: {added} added, {updated} updated.")
+    elif args.command == 'rebalance':
+        print(f"{store.rebalance()} bids moved.")
+    elif args.command == 'export':
+        print(f"Exported {store.export_legacy(args.path)} bids to {args.path}.")
+    written = store.save()
+    if written:
+        print(f"Archive months written: {', '.join(written)}")
+    print(f"{len(store)} bids in store ({store.index.get('active', {}).get('count', 0)} active).")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,107 @@
+"""
+RSSフィードの取得状態と、処理済み記事IDの索引（update_news.py 用）
+
+- FeedState: フィードごとの ETag / Last-Modified を data/news_cache/feed_state.json に保存し、
+  次回は条件付きGETにする（304 のフィードは解析しない）
+- SeenIndex: 処理済みの記事IDを data/news_cache/seen_ids.json に保存し、
+  新しい記事だけをキーワード判定・リンク確認・要約に回す。
+  要約を生成できなかった記事は処理済みにせず、data/news_cache/pending_items.json に残して次回もう一度要約する
+- entry_id: 記事URLのハッシュによる安定したID（フィードをまたいでも衝突しない）
+"""
+import hashlib
+import json
+import os
+from datetime import datetime, timedelta
+from urllib.parse import urlsplit, urlunsplit
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+CACHE_DIR = os.path.join(ROOT, 'data', 'news_cache')
+FEED_STATE_PATH = os.path.join(CACHE_DIR, 'feed_state.json')
+SEEN_IDS_PATH = os.path.join(CACHE_DIR, 'seen_ids.json')
+PENDING_PATH = os.path.join(CACHE_DIR, 'pending_items.json')
+# フィードから消えた記事のIDはこの期間で忘れる（索引が増え続けないように）
+SEEN_RETENTION = timedelta(days=90)
+
+
+def entry_id(link):
+    """記事URL（前後の空白と # 以降を除く）のハッシュから ID を作る"""
+    parts = urlsplit((link or '').strip())
+    normalized = urlunsplit((parts.scheme.lower(), parts.netloc.lower(), parts.path, parts.query, ''))
+    return "rss_" + hashlib.sha1(normalized.encode('utf-8')).hexdigest()[:16]
+
+
+def _load_json(path):
+    if not os.path.exists(path):
+        return {}
+    try:
+        with open(path, 'r', encoding='utf-8') as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return {}
+
+
+def _save_json(path, data):
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    tmp_path = f"{path}.tmp"
+    with open(tmp_path, 'w', encoding='utf-8') as f:
+        json.dump(data, f, ensure_ascii=False, indent=2, sort_keys=True)
+    os.replace(tmp_path, path)
+
+
+class FeedState:
+    def __init__(self, path=FEED_STATE_PATH):
+        self.path = path
+        self.feeds = _load_json(path)
+
+    def request_headers(self, url):
+        state = self.feeds.get(url, {})
+        headers = {}
+        if state.get('etag'):
+            headers['If-None-Match'] = state['etag']
+        if state.get('last_modified'):
+            headers['If-Modified-Since'] = state['last_modified']
+        return headers
+
+    def update(self, url, response):
+        self.feeds[url] = {
+            'etag': response.headers.get('ETag'),
+            'last_modified': response.headers.get('Last-Modified'),
+            'fetched_at': datetime.now().isoformat(timespec='seconds'),
+        }
+
+    def save(self):
+        _save_json(self.path, self.feeds)
+
+
+class SeenIndex:
+    def __init__(self, path=SEEN_IDS_PATH, pending_path=PENDING_PATH):
+        self.path = path
+        self.pending_path = pending_path
+        # ID -> 最後にフィード上で見かけた日付
+        self.ids = _load_json(path)
+        # ID -> 要約を取り直す記事（フィードが 304 でも次回の候補に戻す）
+        self.pending = _load_json(pending_path)
+
+    def __contains__(self, item_id):
+        return item_id in self.ids
+
+    def touch(self, item_id):
+        """フィードにまだ載っている処理済み記事の日付を更新する"""
+        if item_id in self.ids:
+            self.ids[item_id] = datetime.now().strftime("%Y-%m-%d")
+
+    def add(self, item_id):
+        self.ids[item_id] = datetime.now().strftime("%Y-%m-%d")
+        self.pending.pop(item_id, None)
+
+    def defer(self, item):
+        """要約できなかった記事を処理済みにせず、次回もう一度処理する"""
+        self.ids.pop(item['id'], None)
+        self.pending[item['id']] = item
+
+    def save(self, retention=SEEN_RETENTION):
+        limit = (datetime.now() - retention).strftime("%Y-%m-%d")
+        self.ids = {item_id: day for item_id, day in self.ids.items() if day >= limit}
+        self.pending = {item_id: item for item_id, item in self.pending.items() if item.get('date', '') >= limit}
+        _save_json(self.path, self.ids)
+        _save_json(self.pending_path, self.pending)
@@ -0,0 +1,102 @@
+"""
+並列HTTP取得のための共有プール（update_news.py 用）
+
+- requests.Session を1つ共有し、接続を使い回す
+- 同じホストへの同時リクエスト数を制限する（相手サイトに負荷をかけない）
+- 全体の締め切り（deadline）を設け、締め切りを過ぎた取得は行わずに「未確認」として返す
+
+全体の所要時間は、各リクエストの合計ではなく最も遅いリクエスト（または締め切り）で決まる。
+"""
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from urllib.parse import urlsplit
+
+import requests
+from requests.adapters import HTTPAdapter
+
+MAX_WORKERS = 16
+PER_HOST = 4
+TIMEOUT = 5
+DEADLINE = 30
+
+
+class FetchPool:
+    def __init__(self, max_workers=MAX_WORKERS, per_host=PER_HOST, timeout=TIMEOUT, deadline=DEADLINE):
+        self.timeout = timeout
+        self.per_host = per_host
+        self.deadline_at = time.monotonic() + deadline
+        self.session = requests.Session()
+        adapter = HTTPAdapter(pool_connections=max_workers, pool_maxsize=max_workers)
+        self.session.mount('http://', adapter)
+        self.session.mount('https://', adapter)
+        self.executor = ThreadPoolExecutor(max_workers=max_workers)
+        self._host_limits = {}
+        self._lock = threading.Lock()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+    def close(self):
+        # 締め切り後のタスクはすぐ終わるので、待ってから閉じる
+        self.executor.shutdown(wait=True)
+        self.session.close()
+
+    def remaining(self):
+        return self.deadline_at - time.monotonic()
+
+    def _host_limit(self, url):
+        host = urlsplit(url).netloc
+        with self._lock:
+            if host not in self._host_limits:
+                self._host_limits[host] = threading.BoundedSemaphore(self.per_host)
+            return self._host_limits[host]
+
+    def _request(self, method, url, **kwargs):
+        """
+        締め切りまでに送れなかった・間に合わなかったリクエストは None を返す
+        """
+        limit = self._host_limit(url)
+        if not limit.acquire(timeout=max(self.remaining(), 0)):
+            return None
+        try:
+            remaining = self.remaining()
+            if remaining <= 0:
+                return None
+            return self.session.request(method, url, timeout=min(self.timeout, remaining), **kwargs)
+        finally:
+            limit.release()
+
+    def submit(self, func, *args):
+        return self.executor.submit(func, *args)
+
+    def get(self, url, headers=None):
+        """GET のレスポンス（失敗・締め切り超過は None）を返す Future"""
+        def task():
+            try:
+                return self._request('GET', url, headers=headers)
+            except requests.RequestException as e:
+                print(f"Fetch error: {url} ({e})")
+                return None
+        return self.executor.submit(task)
+
+    def check_url(self, url):
+        """
+        URLが有効か（200 か）を確認する Future。
+        結果は True / False、締め切りまでに確認できなかった場合は None。
+        """
+        def task():
+            try:
+                response = self._request('HEAD', url, allow_redirects=True)
+            except requests.Timeout:
+                # 締め切りで打ち切った場合はリンク切れと区別する
+                return None if self.remaining() <= 0 else False
+            except requests.RequestException:
+                return False
+            if response is None:
+                return None
+            return response.status_code == 200
+        return self.executor.submit(task)
@@ -1,6 +1,5 @@
 import sys
 import os
-import csv
 import json
 from collections import defaultdict
 from datetime import datetime
@@ -8,6 +7,7 @@ from datetime import datetime
 # scripts ディレクトリの update_data をインポートできるようにパスを通す
 sys.path.insert(0, os.path.dirname(__file__))
 from update_data import add_market_data, bump_version, MARKET_DATA_PATH
+from market_repository import MarketRepository
 
 DATE = "2026-04-03"
 PORT = "焼津"
@@ -39,27 +39,14 @@ for d in raw_data:
     aggregated[d["size"]]["total_vol"] += d["volume"]
     aggregated[d["size"]]["vessels"].add(d["vessel"].replace("丸", "")) # 短縮表記
 
-# CSV の読み込みと 2026-04-03 焼津以外の行を保持
-rows = []
-if os.path.exists(CSV_PATH):
-    with open(CSV_PATH, 'r', encoding='utf-8') as f:
-        reader = csv.reader(f)
-        header = next(reader)
-        for row in reader:
-            if row[0] == DATE and row[1] == PORT:
-                continue # 今日のは一旦除外
-            rows.append(row)
-
-# 集計した最新データを CSV 行に追加
-for size, val in sorted(aggregated.items()):
-    avg_price = round(val["total_price_vol"] / val["total_vol"], 1)
-    rows.append([DATE, PORT, size, str(avg_price), str(val["total_vol"])])
-
-# CSV 書き戻し
-with open(CSV_PATH, 'w', encoding='utf-8', newline='') as f:
-    writer = csv.writer(f)
-    writer.writerow(["date", "port", "size", "price", "volume"])
-    writer.writerows(rows)
+# 2026-04-03 焼津の行を集計値に置き換える（読み込み・書き戻しは1回ずつ）
+repository = MarketRepository(CSV_PATH)
+with repository.batch():
+    repository.delete_where(lambda row: row[0] == DATE and row[1] == PORT) # 今日のは一旦除外
+    repository.upsert([
+        [DATE, PORT, size, str(round(val["total_price_vol"] / val["total_vol"], 1)), str(val["total_vol"])]
+        for size, val in sorted(aggregated.items())
+    ])
 print(f"✓ {CSV_PATH} を更新しました (2026-04-03 焼津分を集計反映)")
 
 # 2. katsuo_market_data.json の更新
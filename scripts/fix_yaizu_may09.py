@@ -1,6 +1,9 @@
 import json
-import csv
 import os
+import sys
+
+sys.path.insert(0, os.path.dirname(__file__))
+from market_repository import MarketRepository
 
 def load_json(path):
     with open(path, 'r', encoding='utf-8') as f:
@@ -65,25 +68,18 @@ def fix_bid_schedule():
 
 def fix_market_input_csv():
     path = os.path.join(os.path.dirname(__file__), '..', 'data', 'market_input.csv')
-    with open(path, 'r', encoding='utf-8') as f:
-        lines = f.readlines()
-    
-    new_lines = []
-    for line in lines:
-        if "2026-05-09,焼津" in line:
-            # 7.0kg上, 1.5kg上 の行は削除
-            if ",7.0kg上," in line or ",1.5kg上," in line:
-                continue
-            # 4.5kg上の上書きデータ(452.5)を削除
-            if ",4.5kg上,452.5," in line:
-                continue
-            # 2.5kg上の上書きデータ(430.0)を削除
-            if ",2.5kg上,430.0," in line:
-                continue
-        new_lines.append(line)
-        
-    with open(path, 'w', encoding='utf-8') as f:
-        f.writelines(new_lines)
+
+    def is_overwritten_row(row):
+        date, port, size, price = row[0], row[1], row[2], row[3]
+        if date != "2026-05-09" or port != "焼津":
+            return False
+        # 7.0kg上, 1.5kg上 の行は削除
+        if size in ("7.0kg上", "1.5kg上"):
+            return True
+        # 4.5kg上の上書きデータ(452.5)、2.5kg上の上書きデータ(430.0)を削除
+        return (size, price) in (("4.5kg上", "452.5"), ("2.5kg上", "430.0"))
+
+    MarketRepository(path).delete_where(is_overwritten_row)
     print("market_input.csv fixed.")
 
 def main():
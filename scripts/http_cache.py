@@ -0,0 +1,101 @@
+"""
+条件付きGETによるページ取得キャッシュ
+
+URLごとに ETag / Last-Modified と本文のハッシュを data/http_cache.json に保存し、
+次回は If-None-Match / If-Modified-Since 付きで取得する。
+304 が返るか、200 でも本文のハッシュが前回と同じなら「変更なし」として扱い、
+呼び出し側は解析・CSV更新を丸ごと省略できる。
+
+キャッシュの更新は呼び出し側が処理に成功してから commit() で行う
+（解析やマージに失敗した回を「処理済み」と記録しないため）。
+"""
+import hashlib
+import json
+import os
+from datetime import datetime
+
+import requests
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+CACHE_PATH = os.path.join(ROOT, 'data', 'http_cache.json')
+
+
+class FetchResult:
+    """
+    取得結果。changed が False のとき text は None
+    """
+    def __init__(self, url, status, changed, text=None, body_hash=None, etag=None, last_modified=None):
+        self.url = url
+        self.status = status
+        self.changed = changed
+        self.text = text
+        self.body_hash = body_hash
+        self.etag = etag
+        self.last_modified = last_modified
+
+
+class ConditionalFetcher:
+    def __init__(self, cache_path=CACHE_PATH, session=None):
+        self.cache_path = cache_path
+        self.session = session or requests.Session()
+        self.entries = self._load()
+
+    def _load(self):
+        if not os.path.exists(self.cache_path):
+            return {}
+        try:
+            with open(self.cache_path, 'r', encoding='utf-8') as f:
+                return json.load(f)
+        except (OSError, ValueError):
+            # 壊れたキャッシュは捨てて取り直す
+            return {}
+
+    def _save(self):
+        os.makedirs(os.path.dirname(self.cache_path), exist_ok=True)
+        tmp_path = f"{self.cache_path}.tmp"
+        with open(tmp_path, 'w', encoding='utf-8') as f:
+            json.dump(self.entries, f, ensure_ascii=False, indent=2)
+        os.replace(tmp_path, self.cache_path)
+
+    def fetch(self, url, timeout=10, encoding='utf-8'):
+        """
+        条件付きGETでページを取得する。HTTPエラーは requests の例外として送出する。
+        """
+        entry = self.entries.get(url, {})
+        headers = {}
+        if entry.get('etag'):
+            headers['If-None-Match'] = entry['etag']
+        if entry.get('last_modified'):
+            headers['If-Modified-Since'] = entry['last_modified']
+
+        response = self.session.get(url, headers=headers, timeout=timeout)
+        if response.status_code == 304:
+            return FetchResult(url, 304, False, body_hash=entry.get('body_hash'),
+                               etag=entry.get('etag'), last_modified=entry.get('last_modified'))
+        response.raise_for_status()
+
+        body_hash = hashlib.sha256(response.content).hexdigest()
+        etag = response.headers.get('ETag')
+        last_modified = response.headers.get('Last-Modified')
+        # 検証子を返さないサーバーでも、本文が同じなら変更なしとみなす
+        if body_hash == entry.get('body_hash'):
+            return FetchResult(url, response.status_code, False, body_hash=body_hash,
+                               etag=etag, last_modified=last_modified)
+
+        response.encoding = encoding
+        return FetchResult(url, response.status_code, True, text=response.text, body_hash=body_hash,
+                           etag=etag, last_modified=last_modified)
+
+    def commit(self, result):
+        """処理が終わった取得結果をキャッシュに記録する"""
+        entry = self.entries.setdefault(result.url, {})
+        entry['checked_at'] = datetime.now().isoformat(timespec='seconds')
+        if result.changed or entry.get('body_hash') != result.body_hash:
+            entry['updated_at'] = entry['checked_at']
+        entry['body_hash'] = result.body_hash
+        # 304 の場合は前回の検証子をそのまま使う
+        if result.etag is not None:
+            entry['etag'] = result.etag
+        if result.last_modified is not None:
+            entry['last_modified'] = result.last_modified
+        self._save()
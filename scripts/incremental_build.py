@@ -0,0 +1,160 @@
+import csv
+import hashlib
+import json
+import os
+import sys
+
+sys.path.insert(0, os.path.dirname(__file__))
+from market_rules import load_rules
+from rebuild_data_from_csv import is_market_row, row_to_entry
+
+MANIFEST_VERSION = 1
+CSV_FIELDS = ('date', 'port', 'size', 'price', 'volume', 'vessel')
+
+
+def _file_sha256(path):
+    h = hashlib.sha256()
+    with open(path, 'rb') as f:
+        for block in iter(lambda: f.read(1 << 16), b''):
+            h.update(block)
+    return h.hexdigest()
+
+
+def _write_json_atomic(path, data, indent=2):
+    tmp_path = f"{path}.tmp"
+    with open(tmp_path, mode='w', encoding='utf-8') as f:
+        json.dump(data, f, ensure_ascii=False, indent=indent)
+    os.replace(tmp_path, path)
+
+
+def default_manifest_path(json_path):
+    return os.path.join(os.path.dirname(json_path), 'build_manifest.json')
+
+
+def load_manifest(manifest_path):
+    if not os.path.exists(manifest_path):
+        return None
+    try:
+        with open(manifest_path, mode='r', encoding='utf-8') as f:
+            manifest = json.load(f)
+    except (OSError, ValueError):
+        return None
+    if manifest.get('version') != MANIFEST_VERSION:
+        return None
+    return manifest
+
+
+def scan_series(csv_path):
+    """
+    CSVを1回だけ走査し、(港, サイズ) ごとの行とハッシュを返す。
+    行の並び順もハッシュに含めるため、フル再生成と同じ出力順が保証される。
+    """
+    rows = {}
+    hashes = {}
+    with open(csv_path, mode='r', encoding='utf-8') as f:
+        for row in csv.DictReader(f):
+            if not is_market_row(row):
+                continue
+            key = (row['port'], row['size'])
+            if key not in rows:
+                rows[key] = []
+                hashes[key] = hashlib.sha256()
+            rows[key].append(row)
+            line = '\x1f'.join(row.get(name) or '' for name in CSV_FIELDS)
+            hashes[key].update(line.encode('utf-8') + b'\n')
+    return rows, {key: h.hexdigest() for key, h in hashes.items()}
+
+
+def build_series(rows, rules, port, size):
+    """1系列を作ってルールを適用する（ルールで除外される系列は None）"""
+    records = [row_to_entry(row) for row in rows]
+    records.sort(key=lambda x: x['date'])
+    return rules.sanitize_series(port, size, records)
+
+
+def _key_order(data):
+    return [(port, list(sizes)) for port, sizes in data.items()]
+
+
+def build_incremental(csv_path, json_path, manifest_path=None, rules=None):
+    """
+    前回ビルドから変化した系列だけを再生成して既存JSONへマージする。
+    戻り値は再生成した (港, サイズ) のリスト。
+    マニフェストが無い・JSONが手編集されている場合はフル再生成にフォールバックする。
+    """
+    manifest_path = manifest_path or default_manifest_path(json_path)
+    manifest = load_manifest(manifest_path)
+    csv_sha256 = _file_sha256(csv_path)
+    rules = rules or load_rules()
+
+    existing = None
+    # ルールが変わった場合も全系列を作り直す
+    if (manifest and manifest.get('rules_fingerprint') == rules.fingerprint
+            and os.path.exists(json_path) and _file_sha256(json_path) == manifest.get('json_sha256')):
+        if manifest.get('csv_sha256') == csv_sha256:
+            print("No changes in market_input.csv. Skipping rebuild.")
+            return []
+        with open(json_path, mode='r', encoding='utf-8') as f:
+            existing = json.load(f)
+
+    rows, hashes = scan_series(csv_path)
+    old_hashes = manifest.get('series', {}) if existing is not None else {}
+
+    output = {}
+    changed = []
+    for (port, size), series_hash in hashes.items():
+        old_records = existing.get(port, {}).get(size) if existing is not None else None
+        if existing is not None and old_hashes.get(port, {}).get(size) == series_hash:
+            # 前回と同じ行（前回ルールで除外された系列は JSON に無いまま）
+            records = old_records
+        else:
+            records = build_series(rows[(port, size)], rules, port, size)
+            changed.append((port, size))
+        output.setdefault(port, {})
+        if records is not None:
+            output[port][size] = records
+
+    removed = [
+        (port, size)
+        for port, sizes in (existing or {}).items()
+        for size in sizes
+        if size not in output.get(port, {})
+    ]
+
+    if existing is not None and not changed and not removed and _key_order(output) == _key_order(existing):
+        # 系列の中身も並びも同じ（空行の追加など）なので JSON はそのまま
+        print("Series unchanged. Updating manifest only.")
+    else:
+        _write_json_atomic(json_path, output)
+
+    series_manifest = {}
+    for (port, size), series_hash in hashes.items():
+        series_manifest.setdefault(port, {})[size] = series_hash
+    _write_json_atomic(manifest_path, {
+        'version': MANIFEST_VERSION,
+        'csv_sha256': csv_sha256,
+        'json_sha256': _file_sha256(json_path),
+        'rules_fingerprint': rules.fingerprint,
+        'series': series_manifest,
+    })
+
+    for port, size in changed:
+        print(f"  rebuilt: {port} {size}")
+    for port, size in removed:
+        print(f"  removed: {port} {size}")
+    return changed
+
+
+if __name__ == "__main__":
+    ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+    csv_path = os.path.join(ROOT, 'data', 'market_input.csv')
+    json_path = os.path.join(ROOT, 'data', 'katsuo_market_data.json')
+
+    if '--full' in sys.argv[1:]:
+        # マニフェストを捨ててフル再生成からやり直す
+        manifest_path = default_manifest_path(json_path)
+        if os.path.exists(manifest_path):
+            os.remove(manifest_path)
+
+    changed = build_incremental(csv_path, json_path)
+    print(f"Incremental build finished: {len(changed)} series rebuilt.")
@@ -1,9 +1,63 @@
 import os
+import sys
 import json
+import numpy as np
 import pandas as pd
 from datetime import datetime, timedelta
 import random
 
+from market_rules import load_rules
+from post_build import finish_build
+from stream_ingest import detect_encoding
+
+
+def export_grouped(df, ports):
+    """
+    (港, サイズ, 日付) で1回だけソートし、連続するグループを走査してレコードを生成する。
+    港×サイズごとの絞り込みやDataFrameのコピーを作らないため、行数に対して線形で済む。
+    出力の並び（港は ports 順、サイズは出現順）は従来の save_to_json と同じ。
+    """
+    output = {port: {} for port in ports}
+    target = df[df['port'].isin(ports)]
+    if len(target) == 0:
+        return output
+
+    # 各港のサイズの並びは、従来の unique() と同じ「出現順」に揃える
+    size_order = {}
+    for port, size in target[['port', 'size']].drop_duplicates().itertuples(index=False):
+        size_order[(port, size)] = len(size_order)
+
+    ordered = target.sort_values(['port', 'size', 'date'], kind='mergesort')
+    port_values = ordered['port'].to_numpy()
+    size_values = ordered['size'].to_numpy()
+    dates = ordered['date'].tolist()
+    prices = ordered['price'].tolist()
+    volumes = ordered['volume'].tolist()
+    has_vessel = 'vessel' in ordered.columns
+    if has_vessel:
+        vessels = ordered['vessel'].tolist()
+        vessel_missing = ordered['vessel'].isna().to_numpy()
+
+    # (港, サイズ) が切り替わる位置をまとめて求める
+    change = (port_values[1:] != port_values[:-1]) | (size_values[1:] != size_values[:-1])
+    bounds = [0] + (np.flatnonzero(change) + 1).tolist() + [len(ordered)]
+
+    groups = []
+    for start, end in zip(bounds[:-1], bounds[1:]):
+        records = []
+        for i in range(start, end):
+            rec = {'date': dates[i], 'price': prices[i], 'volume': volumes[i]}
+            # 欠損値(nan)の船名は出力しない
+            if has_vessel and not vessel_missing[i]:
+                rec['vessel'] = vessels[i]
+            records.append(rec)
+        key = (port_values[start], size_values[start])
+        groups.append((size_order[key], key, records))
+
+    for _, (port, size), records in sorted(groups, key=lambda g: g[0]):
+        output[port][size] = records
+    return output
+
 class KatsuoDataFetcher:
     """
     鰹節原料（B巻網）の相場データを取得・管理するクラス
@@ -29,19 +83,19 @@ class KatsuoDataFetcher:
             pass
             
         if os.path.exists(csv_path):
+            # 日本語(cp932/shift_jis)が含まれる可能性を考慮し、先頭部分から文字コードを判定
+            # （失敗のたびに全体を読み直さない）
+            encoding = detect_encoding(csv_path)
+            if encoding is None:
+                print(f"Error loading CSV: {csv_path} の文字コードを判定できませんでした。")
+                return None
             try:
-                # 日本語(cp932/shift_jis)が含まれる可能性を考慮し、encodingを指定
-                df = pd.read_csv(csv_path, encoding='utf-8')
-                print(f"Loaded real data from {csv_path}")
+                df = pd.read_csv(csv_path, encoding=encoding)
+                print(f"Loaded real data from {csv_path} ({encoding})")
                 return df
             except Exception as e:
                 print(f"Error loading CSV: {e}")
-                # utf-8で失敗した場合は、日本語環境で一般的な cp932 を試す
-                try:
-                    df = pd.read_csv(csv_path, encoding='cp932')
-                    return df
-                except:
-                    return None
+                return None
         return None
 
     def save_to_json(self, df):
@@ -52,33 +106,24 @@ class KatsuoDataFetcher:
             print("No data to save.")
             return
 
-        output = {}
-        for port in self.ports:
-            port_data = df[df['port'] == port]
-            output[port] = {}
-            # その拠点のデータに含まれるユニークなサイズを取得
-            available_sizes = port_data['size'].unique()
-            for size in available_sizes:
-                size_data = port_data[port_data['size'] == size]
-                # 日付順にソート
-                size_data = size_data.sort_values('date')
-                cols = ['date', 'price', 'volume']
-                if 'vessel' in size_data.columns:
-                    cols.append('vessel')
-                
-                records = size_data[cols].to_dict(orient='records')
-                # 欠損値(nan)などのクリーンアップ
-                for rec in records:
-                    if 'vessel' in rec and pd.isna(rec['vessel']):
-                        del rec['vessel']
-                output[port][size] = records
-                
+        # 表示用JSONには data/market_rules.json のルールを適用済みで書き出す
+        output = load_rules().sanitize_market_data(export_grouped(df, self.ports))
+
         file_path = os.path.join(self.data_dir, "katsuo_market_data.json")
         with open(file_path, 'w', encoding='utf-8') as f:
             json.dump(output, f, ensure_ascii=False, indent=2)
         print(f"Data saved to {file_path}")
 
+        # 系列ファイル・スナップショット・入札予定・異常値検知・事前圧縮（rebuild_data_from_csv.py と共通）
+        finish_build(output, json_path=file_path)
+
 if __name__ == "__main__":
+    if '--stream' in sys.argv[1:]:
+        # 大きなCSV向け: pandas を使わず逐次処理で取り込む
+        from stream_ingest import main as stream_main
+        sys.argv = [arg for arg in sys.argv if arg != '--stream']
+        sys.exit(stream_main())
+
     fetcher = KatsuoDataFetcher()
     
     # 1. CSVからの実データ読み込み
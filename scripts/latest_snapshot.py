@@ -0,0 +1,71 @@
+"""
+最新相場スナップショット (data/latest_snapshot.json) の生成
+
+ダッシュボードの最新相場カード・全サイズ相場一覧・最終更新日は、
+全系列の履歴を読まなくてもこのファイルだけで初回描画できる。
+"""
+import json
+import os
+import sys
+
+sys.path.insert(0, os.path.dirname(__file__))
+from market_rules import load_rules
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+SNAPSHOT_PATH = os.path.join(ROOT, 'data', 'latest_snapshot.json')
+
+
+def build_latest_snapshot(data):
+    """
+    港 -> サイズ -> 日付順レコード の辞書から、サイズごとの最新値と前回比を求める
+    """
+    ports = {}
+    last_update = None
+    for port, sizes in data.items():
+        port_sizes = {}
+        latest_date = None
+        for size, records in sizes.items():
+            if not records:
+                continue
+            latest = records[-1]
+            previous = records[-2] if len(records) > 1 else None
+
+            entry = {
+                'date': latest['date'],
+                'price': latest['price'],
+                'volume': latest['volume'],
+            }
+            if latest.get('vessel'):
+                entry['vessel'] = latest['vessel']
+            entry['previous_date'] = previous['date'] if previous else None
+            entry['previous_price'] = previous['price'] if previous else None
+            entry['diff'] = round(latest['price'] - previous['price'], 2) if previous else None
+            port_sizes[size] = entry
+
+            if latest_date is None or latest['date'] > latest_date:
+                latest_date = latest['date']
+
+        ports[port] = {'latest_date': latest_date, 'sizes': port_sizes}
+        if latest_date and (last_update is None or latest_date > last_update):
+            last_update = latest_date
+
+    return {'last_update': last_update, 'ports': ports}
+
+
+def write_latest_snapshot(data, snapshot_path=SNAPSHOT_PATH, rules_fingerprint=None):
+    """rules_fingerprint は data に適用済みのルール（market_rules.py）"""
+    snapshot = build_latest_snapshot(data)
+    snapshot['rules_fingerprint'] = rules_fingerprint
+    tmp_path = f"{snapshot_path}.tmp"
+    with open(tmp_path, 'w', encoding='utf-8') as f:
+        json.dump(snapshot, f, ensure_ascii=False, indent=2)
+    os.replace(tmp_path, snapshot_path)
+    return snapshot
+
+
+if __name__ == "__main__":
+    json_path = os.path.join(ROOT, 'data', 'katsuo_market_data.json')
+    with open(json_path, 'r', encoding='utf-8') as f:
+        market_data = json.load(f)
+    snapshot = write_latest_snapshot(market_data, rules_fingerprint=load_rules().fingerprint)
+    print(f"Latest snapshot written to {SNAPSHOT_PATH} (last update: {snapshot['last_update']}).")
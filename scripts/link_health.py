@@ -0,0 +1,73 @@
+"""
+ニュース記事URLのリンク確認結果キャッシュ（update_news.py 用）
+
+URLごとに最後の確認結果・確認日時・次回確認日時を data/news_cache/link_health.json に保存する。
+次回確認日時を過ぎたURLだけを確認し直す。
+有効なリンクは確認のたびに間隔を倍にし（TTL → 2×TTL → 4×TTL ... 最大 MAX_TTL）、
+リンク切れのURLは TTL 後に確認し直す。
+
+TTL は環境変数 LINK_CHECK_TTL_HOURS（既定 12 時間）で変更できる。
+"""
+import json
+import os
+from datetime import datetime, timedelta
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+CACHE_PATH = os.path.join(ROOT, 'data', 'news_cache', 'link_health.json')
+TTL = timedelta(hours=float(os.getenv('LINK_CHECK_TTL_HOURS', '12')))
+MAX_TTL = timedelta(days=7)
+
+
+class LinkHealthCache:
+    def __init__(self, path=CACHE_PATH, ttl=TTL, max_ttl=MAX_TTL):
+        self.path = path
+        self.ttl = ttl
+        self.max_ttl = max_ttl
+        self.entries = {}
+        if os.path.exists(path):
+            try:
+                with open(path, 'r', encoding='utf-8') as f:
+                    self.entries = json.load(f)
+            except (OSError, ValueError):
+                self.entries = {}
+
+    def get(self, url, now=None):
+        """
+        期限内のキャッシュがあれば確認結果 (True / False) を、無ければ None を返す
+        """
+        entry = self.entries.get(url)
+        if not entry:
+            return None
+        now = now or datetime.now()
+        if datetime.fromisoformat(entry['next_check_at']) <= now:
+            return None
+        return entry['active']
+
+    def record(self, url, active, now=None):
+        now = now or datetime.now()
+        previous = self.entries.get(url, {})
+        if active:
+            # 続けて有効だったリンクほど確認間隔を延ばす
+            streak = previous.get('healthy_streak', 0) + 1 if previous.get('active') else 1
+            interval = min(self.ttl * (2 ** (streak - 1)), self.max_ttl)
+        else:
+            streak = 0
+            interval = self.ttl
+        self.entries[url] = {
+            'active': bool(active),
+            'checked_at': now.isoformat(timespec='seconds'),
+            'next_check_at': (now + interval).isoformat(timespec='seconds'),
+            'healthy_streak': streak,
+        }
+
+    def prune(self, urls):
+        """urls 以外のエントリを削除する（保存済み記事・今回の候補だけを残す）"""
+        keep = set(urls)
+        self.entries = {url: entry for url, entry in self.entries.items() if url in keep}
+
+    def save(self):
+        os.makedirs(os.path.dirname(self.path), exist_ok=True)
+        tmp_path = f"{self.path}.tmp"
+        with open(tmp_path, 'w', encoding='utf-8') as f:
+            json.dump(self.entries, f, ensure_ascii=False, indent=2, sort_keys=True)
+        os.replace(tmp_path, self.path)
@@ -0,0 +1,201 @@
+import csv
+import heapq
+import os
+from contextlib import contextmanager
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+MARKET_CSV = os.path.join(ROOT, 'data', 'market_input.csv')
+STORE_DIR = os.path.join(ROOT, 'data', 'market_store')
+
+FIELDNAMES = ['date', 'port', 'size', 'price', 'volume', 'vessel']
+
+
+def row_key(row):
+    """(日付, 港, サイズ, 船名) の重複判定キー"""
+    return (row[0], row[1], row[2], row[5] if len(row) > 5 else '')
+
+
+class MarketRepository:
+    """
+    market_input.csv の読み書きをまとめたクラス
+
+    - CSVは初回アクセス時に1回だけ読み込み、(日付, 港, サイズ, 船名) の索引を保持する
+    - 追加行だけをソートして既存行とマージするため、全件の再ソートは行わない
+    - 書き込みは一時ファイル経由の置き換え（アトミック）で、バッチごとに1回だけ
+    - 書き込んだら列指向ストア (market_store.py) も更新する。末尾への追加だけなら追加行を追記し、
+      途中への挿入・更新・削除があれば作り直す。store_dir を省略すると、
+      data/market_input.csv のときだけ data/market_store を更新する
+    """
+    def __init__(self, csv_path=MARKET_CSV, store_dir=None):
+        self.csv_path = csv_path
+        if store_dir is None and os.path.abspath(csv_path) == MARKET_CSV:
+            store_dir = STORE_DIR
+        self.store_dir = store_dir
+        self.header = list(FIELDNAMES)
+        self.rows = []
+        self.index = {}
+        self._loaded_stat = None
+        self._batch_depth = 0
+        self._dirty = False
+        self._appended = []  # 前回の書き込み以降に末尾へ追加した行
+        self._rewritten = False  # 前回の書き込み以降に途中の行を変えたか
+
+    # --- 読み込み ---
+
+    def _file_stat(self):
+        if not os.path.exists(self.csv_path):
+            return None
+        st = os.stat(self.csv_path)
+        return (st.st_mtime_ns, st.st_size)
+
+    def load(self):
+        """
+        CSVを読み込む。前回の読み込み・書き込みからファイルが変わっていなければ何もしない。
+        """
+        stat = self._file_stat()
+        if self._loaded_stat is not None and stat == self._loaded_stat:
+            return self
+
+        self.header = list(FIELDNAMES)
+        self.rows = []
+        if stat is not None:
+            with open(self.csv_path, 'r', encoding='utf-8', newline='') as f:
+                reader = csv.reader(f)
+                self.header = next(reader, None) or list(FIELDNAMES)
+                self.rows = [self._normalize(row) for row in reader if row]
+
+        # 既に並んでいれば再ソートしない（初回だけ並びを揃える）
+        self._appended = []
+        self._rewritten = False
+        if any(row_key(a) > row_key(b) for a, b in zip(self.rows, self.rows[1:])):
+            self.rows.sort(key=row_key)
+            self._rewritten = True
+        self.index = {row_key(row): row for row in self.rows}
+        self._loaded_stat = stat
+        return self
+
+    def _normalize(self, row):
+        if isinstance(row, dict):
+            row = [row.get(name, '') for name in self.header]
+        row = ['' if value is None else str(value) for value in row]
+        # 船名列のない古い行は空欄で埋める
+        if len(row) < len(self.header):
+            row = row + [''] * (len(self.header) - len(row))
+        return row
+
+    def __len__(self):
+        self.load()
+        return len(self.rows)
+
+    def __contains__(self, key):
+        self.load()
+        return key in self.index
+
+    def get(self, key):
+        self.load()
+        return self.index.get(key)
+
+    # --- 書き込み ---
+
+    @contextmanager
+    def batch(self):
+        """
+        with ブロック内の upsert / delete_where をまとめて1回で書き込む
+        """
+        self.load()
+        self._batch_depth += 1
+        try:
+            yield self
+        finally:
+            self._batch_depth -= 1
+            if self._batch_depth == 0 and self._dirty:
+                self.save()
+
+    def _changed(self):
+        self._dirty = True
+        if self._batch_depth == 0:
+            self.save()
+
+    def upsert(self, rows, overwrite=True):
+        """
+        行をまとめて追加する。既存キーの行は overwrite=True なら価格・数量を上書きし、
+        False ならそのまま残す。戻り値は (追加件数, 更新件数)。
+        """
+        self.load()
+        new_rows = {}
+        updated = 0
+        for row in rows:
+            row = self._normalize(row)
+            key = row_key(row)
+            existing = self.index.get(key)
+            if existing is not None:
+                if overwrite and existing != row:
+                    existing[:] = row
+                    updated += 1
+                    self._rewritten = True
+            elif key in new_rows:
+                if overwrite:
+                    new_rows[key] = row
+            else:
+                new_rows[key] = row
+
+        if new_rows:
+            # 追加分だけソートして既存の並びにマージする (O(n + k log k))
+            inserted = sorted(new_rows.values(), key=row_key)
+            if self.rows and row_key(inserted[0]) < row_key(self.rows[-1]):
+                self._rewritten = True
+            else:
+                self._appended.extend(inserted)
+            self.rows = list(heapq.merge(self.rows, inserted, key=row_key))
+            self.index.update(new_rows)
+
+        if new_rows or updated:
+            self._changed()
+        return len(new_rows), updated
+
+    def delete_where(self, predicate):
+        """predicate(row) が真になる行を削除し、削除件数を返す"""
+        self.load()
+        kept = [row for row in self.rows if not predicate(row)]
+        removed = len(self.rows) - len(kept)
+        if removed:
+            self.rows = kept
+            self.index = {row_key(row): row for row in kept}
+            self._rewritten = True
+            self._changed()
+        return removed
+
+    def save(self):
+        tmp_path = f"{self.csv_path}.tmp"
+        with open(tmp_path, 'w', encoding='utf-8', newline='') as f:
+            writer = csv.writer(f, lineterminator='\n')
+            writer.writerow(self.header)
+            writer.writerows(self.rows)
+        os.replace(tmp_path, self.csv_path)
+        previous_stat = self._loaded_stat
+        self._loaded_stat = self._file_stat()
+        self._dirty = False
+        self._sync_store(previous_stat)
+
+    def _sync_store(self, previous_stat):
+        appended, rewritten = self._appended, self._rewritten
+        self._appended = []
+        self._rewritten = False
+        if not self.store_dir:
+            return
+        try:
+            from market_store import MarketStore
+        except ImportError as e:
+            # numpy が無い環境では CSV だけを更新する（ストアは次回の取り込みで追いつく）
+            print(f"Market store not updated: {e}")
+            return
+        store = MarketStore(self.store_dir)
+        try:
+            if rewritten:
+                store.rebuild_from_csv(self.csv_path)
+            else:
+                rows = [dict(zip(self.header, row)) for row in appended]
+                store.append_csv_rows(self.csv_path, rows, previous_stat)
+        except (OSError, ValueError) as e:
+            # CSV は書き込み済み。ストアは次回の取り込みで作り直す
+            print(f"Market store not updated: {e}")
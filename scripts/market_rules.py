@@ -0,0 +1,103 @@
+"""
+港ごとの相場データのルール（data/market_rules.json）
+
+    allowed_sizes            相場として扱うサイズ（省略時は制限なし）
+    excluded_vessel_keywords 除外する船名のキーワード（1つの正規表現にまとめて照合する）
+    excluded_vessel_label    除外理由の表示名（例: 一本釣り船）
+    one_record_per_date      同じ日付・サイズは1件だけにする（同一日の縦線グラフ防止）
+
+ルールの追加・変更は JSON を編集するだけでよい。
+ビルド（rebuild_data_from_csv.py など）がルールを適用した表示用データを書き出し、
+series/index.json・latest_snapshot.json に適用したルールの fingerprint を記録する。
+ダッシュボードは market_rules.json から同じ fingerprint を計算し、一致すれば再適用しない。
+"""
+import hashlib
+import json
+import os
+import re
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+RULES_PATH = os.path.join(ROOT, 'data', 'market_rules.json')
+
+
+class PortRules:
+    def __init__(self, port, config):
+        self.port = port
+        sizes = config.get('allowed_sizes')
+        self.allowed_sizes = frozenset(sizes) if sizes is not None else None
+        self.excluded_vessel_keywords = tuple(config.get('excluded_vessel_keywords') or ())
+        self.excluded_vessel_label = config.get('excluded_vessel_label') or '除外対象の船'
+        self.one_record_per_date = bool(config.get('one_record_per_date'))
+        # 長いキーワードを先に並べ、船名1件につき1回の検索で済ませる
+        keywords = sorted(self.excluded_vessel_keywords, key=len, reverse=True)
+        self.vessel_matcher = re.compile('|'.join(map(re.escape, keywords))) if keywords else None
+
+    def size_allowed(self, size):
+        return self.allowed_sizes is None or size in self.allowed_sizes
+
+    def sanitize(self, size, records):
+        """1系列分のルール適用（対象外サイズ・空になった系列は None）"""
+        if not self.size_allowed(size):
+            return None
+        if self.vessel_matcher is not None:
+            records = [record for record in records if not self.excluded_vessel(record.get('vessel'))]
+        if self.one_record_per_date:
+            records = collapse_duplicate_dates(records)
+        return records or None
+
+    def excluded_vessel(self, vessel):
+        """除外キーワードを含む船名ならそのキーワード、含まなければ None"""
+        if self.vessel_matcher is None or not vessel:
+            return None
+        match = self.vessel_matcher.search(vessel)
+        return match.group(0) if match else None
+
+
+def collapse_duplicate_dates(records):
+    """同じ日付のレコードは数量の最も多いもの（同数なら先のもの）だけを残し、日付順に並べる"""
+    by_date = {}
+    for record in records:
+        existing = by_date.get(record['date'])
+        if existing is None or float(record.get('volume') or 0) > float(existing.get('volume') or 0):
+            by_date[record['date']] = record
+    return sorted(by_date.values(), key=lambda record: str(record['date']))
+
+
+def rules_fingerprint(config):
+    """
+    ルール内容の sha256（キー順・空白に依存しない正規化JSONから計算する）。
+    web/dashboard.js の rulesFingerprint と同じ値になる。
+    """
+    canonical = json.dumps(config, ensure_ascii=False, sort_keys=True, separators=(',', ':'))
+    return hashlib.sha256(canonical.encode('utf-8')).hexdigest()
+
+
+class MarketRules:
+    def __init__(self, config):
+        self.config = config
+        self.ports = {port: PortRules(port, rules) for port, rules in config.get('ports', {}).items()}
+        self.fingerprint = rules_fingerprint(config)
+
+    def for_port(self, port):
+        """港のルール（ルールの無い港は None）"""
+        return self.ports.get(port)
+
+    def sanitize_series(self, port, size, records):
+        port_rules = self.ports.get(port)
+        return records if port_rules is None else port_rules.sanitize(size, records)
+
+    def sanitize_market_data(self, data):
+        """港 -> サイズ -> レコード配列 にルールを適用した新しい辞書を返す"""
+        cleaned = {}
+        for port, sizes in data.items():
+            cleaned[port] = {}
+            for size, records in sizes.items():
+                records = self.sanitize_series(port, size, records)
+                if records is not None:
+                    cleaned[port][size] = records
+        return cleaned
+
+
+def load_rules(path=RULES_PATH):
+    with open(path, 'r', encoding='utf-8') as f:
+        return MarketRules(json.load(f))
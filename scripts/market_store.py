@@ -0,0 +1,378 @@
+"""
+追記専用の列指向相場ストア
+
+market_input.csv と同じ行を、列ごとのバイナリファイルへ追記していく。
+
+    data/market_store/
+        date.i4      日付（1970-01-01 からの日数, int32）
+        port.u2      港（辞書ID, uint16）
+        size.u2      サイズ（辞書ID, uint16）
+        vessel.u2    船名（辞書ID, uint16。0 は船名なし）
+        price.f4     単価（float32。空欄は NaN）
+        volume.f4    数量（float32。空欄は NaN）
+        price.dp.u1  単価の元の表記の小数桁数（"290.30" は 2、"2" は 0）
+        volume.dp.u1 数量の元の表記の小数桁数
+        dictionary.json  港・サイズ・船名の辞書
+        sources.json     取り込んだ CSV ごとの取り込み済みバイト数・その直前のブロックのハッシュ・更新日時とサイズ
+
+読み込みは np.memmap で行い、追記は新しい行の分だけファイル末尾に書き足す。
+行は CSV と同じく追記順にそのまま持つ（同じ (日付, 港, サイズ, 船名) の重複行も残す。
+重複の扱いは build_market_json が適用する market_rules.json に従う）。
+同じ CSV を再び取り込んだ場合は、前回の位置から後ろだけを読んで追記された行を取り込む。
+前回の位置より前が書き換えられていれば、ストアを自動で作り直す。
+MarketRepository が market_input.csv を書き込むたびにこのストアも更新する
+（末尾への追加なら追加行だけを追記し、途中への挿入・更新・削除なら作り直す）。
+ダッシュボード・検証スクリプトは従来どおり CSV / JSON を読むため、
+export_csv / export_json で既存形式に書き出す（数値は元の表記のまま戻る）。
+
+    python scripts/market_store.py import [data/market_input.csv]
+    python scripts/market_store.py export-csv [data/market_input.csv]
+    python scripts/market_store.py export-json [data/katsuo_market_data.json]
+"""
+import csv
+import hashlib
+import io
+import json
+import math
+import os
+import sys
+from datetime import date, timedelta
+
+import numpy as np
+
+sys.path.insert(0, os.path.dirname(__file__))
+from rebuild_data_from_csv import build_market_json
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+STORE_DIR = os.path.join(ROOT, 'data', 'market_store')
+
+FIELDNAMES = ['date', 'port', 'size', 'price', 'volume', 'vessel']
+COLUMNS = {
+    'date': np.dtype('<i4'),
+    'port': np.dtype('<u2'),
+    'size': np.dtype('<u2'),
+    'vessel': np.dtype('<u2'),
+    'price': np.dtype('<f4'),
+    'volume': np.dtype('<f4'),
+    'price_dp': np.dtype('u1'),
+    'volume_dp': np.dtype('u1'),
+}
+COLUMN_FILES = {
+    'date': 'date.i4',
+    'port': 'port.u2',
+    'size': 'size.u2',
+    'vessel': 'vessel.u2',
+    'price': 'price.f4',
+    'volume': 'volume.f4',
+    'price_dp': 'price.dp.u1',
+    'volume_dp': 'volume.dp.u1',
+}
+DICTIONARY_COLUMNS = ('port', 'size', 'vessel')
+TAIL_BLOCK = 4096  # 取り込み済みの範囲が変わっていないかを確かめる、取り込み位置の直前のバイト数
+EPOCH = date(1970, 1, 1)
+
+
+def date_to_days(value):
+    return (date.fromisoformat(value) - EPOCH).days
+
+
+def days_to_date(days):
+    return (EPOCH + timedelta(days=int(days))).isoformat()
+
+
+def _parse_number(value):
+    """数値の文字列を (値, 小数桁数) にする。元の表記に戻せない場合は ValueError"""
+    if value in (None, ''):
+        return math.nan, 0
+    digits = len(value.split('.', 1)[1]) if '.' in value else 0
+    number = float(value)
+    if _format_number(np.float32(number), digits) != value:
+        raise ValueError(f"{value!r} は float32 と小数桁数から元の表記に戻せません")
+    return number, digits
+
+
+def _format_number(value, digits):
+    # float32 の誤差 (316.0799...) を元の桁数の表記 ("316.08", "2", "290.30") に戻す
+    return '' if math.isnan(value) else f"{float(value):.{digits}f}"
+
+
+class MarketStore:
+    """
+    列指向・追記専用の相場ストア
+    """
+    def __init__(self, store_dir=STORE_DIR):
+        self.store_dir = store_dir
+        if not os.path.exists(store_dir):
+            os.makedirs(store_dir)
+
+        self.dictionary = self._load_dictionary()
+        self._ids = {
+            name: {value: i for i, value in enumerate(values)}
+            for name, values in self.dictionary.items()
+        }
+        self._repair()
+
+    # --- 辞書 ---
+
+    def _dictionary_path(self):
+        return os.path.join(self.store_dir, 'dictionary.json')
+
+    def _load_dictionary(self):
+        path = self._dictionary_path()
+        if os.path.exists(path):
+            with open(path, 'r', encoding='utf-8') as f:
+                return json.load(f)
+        # 船名は空欄が多いので ID 0 を「船名なし」に予約する
+        return {'port': [], 'size': [], 'vessel': ['']}
+
+    def _save_dictionary(self):
+        path = self._dictionary_path()
+        tmp_path = f"{path}.tmp"
+        with open(tmp_path, 'w', encoding='utf-8') as f:
+            json.dump(self.dictionary, f, ensure_ascii=False, indent=2)
+        os.replace(tmp_path, path)
+
+    def _encode(self, name, value):
+        ids = self._ids[name]
+        if value not in ids:
+            ids[value] = len(self.dictionary[name])
+            self.dictionary[name].append(value)
+        return ids[value]
+
+    # --- 列ファイル ---
+
+    def _column_path(self, name):
+        return os.path.join(self.store_dir, COLUMN_FILES[name])
+
+    def _column_rows(self, name):
+        path = self._column_path(name)
+        if not os.path.exists(path):
+            return 0
+        return os.path.getsize(path) // COLUMNS[name].itemsize
+
+    def __len__(self):
+        return min(self._column_rows(name) for name in COLUMNS)
+
+    def _repair(self):
+        """追記の途中で止まった場合に、列ごとの行数を最短の列に揃える"""
+        rows = len(self)
+        for name, dtype in COLUMNS.items():
+            path = self._column_path(name)
+            if self._column_rows(name) > rows or (os.path.exists(path) and os.path.getsize(path) % dtype.itemsize):
+                with open(path, 'r+b') as f:
+                    f.truncate(rows * dtype.itemsize)
+
+    def append(self, rows):
+        """
+        行（dict もしくは FIELDNAMES 順のリスト）を末尾に追記する。
+        書き込み量は追加行数に比例し、既存の行は読み直さない。
+        """
+        columns = {name: [] for name in COLUMNS}
+        dictionary_size = {name: len(values) for name, values in self.dictionary.items()}
+
+        for row in rows:
+            if not isinstance(row, dict):
+                row = dict(zip(FIELDNAMES, row))
+            columns['date'].append(date_to_days(row['date']))
+            columns['port'].append(self._encode('port', row['port']))
+            columns['size'].append(self._encode('size', row['size']))
+            columns['vessel'].append(self._encode('vessel', row.get('vessel') or ''))
+            for name in ('price', 'volume'):
+                number, digits = _parse_number(row.get(name))
+                columns[name].append(number)
+                columns[f"{name}_dp"].append(digits)
+
+        if not columns['date']:
+            return 0
+
+        # 辞書を先に確定させてから列を書き足す（列だけ残っても ID が解決できるように）
+        if any(len(values) != dictionary_size[name] for name, values in self.dictionary.items()):
+            self._save_dictionary()
+        for name, dtype in COLUMNS.items():
+            with open(self._column_path(name), 'ab') as f:
+                f.write(np.asarray(columns[name], dtype=dtype).tobytes())
+        return len(columns['date'])
+
+    def columns(self):
+        """全列を読み取り専用の memmap で返す"""
+        rows = len(self)
+        arrays = {}
+        for name, dtype in COLUMNS.items():
+            if rows == 0:
+                arrays[name] = np.empty(0, dtype=dtype)
+            else:
+                arrays[name] = np.memmap(self._column_path(name), dtype=dtype, mode='r', shape=(rows,))
+        return arrays
+
+    # --- 読み出し・書き出し ---
+
+    def iter_rows(self):
+        """全ての行を追記順に、CSV と同じ文字列形式の dict で返す"""
+        cols = self.columns()
+        names = {name: self.dictionary[name] for name in DICTIONARY_COLUMNS}
+        for i in range(len(cols['date'])):
+            yield {
+                'date': days_to_date(cols['date'][i]),
+                'port': names['port'][cols['port'][i]],
+                'size': names['size'][cols['size'][i]],
+                'price': _format_number(cols['price'][i], cols['price_dp'][i]),
+                'volume': _format_number(cols['volume'][i], cols['volume_dp'][i]),
+                'vessel': names['vessel'][cols['vessel'][i]],
+            }
+
+    # --- CSV の取り込み ---
+
+    def _sources_path(self):
+        return os.path.join(self.store_dir, 'sources.json')
+
+    def _load_sources(self):
+        path = self._sources_path()
+        if os.path.exists(path):
+            with open(path, 'r', encoding='utf-8') as f:
+                return json.load(f)
+        return {}
+
+    def _save_sources(self, sources):
+        path = self._sources_path()
+        tmp_path = f"{path}.tmp"
+        with open(tmp_path, 'w', encoding='utf-8') as f:
+            json.dump(sources, f, ensure_ascii=False, indent=2)
+        os.replace(tmp_path, path)
+
+    def _source_key(self, csv_path):
+        return os.path.relpath(os.path.abspath(csv_path), ROOT).replace(os.sep, '/')
+
+    def _source_record(self, csv_path, offset):
+        """取り込み位置・その直前のブロックのハッシュ・現在の更新日時とサイズ"""
+        start = max(0, offset - TAIL_BLOCK)
+        with open(csv_path, 'rb') as f:
+            f.seek(start)
+            block = f.read(offset - start)
+        stat = os.stat(csv_path)
+        return {
+            'offset': offset,
+            'tail_sha256': hashlib.sha256(block).hexdigest(),
+            'mtime_ns': stat.st_mtime_ns,
+            'size': stat.st_size,
+        }
+
+    def _same_prefix(self, f, source, size):
+        offset = source['offset']
+        if size < offset:
+            return False
+        start = max(0, offset - TAIL_BLOCK)
+        f.seek(start)
+        return hashlib.sha256(f.read(offset - start)).hexdigest() == source['tail_sha256']
+
+    def import_csv(self, csv_path):
+        """
+        CSV を取り込み、追記した行数を返す。前回の取り込み位置から後ろだけを読む。
+        前回の位置の直前のブロックが変わっていれば、前が書き換えられたとみなしてストアを作り直す
+        （ブロックより前だけを同じ長さで書き換えた場合は検出できないため、
+        書き換えを伴う書き込みでは MarketRepository が rebuild_from_csv を呼ぶ）。
+        """
+        key = self._source_key(csv_path)
+        sources = self._load_sources()
+        source = sources.get(key)
+        stat = os.stat(csv_path)
+        if source is not None and (source['mtime_ns'], source['size']) == (stat.st_mtime_ns, stat.st_size):
+            return 0
+
+        with open(csv_path, 'rb') as f:
+            if source is not None and not self._same_prefix(f, source, stat.st_size):
+                print(f"{csv_path} has changed before offset {source['offset']}; rebuilding {self.store_dir}.")
+                return self.rebuild_from_csv(csv_path)
+            offset = source['offset'] if source is not None else 0
+            f.seek(0)
+            header = f.readline()
+            f.seek(offset)
+            tail = f.read()
+
+        # 書きかけの最終行は次回に回す（改行まで揃った行だけを取り込む）
+        end = offset + tail.rfind(b'\n') + 1
+        added = 0
+        if end > offset:
+            fieldnames = next(csv.reader([header.decode('utf-8-sig')]))
+            body = tail[:end - offset].decode('utf-8')
+            reader = csv.DictReader(io.StringIO(body, newline=''), fieldnames=fieldnames)
+            if offset == 0:
+                next(reader, None)  # ヘッダー行
+            added = self.append(reader)
+        else:
+            end = offset
+
+        sources[key] = self._source_record(csv_path, end)
+        self._save_sources(sources)
+        return added
+
+    def rebuild_from_csv(self, csv_path):
+        """列ファイル・辞書・取り込み記録を空にして、CSV を先頭から取り込み直す"""
+        for name in COLUMNS:
+            open(self._column_path(name), 'wb').close()
+        self.dictionary = {'port': [], 'size': [], 'vessel': ['']}
+        self._ids = {name: {value: i for i, value in enumerate(values)} for name, values in self.dictionary.items()}
+        self._save_dictionary()
+        self._save_sources({})
+        return self.import_csv(csv_path)
+
+    def append_csv_rows(self, csv_path, rows, previous_stat):
+        """
+        CSV の末尾に rows を書き足した直後に呼ぶ（MarketRepository から）。
+        previous_stat は書き足す前の CSV の (更新日時, サイズ)。ストアがその時点の CSV を取り込み済みなら
+        rows だけを追記し、そうでなければ import_csv で取り込む。
+        """
+        key = self._source_key(csv_path)
+        sources = self._load_sources()
+        source = sources.get(key)
+        if source is None or previous_stat is None or (source['mtime_ns'], source['size']) != tuple(previous_stat):
+            return self.import_csv(csv_path)
+        added = self.append(rows)
+        sources[key] = self._source_record(csv_path, os.path.getsize(csv_path))
+        self._save_sources(sources)
+        return added
+
+    def export_csv(self, csv_path):
+        tmp_path = f"{csv_path}.tmp"
+        count = 0
+        with open(tmp_path, 'w', encoding='utf-8', newline='') as f:
+            writer = csv.DictWriter(f, fieldnames=FIELDNAMES, lineterminator='\n')
+            writer.writeheader()
+            for row in self.iter_rows():
+                writer.writerow(row)
+                count += 1
+        os.replace(tmp_path, csv_path)
+        return count
+
+    def export_json(self, json_path):
+        data = build_market_json(self.iter_rows())
+        tmp_path = f"{json_path}.tmp"
+        with open(tmp_path, 'w', encoding='utf-8') as f:
+            json.dump(data, f, ensure_ascii=False, indent=2)
+        os.replace(tmp_path, json_path)
+        return data
+
+
+def main():
+    if len(sys.argv) < 2 or sys.argv[1] not in ('import', 'export-csv', 'export-json'):
+        print(__doc__)
+        return 1
+
+    command = sys.argv[1]
+    store = MarketStore()
+    if command == 'import':
+        path = sys.argv[2] if len(sys.argv) > 2 else os.path.join(ROOT, 'data', 'market_input.csv')
+        added = store.import_csv(path)
+        print(f"Appended {added} rows to {store.store_dir} ({len(store)} rows in total).")
+    elif command == 'export-csv':
+        path = sys.argv[2] if len(sys.argv) > 2 else os.path.join(ROOT, 'data', 'market_input.csv')
+        count = store.export_csv(path)
+        print(f"Exported {count} rows to {path}")
+    else:
+        path = sys.argv[2] if len(sys.argv) > 2 else os.path.join(ROOT, 'data', 'katsuo_market_data.json')
+        store.export_json(path)
+        print(f"Exported market JSON to {path}")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
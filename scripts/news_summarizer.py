@@ -0,0 +1,211 @@
+"""
+ニュース要約の生成とキャッシュ（update_news.py 用）
+
+- 要約は「タイトル + 内容 + プロンプトの版」のハッシュをキーに data/news_cache/summaries.json へ保存し、
+  同じ記事がフィードに再び現れても要約し直さない
+- キャッシュに無い記事は複数件をまとめて1回のリクエストで要約し、JSONで受け取る
+  （JSONが読めなかった記事だけ1件ずつ要約し直す）
+- Gemini のクライアントは1回だけ作って使い回す
+- LLM の呼び出しは llm(prompt, json_mode) -> str の関数として差し替えられる（オフライン確認用）
+"""
+import hashlib
+import json
+import os
+import re
+from datetime import datetime, timedelta
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+CACHE_PATH = os.path.join(ROOT, 'data', 'news_cache', 'summaries.json')
+# プロンプトを変えたら上げる（古い要約はキャッシュに当たらなくなる）
+PROMPT_VERSION = 1
+BATCH_SIZE = 5
+# 最後に使われてからこの期間を過ぎた要約はキャッシュから消す
+CACHE_RETENTION = timedelta(days=30)
+MODEL_NAME = 'gemini-1.5-flash'
+
+NO_API_KEY = "要約不可（APIキー未設定）"
+FAILED = "要約の生成に失敗しました。"
+
+RULES = """
+【厳守事項】
+1. 元の文章にない「具体的な数値」「日付」「人名」などを絶対に勝手に捏造・補足しないでください。
+2. 専門用語（漁況、相場、物流2024年問題など）を適切に使用してください。
+3. 日本語で100文字程度で簡潔にまとめてください。
+"""
+
+
+def build_prompt(title, description):
+    return f"""
+あなたはプロの水産業界アナリストです。
+提供されたニュースの【タイトル】と【内容】に基づき、水産・カツオ相場・物流の観点から「専門的な要約」を1つだけ作成してください。
+{RULES}
+【タイトル】: {title}
+【内容】: {description}
+
+要約文のみを出力してください。
+"""
+
+
+def build_batch_prompt(items):
+    articles = "\n".join(
+        f"--- id: {i}\n【タイトル】: {item['title']}\n【内容】: {item['description']}"
+        for i, item in enumerate(items)
+    )
+    return f"""
+あなたはプロの水産業界アナリストです。
+以下の複数のニュースそれぞれについて、【タイトル】と【内容】に基づき、水産・カツオ相場・物流の観点から「専門的な要約」を1つずつ作成してください。
+{RULES}
+{articles}
+
+出力は次の形式のJSON配列のみとしてください（id は各ニュースの id）:
+[{{"id": 0, "summary": "要約文"}}]
+"""
+
+
+def summary_key(title, description):
+    payload = f"{PROMPT_VERSION}\n{title}\n{description}"
+    return hashlib.sha256(payload.encode('utf-8')).hexdigest()
+
+
+_model = None
+
+
+def gemini_llm(prompt, json_mode=False):
+    """
+    Gemini で生成する。クライアントは初回呼び出し時に1回だけ作る。
+    APIキーが無い場合は None を返す。
+    """
+    global _model
+    api_key = os.getenv("GEMINI_API_KEY")
+    if not api_key:
+        return None
+    if _model is None:
+        import google.generativeai as genai
+        genai.configure(api_key=api_key)
+        _model = genai.GenerativeModel(MODEL_NAME)
+
+    config = {'response_mime_type': 'application/json'} if json_mode else None
+    response = _model.generate_content(prompt, generation_config=config)
+    return response.text
+
+
+def parse_batch_response(text, count):
+    """バッチ要約の応答 (JSON配列) を id -> 要約 にする。読めない場合は空の辞書"""
+    text = re.sub(r'^```(?:json)?\s*|\s*```$', '', (text or '').strip())
+    try:
+        payload = json.loads(text)
+    except ValueError:
+        return {}
+    summaries = {}
+    for entry in payload if isinstance(payload, list) else []:
+        if not isinstance(entry, dict):
+            continue
+        try:
+            index = int(entry.get('id'))
+        except (TypeError, ValueError):
+            continue
+        summary = str(entry.get('summary') or '').strip()
+        if 0 <= index < count and summary:
+            summaries[index] = summary
+    return summaries
+
+
+class SummaryCache:
+    def __init__(self, path=CACHE_PATH):
+        self.path = path
+        self.entries = {}
+        if os.path.exists(path):
+            try:
+                with open(path, 'r', encoding='utf-8') as f:
+                    self.entries = json.load(f)
+            except (OSError, ValueError):
+                self.entries = {}
+
+    def get(self, key):
+        entry = self.entries.get(key)
+        if entry is None:
+            return None
+        entry['last_used'] = datetime.now().isoformat(timespec='seconds')
+        return entry['summary']
+
+    def put(self, key, summary):
+        now = datetime.now().isoformat(timespec='seconds')
+        self.entries[key] = {'summary': summary, 'created_at': now, 'last_used': now}
+
+    def prune(self, retention=CACHE_RETENTION):
+        limit = datetime.now() - retention
+        self.entries = {
+            key: entry for key, entry in self.entries.items()
+            if datetime.fromisoformat(entry['last_used']) >= limit
+        }
+
+    def save(self):
+        os.makedirs(os.path.dirname(self.path), exist_ok=True)
+        tmp_path = f"{self.path}.tmp"
+        with open(tmp_path, 'w', encoding='utf-8') as f:
+            json.dump(self.entries, f, ensure_ascii=False, indent=2, sort_keys=True)
+        os.replace(tmp_path, self.path)
+
+
+class NewsSummarizer:
+    def __init__(self, llm=gemini_llm, cache=None, batch_size=BATCH_SIZE):
+        self.llm = llm
+        self.cache = cache if cache is not None else SummaryCache()
+        self.batch_size = batch_size
+        self.requests = 0
+
+    def _call(self, prompt, json_mode=False):
+        self.requests += 1
+        return self.llm(prompt, json_mode)
+
+    def summarize_one(self, title, description):
+        try:
+            text = self._call(build_prompt(title, description))
+        except Exception as e:
+            print(f"AI Summarization Error: {e}")
+            return FAILED
+        if text is None:
+            return NO_API_KEY
+        return text.strip() or FAILED
+
+    def summarize_items(self, items):
+        """
+        items ({'title', 'description'}) の要約を同じ順のリストで返す。
+        生成できた要約だけをキャッシュする。
+        """
+        summaries = [None] * len(items)
+        pending = []
+        for i, item in enumerate(items):
+            cached = self.cache.get(summary_key(item['title'], item['description']))
+            if cached is not None:
+                summaries[i] = cached
+            else:
+                pending.append(i)
+
+        for start in range(0, len(pending), self.batch_size):
+            batch = pending[start:start + self.batch_size]
+            batch_items = [items[i] for i in batch]
+            results = {}
+            if len(batch) > 1:
+                try:
+                    text = self._call(build_batch_prompt(batch_items), json_mode=True)
+                except Exception as e:
+                    print(f"AI Summarization Error (batch): {e}")
+                    text = ''
+                if text is None:
+                    for i in batch:
+                        summaries[i] = NO_API_KEY
+                    continue
+                results = parse_batch_response(text, len(batch))
+
+            for offset, i in enumerate(batch):
+                summary = results.get(offset)
+                if summary is None:
+                    # バッチで得られなかった記事だけ1件ずつ要約する
+                    summary = self.summarize_one(items[i]['title'], items[i]['description'])
+                    if summary in (FAILED, NO_API_KEY):
+                        summaries[i] = summary
+                        continue
+                summaries[i] = summary
+                self.cache.put(summary_key(items[i]['title'], items[i]['description']), summary)
+        return summaries
@@ -0,0 +1,267 @@
+"""
+港ごとの相場取得アダプターと、全港をまとめて実行するランナー
+
+各港のアダプターは PortAdapter を継承し、
+    fetch()     ページ本文を取得する（URL のほか、ローカルのHTMLファイルも指定可）
+    parse()     本文から (日付, サイズ表記, 単価, 数量, 船名) を取り出す
+    normalize() サイズ表記を統一し（"4.5上" -> "4.5kg上"）、CSVの行形式にする
+を実装する。ランナーは全アダプターを並列に実行し、
+(日付, 港, サイズ, 船名) で重複を除いた行を MarketRepository で1回だけ書き込む。
+
+枕崎・山川は公開ページの URL が決まっていないため既定の URL を持たない。
+--url 枕崎=<URL またはHTMLファイル> で取得先を指定した港だけ実行する。
+
+    python scripts/port_scrapers.py --dry-run --url 枕崎=scripts/fixtures/makurazaki_sample.html
+    python scripts/port_scrapers.py --ports 焼津
+
+アダプターのテストは scripts/fixtures の保存済みページで行う（python -m unittest）。
+"""
+import argparse
+import os
+import re
+import sys
+import unicodedata
+from concurrent.futures import ThreadPoolExecutor
+
+import requests
+from bs4 import BeautifulSoup
+
+sys.path.insert(0, os.path.dirname(__file__))
+from market_repository import MarketRepository, row_key
+from yaizu_scraper import YAIZU_URL, parse_yaizu_html
+
+TIMEOUT = 10
+SIZE_LABEL_RE = re.compile(r'(\d+(?:\.\d+)?)\s*(?:kg)?\s*([上下])', re.IGNORECASE)
+DATE_PATTERNS = [
+    re.compile(r'(\d{4})[/-](\d{1,2})[/-](\d{1,2})'),
+    re.compile(r'(\d{4})年\s*(\d{1,2})月\s*(\d{1,2})日'),
+]
+VESSEL_RE = re.compile(r'[0-9０-９一二三四五六七八九十百第]*[^\s　0-9０-９]*?丸')
+
+
+def normalize_size_label(label):
+    """
+    サイズ表記を market_input.csv の形式に揃える
+    例: "4.5上" -> "4.5kg上", "１．８ｋｇ 下" -> "1.8kg下", "キワ・キメ　1.5上" -> "キワ・キメ 1.5kg上"
+    """
+    label = unicodedata.normalize('NFKC', label or '')
+    label = re.sub(r'\s+', ' ', label).strip()
+    return SIZE_LABEL_RE.sub(lambda m: f"{m.group(1)}kg{m.group(2)}", label)
+
+
+def normalize_vessel_name(name):
+    """船名を market_input.csv の形式に揃える（全角数字・空白を整え、先頭の「第」を除く）"""
+    name = re.sub(r'\s+', '', unicodedata.normalize('NFKC', name or ''))
+    return name[1:] if name.startswith('第') and len(name) > 1 and name[1].isdigit() else name
+
+
+def find_date(text):
+    for pattern in DATE_PATTERNS:
+        match = pattern.search(text)
+        if match:
+            year, month, day = (int(g) for g in match.groups())
+            return f"{year:04d}-{month:02d}-{day:02d}"
+    return None
+
+
+def to_number(text):
+    """数値以外を除いて float にする（読めなければ None）"""
+    text = re.sub(r'[^\d.]', '', unicodedata.normalize('NFKC', text or ''))
+    try:
+        return float(text) if text else None
+    except ValueError:
+        return None
+
+
+def _format_number(value):
+    return repr(round(float(value), 2))
+
+
+class PortAdapter:
+    """
+    港ごとの取得アダプターの基底クラス
+    """
+    port = None
+    url = None
+    encoding = 'utf-8'
+
+    def __init__(self, url=None, session=None):
+        if url:
+            self.url = url
+        self.session = session
+
+    def fetch(self):
+        if os.path.exists(self.url):
+            with open(self.url, 'r', encoding=self.encoding) as f:
+                return f.read()
+        session = self.session or requests
+        response = session.get(self.url, timeout=TIMEOUT)
+        response.raise_for_status()
+        response.encoding = self.encoding
+        return response.text
+
+    def parse(self, html):
+        """{'date', 'size', 'price', 'volume', 'vessel'} のリストを返す"""
+        raise NotImplementedError
+
+    def normalize(self, records):
+        rows = []
+        for rec in records:
+            size = normalize_size_label(rec.get('size'))
+            price = rec.get('price')
+            if not rec.get('date') or not size or not price or price <= 0:
+                continue
+            rows.append([
+                rec['date'], self.port, size, _format_number(price),
+                _format_number(rec.get('volume') or 0.0), normalize_vessel_name(rec.get('vessel')),
+            ])
+        return rows
+
+    def run(self):
+        return self.normalize(self.parse(self.fetch()))
+
+
+class YaizuAdapter(PortAdapter):
+    """焼津漁協の相場ページ（解析は yaizu_scraper と共通）"""
+    port = "焼津"
+    url = YAIZU_URL
+
+    def parse(self, html):
+        return [
+            {'date': rec['date'], 'size': rec['size'], 'price': rec['price'], 'volume': rec['volume']}
+            for rec in parse_yaizu_html(html, verbose=False)
+        ]
+
+
+class TableSheetAdapter(PortAdapter):
+    """
+    「船名の見出し + サイズ・単価・数量の表」を並べた相場表ページの共通解析。
+    列は見出し行の文字で判定する（列の順番や追加列に左右されない）。
+    """
+    size_headers = ('サイズ', '銘柄', '規格')
+    price_headers = ('単価', '価格', '平均', '値')
+    volume_headers = ('数量', '水揚', 'トン')
+    heading_tags = ['h2', 'h3', 'h4', 'caption', 'p', 'div']
+
+    def _column_index(self, headers, keywords):
+        for i, header in enumerate(headers):
+            if any(kw in header for kw in keywords):
+                return i
+        return None
+
+    def parse(self, html):
+        soup = BeautifulSoup(html, 'html.parser')
+        page_date = find_date(soup.get_text())
+        records = []
+        for table in soup.find_all('table'):
+            rows = table.find_all('tr')
+            if not rows:
+                continue
+            headers = [cell.get_text(strip=True) for cell in rows[0].find_all(['th', 'td'])]
+            size_col = self._column_index(headers, self.size_headers)
+            price_col = self._column_index(headers, self.price_headers)
+            volume_col = self._column_index(headers, self.volume_headers)
+            if size_col is None or price_col is None:
+                continue
+
+            # 船名・日付は表のキャプションか直前の見出しから取る
+            caption = table.find('caption')
+            heading = caption or table.find_previous_sibling(self.heading_tags)
+            heading_text = heading.get_text(" ", strip=True) if heading else ""
+            vessel_match = VESSEL_RE.search(unicodedata.normalize('NFKC', heading_text))
+            table_date = find_date(heading_text) or page_date
+
+            for row in rows[1:]:
+                cells = [cell.get_text(strip=True) for cell in row.find_all(['th', 'td'])]
+                if len(cells) <= max(size_col, price_col):
+                    continue
+                records.append({
+                    'date': table_date,
+                    'size': cells[size_col],
+                    'price': to_number(cells[price_col]),
+                    'volume': to_number(cells[volume_col]) if volume_col is not None and volume_col < len(cells) else 0.0,
+                    'vessel': vessel_match.group(0) if vessel_match else '',
+                })
+        return records
+
+
+class MakurazakiAdapter(TableSheetAdapter):
+    port = "枕崎"
+
+
+class YamagawaAdapter(TableSheetAdapter):
+    port = "山川"
+
+
+ADAPTERS = {cls.port: cls for cls in (YaizuAdapter, MakurazakiAdapter, YamagawaAdapter)}
+
+
+def _run_adapter(adapter):
+    try:
+        return adapter, adapter.run(), None
+    except Exception as e:
+        return adapter, [], e
+
+
+def run_adapters(adapters, workers=None):
+    """
+    アダプターを並列に実行し、(日付, 港, サイズ, 船名) で重複を除いた行と港ごとの件数を返す。
+    同じキーの行が複数あれば後のものを採用する。
+    """
+    merged = {}
+    results = {}
+    with ThreadPoolExecutor(max_workers=workers or max(len(adapters), 1)) as executor:
+        for adapter, rows, error in executor.map(_run_adapter, adapters):
+            if error is not None:
+                print(f"[{adapter.port}] Error: {error}")
+                results[adapter.port] = None
+                continue
+            results[adapter.port] = len(rows)
+            for row in rows:
+                merged[row_key(row)] = row
+    return sorted(merged.values(), key=row_key), results
+
+
+def main():
+    parser = argparse.ArgumentParser(description='各港の相場ページを並列に取得して market_input.csv に反映する')
+    parser.add_argument('--ports', default=','.join(ADAPTERS), help='実行する港（カンマ区切り）')
+    parser.add_argument('--url', action='append', default=[], metavar='港=URL',
+                        help='港ごとの取得先（URL またはHTMLファイル）。複数指定可')
+    parser.add_argument('--dry-run', action='store_true', help='CSVを更新せずに取得結果だけ表示する')
+    args = parser.parse_args()
+
+    urls = {}
+    for item in args.url:
+        port, _, url = item.partition('=')
+        urls[port.strip()] = url.strip()
+
+    adapters = []
+    for port in [p.strip() for p in args.ports.split(',') if p.strip()]:
+        if port not in ADAPTERS:
+            print(f"Unknown port: {port}")
+            return 1
+        adapter = ADAPTERS[port](urls.get(port))
+        if not adapter.url:
+            print(f"[{port}] 取得先が未設定のためスキップします（--url {port}=... で指定）")
+            continue
+        adapters.append(adapter)
+    if not adapters:
+        print("No adapters to run.")
+        return 1
+
+    rows, results = run_adapters(adapters)
+    for port, count in results.items():
+        print(f"[{port}] {'failed' if count is None else f'{count} rows'}")
+
+    if args.dry_run:
+        for row in rows:
+            print(','.join(row))
+        return 0
+
+    added, updated = MarketRepository().upsert(rows)
+    print(f"market_input.csv: {added} rows added, {updated} rows updated.")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
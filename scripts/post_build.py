@@ -0,0 +1,57 @@
+"""
+katsuo_market_data.json を書き出した後の共通処理
+
+    1. 系列ファイル (data/series/<港>/<サイズ>.json・index.json)
+    2. 最新相場スナップショット (data/latest_snapshot.json)
+    3. 入札予定の月別分割 (data/bids) と、そこから書き出す data/bid_schedule.json
+    4. 異常値の検知（レポートを書くだけで、検知結果や失敗でビルドは止めない）
+    5. run_dashboard.py から配信する事前圧縮ファイル (.gz / .br)
+
+rebuild_data_from_csv.py・katsuo_fetcher.py・stream_ingest.py のどれで相場データを更新しても、
+ダッシュボードが読むファイルが同じように揃うよう、この関数を呼ぶ。
+"""
+import json
+import os
+import sys
+
+sys.path.insert(0, os.path.dirname(__file__))
+from market_rules import load_rules
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+MARKET_JSON = os.path.join(ROOT, 'data', 'katsuo_market_data.json')
+
+
+def finish_build(market_data=None, rules=None, json_path=MARKET_JSON, series_written=False):
+    """
+    market_data は書き出した表示用データ（省略時は json_path から読む）。
+    series_written=True は系列ファイル・スナップショットを書き出し済みの場合（stream_ingest.py）。
+    """
+    from anomaly_detection import check_market_data
+    from bid_store import update_bid_store
+    from latest_snapshot import write_latest_snapshot
+    from precompress_data import precompress_data
+    from series_shards import write_series_shards
+
+    if market_data is None:
+        with open(json_path, mode='r', encoding='utf-8') as f:
+            market_data = json.load(f)
+    rules = rules or load_rules()
+
+    if not series_written:
+        # ダッシュボードの遅延読み込み用に、系列ごとのファイルと index.json も更新する
+        written = write_series_shards(market_data, rules_fingerprint=rules.fingerprint)
+        print(f"Series shards updated ({len(written)} files rewritten).")
+
+        # 最新相場カード・全サイズ一覧の初回描画用スナップショット
+        snapshot = write_latest_snapshot(market_data, rules_fingerprint=rules.fingerprint)
+        print(f"Latest snapshot updated (last update: {snapshot['last_update']}).")
+
+    # 入札予定の月別分割（bid_schedule.json の手での編集の取り込み・範囲外になった予定のアーカイブ・
+    # ストアの変更があれば bid_schedule.json の書き出し）
+    bid_months = update_bid_store()
+    print(f"Bid store updated ({len(bid_months)} archive months rewritten).")
+
+    check_market_data(market_data)
+
+    compressed = precompress_data()
+    print(f"Precompressed data files updated ({len(compressed)} files).")
@@ -0,0 +1,83 @@
+"""
+ダッシュボードが取得する data/ 配下のJSONを事前圧縮する (.json.gz / .json.br)
+
+run_dashboard.py はブラウザの Accept-Encoding に応じてこれらをそのまま返すため、
+リクエストのたびに圧縮し直す必要がない。
+元のJSONより古い圧縮ファイルは使われないので、作り直しを忘れても内容は古くならない。
+Brotli は brotli モジュールがある場合のみ作成する（pip install brotli）。
+
+    python scripts/precompress_data.py
+"""
+import gzip
+import os
+
+try:
+    import brotli
+except ImportError:
+    brotli = None
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+DATA_DIR = os.path.join(ROOT, 'data')
+# 小さいファイルは圧縮してもほとんど縮まない
+MIN_SIZE = 512
+# ダッシュボードが取得するファイル・フォルダ（内部の状態ファイルや復旧用のJSONは圧縮しない）
+SERVED_FILES = ('katsuo_market_data.json', 'latest_snapshot.json', 'bid_schedule.json', 'market_rules.json')
+SERVED_DIRS = ('series', 'bids')
+
+
+def is_fresh(source_path, compressed_path):
+    """圧縮ファイルが元ファイル以降に作られていれば True"""
+    return (os.path.exists(compressed_path)
+            and os.path.getmtime(compressed_path) >= os.path.getmtime(source_path))
+
+
+def _write_atomic(path, payload):
+    tmp_path = f"{path}.tmp"
+    with open(tmp_path, 'wb') as f:
+        f.write(payload)
+    os.replace(tmp_path, path)
+
+
+def precompress_file(path):
+    """1ファイルを圧縮し、書き出した圧縮ファイルのリストを返す"""
+    written = []
+    raw = None
+    encoders = [('.gz', lambda data: gzip.compress(data, compresslevel=9, mtime=0))]
+    if brotli is not None:
+        encoders.append(('.br', lambda data: brotli.compress(data, quality=11)))
+
+    for suffix, compress in encoders:
+        target = path + suffix
+        if is_fresh(path, target):
+            continue
+        if raw is None:
+            with open(path, 'rb') as f:
+                raw = f.read()
+        _write_atomic(target, compress(raw))
+        written.append(target)
+    return written
+
+
+def served_json_files(data_dir=DATA_DIR):
+    """ダッシュボードが取得するJSONのパス"""
+    paths = [os.path.join(data_dir, name) for name in SERVED_FILES]
+    for folder in SERVED_DIRS:
+        for dirpath, _, filenames in os.walk(os.path.join(data_dir, folder)):
+            paths.extend(os.path.join(dirpath, name) for name in sorted(filenames) if name.endswith('.json'))
+    return [path for path in paths if os.path.exists(path)]
+
+
+def precompress_data(data_dir=DATA_DIR):
+    written = []
+    for path in served_json_files(data_dir):
+        if os.path.getsize(path) < MIN_SIZE:
+            continue
+        written.extend(precompress_file(path))
+    return written
+
+
+if __name__ == "__main__":
+    written = precompress_data()
+    if brotli is None:
+        print("brotli モジュールがないため .br は作成しません（gzip のみ）。")
+    print(f"Precompressed {len(written)} files under {DATA_DIR}.")
@@ -1,45 +1,93 @@
 import csv
 import json
+import os
+import sys
 from collections import defaultdict
 
-def convert_csv_to_json(csv_path, json_path):
+sys.path.insert(0, os.path.dirname(__file__))
+from market_rules import load_rules
+
+
+def is_market_row(row):
+    """
+    JSONに載せる対象の行か（日付・港・価格・数量が揃っているか）
+    """
+    if not row['date'] or not row['port']:
+        return False
+
+    # 価格または数量が空の場合はスキップ
+    if not row['price'] or not row['volume']:
+        return False
+    return True
+
+
+def row_to_entry(row):
+    """
+    CSVの1行をJSON用のレコードに変換する（対象外の行は None）
+    """
+    if not is_market_row(row):
+        return None
+
+    entry = {
+        "date": row['date'],
+        "price": float(row['price']),
+        "volume": float(row['volume'])
+    }
+    if 'vessel' in row and row['vessel']:
+        entry['vessel'] = row['vessel']
+    return entry
+
+
+def build_market_json(rows, rules=None):
+    """
+    行(dict)のイテラブルから 港 -> サイズ -> 日付順レコード の辞書を作る。
+    data/market_rules.json のルール（対象外サイズ・除外船・同一日の重複）を適用済みで返す。
+    """
     data = defaultdict(lambda: defaultdict(list))
-    
-    with open(csv_path, mode='r', encoding='utf-8') as f:
-        reader = csv.DictReader(f)
-        for row in reader:
-            if not row['date'] or not row['port']:
-                continue
-                
-            port = row['port']
-            size = row['size']
-            
-            # 価格または数量が空の場合はスキップ
-            if not row['price'] or not row['volume']:
-                continue
-                
-            entry = {
-                "date": row['date'],
-                "price": float(row['price']),
-                "volume": float(row['volume'])
-            }
-            if 'vessel' in row and row['vessel']:
-                entry['vessel'] = row['vessel']
-            
-            data[port][size].append(entry)
-    
+    for row in rows:
+        entry = row_to_entry(row)
+        if entry is None:
+            continue
+        data[row['port']][row['size']].append(entry)
+
     # 日付順にソート
     for port in data:
         for size in data[port]:
             data[port][size].sort(key=lambda x: x['date'])
-            
+    return (rules or load_rules()).sanitize_market_data(data)
+
+
+def convert_csv_to_json(csv_path, json_path):
+    with open(csv_path, mode='r', encoding='utf-8') as f:
+        data = build_market_json(csv.DictReader(f))
+
     with open(json_path, mode='w', encoding='utf-8') as f:
         json.dump(data, f, ensure_ascii=False, indent=2)
 
 if __name__ == "__main__":
-    import os
     ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
     csv_path = os.path.join(ROOT, 'data', 'market_input.csv')
     json_path = os.path.join(ROOT, 'data', 'katsuo_market_data.json')
-    convert_csv_to_json(csv_path, json_path)
-    print("Market data JSON has been rebuilt from market_input.csv successfully.")
+
+    if '--incremental' in sys.argv[1:]:
+        # 変更のあった (港, サイズ) の系列だけを再生成する
+        from incremental_build import build_incremental
+        changed = build_incremental(csv_path, json_path)
+        print(f"Market data JSON has been updated incrementally ({len(changed)} series rebuilt).")
+    else:
+        convert_csv_to_json(csv_path, json_path)
+        print("Market data JSON has been rebuilt from market_input.csv successfully.")
+
+    # 列指向ストア (data/market_store) を market_input.csv に追いつかせる
+    # （MarketRepository 以外で CSV を書き換えた場合も。追記分だけを読み、前が変わっていれば作り直す）
+    try:
+        from market_store import MarketStore
+        store = MarketStore()
+        added = store.import_csv(csv_path)
+        print(f"Market store synced ({added} rows appended, {len(store)} rows in total).")
+    except ImportError as e:
+        print(f"Market store not updated: {e}")
+
+    # 系列ファイル・スナップショット・入札予定・異常値検知・事前圧縮（katsuo_fetcher.py と共通）
+    from post_build import finish_build
+    finish_build(json_path=json_path)
@@ -0,0 +1,335 @@
+"""
+入札予定（data/bids）と実際の相場（market_input.csv）の突き合わせ
+
+    船名   NFKC・空白・先頭の「第」を揃え（port_scrapers.normalize_vessel_name）、
+           「(南方)」などの括弧書きと異体字（常磐丸 / 常盤丸）を除いて比較する。
+           相場側の船名が省略形（「永盛丸」「81源福」）でも、同じ港の入札予定の船名に
+           1つだけ当てはまれば同じ船とみなす。
+    サイズ 入札のカテゴリ（B カツオ / PS キワ・キメ など）から魚種だけを取り出し、
+           サイズ表記（port_scrapers.normalize_size_label）と合わせて比較する。
+
+船名・サイズの表記は種類が少ないため、最初に表記ごとの比較キーを1回だけ求めて索引にする。
+相場の行は (港, 船名キー, 日付) のハッシュ表にまとめ、入札予定ごとに入札日の前後
+window 日を引くだけで突き合わせる（入札・相場の件数に対して線形）。
+
+結果は船ごとの 入札数量 / 実際の数量・単価 の表として data/bid_reconciliation.json に書き出す。
+
+    python scripts/reconcile_bids.py [--window 2] [--vessel 岬洋丸] [--csv /tmp/reconciliation.csv]
+"""
+import argparse
+import csv
+import json
+import os
+import re
+import sys
+from datetime import date, datetime, timedelta
+
+sys.path.insert(0, os.path.dirname(__file__))
+from bid_store import BIDS_DIR, LEGACY_PATH, BidStore
+from market_repository import MARKET_CSV, MarketRepository
+from port_scrapers import normalize_size_label, normalize_vessel_name
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+REPORT_PATH = os.path.join(ROOT, 'data', 'bid_reconciliation.json')
+DEFAULT_WINDOW = 2
+
+# 同じ船の表記ゆれとして扱う異体字
+VESSEL_VARIANTS = str.maketrans({'磐': '盤'})
+BRACKET_RE = re.compile(r'\(.*?\)')
+SIZE_RE = re.compile(r'^(.*?)\s*(\d+(?:\.\d+)?(?:-\d+(?:\.\d+)?)?)kg([上下])(.*)$')
+# 入札のカテゴリ・相場のサイズの接頭辞 -> 魚種（カツオは空欄）
+SPECIES = (('キメジ', 'キメジ'), ('メバチ', 'メバチ'), ('キワ', 'キワ・キメ'), ('キメ', 'キワ・キメ'), ('ダルマ', 'ダルマ'),
+           ('B品', 'B品'))
+
+
+def vessel_key(name):
+    """船名の比較キー（'55 岬洋丸' と '55岬洋丸'、'51日光丸(南方)' と '51日光丸' は同じキー）"""
+    return BRACKET_RE.sub('', normalize_vessel_name(name)).translate(VESSEL_VARIANTS)
+
+
+def size_label(key):
+    """比較キーの表示名（'キワ・キメ|1.5kg上' -> 'キワ・キメ 1.5kg上'）"""
+    species, size = key.split('|', 1)
+    return f"{species} {size}" if species else size
+
+
+def species_of(text):
+    for keyword, species in SPECIES:
+        if keyword in text:
+            return species
+    return ''
+
+
+def size_key(label, category=''):
+    """
+    サイズの比較キー（'キワ・キメ|1.5kg上' など。カツオは '|1.8kg上'）。
+    'キメジ 3kg下' と 'キメジ3.0kg下' は同じキー。サイズとして読めない表記は None。
+    """
+    label = BRACKET_RE.sub('', normalize_size_label(label))
+    match = SIZE_RE.match(label)
+    if not match:
+        return None
+    prefix, weight, side, suffix = match.groups()
+    weight = '-'.join(f"{float(part):.1f}" for part in weight.split('-'))
+    return f"{species_of(category + prefix)}|{weight}kg{side}{suffix.strip()}"
+
+
+class LookupIndex:
+    """表記 -> 比較キー の索引（表記ごとに1回だけ正規化する）"""
+    def __init__(self):
+        self.vessels = {}
+        self.sizes = {}
+        self.aliases = {}
+
+    def vessel(self, name):
+        key = self.vessels.get(name)
+        if key is None:
+            key = self.vessels[name] = vessel_key(name)
+        return key
+
+    def size(self, label, category=''):
+        cache_key = (label, category)
+        if cache_key not in self.sizes:
+            self.sizes[cache_key] = size_key(label, category)
+        return self.sizes[cache_key]
+
+    def add_aliases(self, market_keys, bid_keys):
+        """
+        相場側の船名キーのうち入札予定に無いものを、同じ港の入札予定の船名キーに対応付ける。
+        market_keys・bid_keys は (港, 船名キー) の集合。候補が1つに決まらないものは対応付けない。
+        """
+        by_port = {}
+        for port, key in bid_keys:
+            by_port.setdefault(port, []).append(key)
+        for port, key in market_keys - bid_keys:
+            if len(key) < 2:
+                continue
+            candidates = [bid_key for bid_key in by_port.get(port, ()) if key in bid_key]
+            if len(candidates) == 1:
+                self.aliases[(port, key)] = candidates[0]
+
+    def resolve(self, port, key):
+        return self.aliases.get((port, key), key)
+
+
+def load_bids(bids_dir=BIDS_DIR, legacy_path=LEGACY_PATH):
+    """月別分割ストアの全件（無ければ bid_schedule.json）"""
+    if os.path.exists(os.path.join(bids_dir, 'index.json')):
+        return BidStore(bids_dir).iter_bids()
+    with open(legacy_path, 'r', encoding='utf-8') as f:
+        return json.load(f)
+
+
+def _to_float(value):
+    try:
+        return float(value)
+    except (TypeError, ValueError):
+        return None
+
+
+def build_market_table(rows, lookup):
+    """
+    相場の行を (港, 船名キー, 日付) -> サイズキー -> {'volume', 'amount', 'priced_volume'} にまとめる。
+    船名の無い行・サイズとして読めない行は除く。
+    """
+    table = {}
+    for row in rows:
+        row_date, port, size, price, volume, vessel = row[:6]
+        if not vessel:
+            continue
+        key = lookup.size(size)
+        if key is None:
+            continue
+        cell = table.setdefault((port, lookup.vessel(vessel), row_date), {}).setdefault(
+            key, {'volume': 0.0, 'amount': 0.0, 'priced_volume': 0.0})
+        volume, price = _to_float(volume) or 0.0, _to_float(price)
+        cell['volume'] += volume
+        if price is not None and volume > 0:
+            cell['amount'] += price * volume
+            cell['priced_volume'] += volume
+    return table
+
+
+def _window_offsets(window):
+    """入札日に近い順（0, +1, -1, +2, -2, ...）"""
+    offsets = [0]
+    for days in range(1, window + 1):
+        offsets += [days, -days]
+    return offsets
+
+
+def reconcile(bids, market_rows, window=DEFAULT_WINDOW):
+    """
+    入札予定と相場の行を突き合わせ、{'vessels': [船ごとの表], 'unmatched': [相場の無い入札予定]} を返す。
+    入札日から window 日以内で最も近い日付の、同じ港・同じ船の相場を実績とする。
+    """
+    lookup = LookupIndex()
+    table = build_market_table(market_rows, lookup)
+    bid_keys = {(bid.get('port'), lookup.vessel(bid.get('vessel_name'))) for bid in bids}
+    lookup.add_aliases({(port, key) for port, key, _ in table}, bid_keys)
+    # 省略形の船名で記録された相場を、入札予定の船名キーにまとめ直す
+    if lookup.aliases:
+        merged = {}
+        for (port, key, row_date), sizes in table.items():
+            target = merged.setdefault((port, lookup.resolve(port, key), row_date), {})
+            for size, cell in sizes.items():
+                if size in target:
+                    for field in ('volume', 'amount', 'priced_volume'):
+                        target[size][field] += cell[field]
+                else:
+                    target[size] = dict(cell)
+        table = merged
+
+    offsets = _window_offsets(window)
+    vessels = {}
+    unmatched = []
+    for bid in sorted(bids, key=lambda b: (b.get('bid_date') or '', b.get('id') or '')):
+        port, key = bid.get('port'), lookup.vessel(bid.get('vessel_name'))
+        try:
+            bid_date = date.fromisoformat(bid.get('bid_date') or '')
+        except ValueError:
+            bid_date = None
+        market_date = realized = None
+        for days in offsets if bid_date else ():
+            candidate = (bid_date + timedelta(days=days)).isoformat()
+            realized = table.get((port, key, candidate))
+            if realized:
+                market_date = candidate
+                break
+
+        entry = vessels.setdefault(key, {
+            'vessel': key, 'names': [], 'bids': 0, 'matched': 0,
+            'bid_volume': 0.0, 'realized_volume': 0.0, 'rows': [], '_realized_keys': set(),
+        })
+        if bid.get('vessel_name') not in entry['names']:
+            entry['names'].append(bid.get('vessel_name'))
+        entry['bids'] += 1
+        if realized is None:
+            unmatched.append({k: bid.get(k) for k in ('id', 'vessel_name', 'port', 'bid_date')})
+        else:
+            entry['matched'] += 1
+
+        sizes = {}
+        for item in bid.get('items') or []:
+            size = lookup.size(item.get('size'), item.get('category') or '')
+            if size is None:
+                continue
+            cell = sizes.setdefault(size, {'bid_volume': 0.0, 'bid_by_type': {}})
+            volume = _to_float(item.get('volume')) or 0.0
+            cell['bid_volume'] += volume
+            item_type = item.get('type') or ''
+            cell['bid_by_type'][item_type] = cell['bid_by_type'].get(item_type, 0.0) + volume
+
+        # 同じ船・同じ日の相場を2件の入札予定が指す場合、実績は船の合計に1回だけ数える
+        count_realized = realized is not None and (port, market_date) not in entry['_realized_keys']
+        if realized is not None:
+            entry['_realized_keys'].add((port, market_date))
+        for size in sorted(sizes.keys() | (realized or {}).keys()):
+            bid_cell = sizes.get(size, {})
+            market_cell = (realized or {}).get(size)
+            row = {
+                'bid_id': bid.get('id'),
+                'port': port,
+                'bid_date': bid.get('bid_date'),
+                'market_date': market_date,
+                'size': size_label(size),
+                'bid_volume': round(bid_cell.get('bid_volume', 0.0), 2),
+                'bid_by_type': {t: round(v, 2) for t, v in bid_cell.get('bid_by_type', {}).items()},
+                'realized_volume': round(market_cell['volume'], 2) if market_cell else None,
+                'realized_price': (
+                    round(market_cell['amount'] / market_cell['priced_volume'], 1)
+                    if market_cell and market_cell['priced_volume'] else None
+                ),
+            }
+            entry['rows'].append(row)
+            entry['bid_volume'] += row['bid_volume']
+            if count_realized and market_cell:
+                entry['realized_volume'] += market_cell['volume']
+
+    result = []
+    for entry in sorted(vessels.values(), key=lambda e: e['vessel']):
+        del entry['_realized_keys']
+        entry['bid_volume'] = round(entry['bid_volume'], 2)
+        entry['realized_volume'] = round(entry['realized_volume'], 2)
+        result.append(entry)
+    return {'vessels': result, 'unmatched': unmatched, 'aliases': {
+        f"{port}|{key}": target for (port, key), target in sorted(lookup.aliases.items())
+    }}
+
+
+def write_report(result, window, path=REPORT_PATH):
+    report = {
+        'generated_at': datetime.now().isoformat(timespec='seconds'),
+        'window_days': window,
+        'bids': sum(entry['bids'] for entry in result['vessels']),
+        'matched': sum(entry['matched'] for entry in result['vessels']),
+    }
+    report.update(result)
+    tmp_path = f"{path}.tmp"
+    with open(tmp_path, 'w', encoding='utf-8') as f:
+        json.dump(report, f, ensure_ascii=False, indent=2)
+    os.replace(tmp_path, path)
+    return report
+
+
+def write_csv(result, path):
+    fieldnames = ['vessel', 'bid_id', 'port', 'bid_date', 'market_date', 'size',
+                  'bid_volume', '入札', '相対', 'realized_volume', 'realized_price']
+    with open(path, 'w', encoding='utf-8', newline='') as f:
+        writer = csv.DictWriter(f, fieldnames=fieldnames, lineterminator='\n')
+        writer.writeheader()
+        for entry in result['vessels']:
+            for row in entry['rows']:
+                writer.writerow({
+                    'vessel': entry['vessel'],
+                    **{k: row[k] for k in ('bid_id', 'port', 'bid_date', 'market_date', 'size', 'bid_volume')},
+                    '入札': row['bid_by_type'].get('入札', ''),
+                    '相対': row['bid_by_type'].get('相対', ''),
+                    'realized_volume': '' if row['realized_volume'] is None else row['realized_volume'],
+                    'realized_price': '' if row['realized_price'] is None else row['realized_price'],
+                })
+
+
+def _format(value):
+    return '-' if value is None else f"{value:g}"
+
+
+def print_tables(result, vessel=None):
+    for entry in result['vessels']:
+        if vessel and vessel_key(vessel) not in entry['vessel']:
+            continue
+        print(f"\n## {entry['vessel']} ({' / '.join(entry['names'])}) "
+              f"入札予定 {entry['bids']}件・実績あり {entry['matched']}件  "
+              f"入札 {entry['bid_volume']:g}t / 実績 {entry['realized_volume']:g}t")
+        print("bid_date   market_date port size              bid(t)  realized(t)  price")
+        for row in entry['rows']:
+            print(f"{row['bid_date']} {row['market_date'] or '-':<11} {row['port']} {row['size']:<16} "
+                  f"{row['bid_volume']:>7g} {_format(row['realized_volume']):>12} {_format(row['realized_price']):>6}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description='入札予定と実際の相場を船ごとに突き合わせる')
+    parser.add_argument('--window', type=int, default=DEFAULT_WINDOW, help='入札日の前後何日までの相場を実績とみなすか')
+    parser.add_argument('--vessel', help='表示する船名（一部でも可）')
+    parser.add_argument('--csv', help='突き合わせ結果をCSVにも書き出す')
+    args = parser.parse_args()
+
+    bids = load_bids()
+    rows = MarketRepository(MARKET_CSV).load().rows
+    result = reconcile(bids, rows, window=args.window)
+    report = write_report(result, args.window)
+    if args.csv:
+        write_csv(result, args.csv)
+
+    print_tables(result, args.vessel)
+    print(f"\n{report['matched']} / {report['bids']} bids matched to market rows (window ±{args.window} days).")
+    for alias, target in report['aliases'].items():
+        print(f"  alias: {alias} -> {target}")
+    for bid in report['unmatched']:
+        print(f"  unmatched: {bid['bid_date']} {bid['port']} {bid['vessel_name']} ({bid['id']})")
+    print(f"Report written to {REPORT_PATH}")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,315 @@
+"""
+バックアップのスナップショットをまたいだ行単位の索引と、時点指定の復元・差分
+
+data/backups の全スナップショット（新形式・旧形式フォルダの両方）の market_input.csv を
+(日付, 港, サイズ, 船名) の行として data/backups/row_index.json に索引する。
+索引は CSV の内容ハッシュごとに1回だけ作り、同じ内容のスナップショットは行を共有する。
+新しいスナップショットが増えたときは、増えた分の CSV だけを読む。
+
+    python scripts/restore_engine.py list
+    python scripts/restore_engine.py series --at 2026-05-13 --port 焼津 --size 4.5kg上
+    python scripts/restore_engine.py diff 20260512_082248 20260518_153344
+    python scripts/restore_engine.py restore --from 20260423_081235 --output /tmp/restored.csv
+    python scripts/restore_engine.py restore --from 20260423_081235    # market_input.csv に不足行だけ追加
+
+final_restore.py / merge_recovered_data.py / safe_merge.py で行っていた復元・マージを置き換える。
+"""
+import argparse
+import csv
+import io
+import json
+import os
+import sys
+from datetime import datetime
+
+sys.path.insert(0, os.path.dirname(__file__))
+from backup_manager import BACKUP_ROOT, BackupStore
+from market_repository import MarketRepository, row_key
+from stream_ingest import PORTS
+
+INDEX_PATH = os.path.join(BACKUP_ROOT, 'row_index.json')
+CSV_NAME = 'market_input.csv'
+INDEX_VERSION = 1
+
+
+def parse_csv_bytes(data):
+    """バックアップの CSV（UTF-8 / cp932）を [date, port, size, price, volume, vessel] の行にする"""
+    try:
+        text = data.decode('utf-8-sig')
+    except UnicodeDecodeError:
+        text = data.decode('cp932', errors='replace')
+    rows = []
+    for row in csv.reader(io.StringIO(text)):
+        if not row or row[0] == 'date':
+            continue
+        row = (row + [''] * 6)[:6]
+        rows.append(row)
+    return rows
+
+
+def _to_float(value):
+    try:
+        return float(value)
+    except (TypeError, ValueError):
+        return None
+
+
+def same_values(a, b):
+    """価格・数量が同じか（"40" と "40.0" は同じとみなす）"""
+    for i in (3, 4):
+        fa, fb = _to_float(a[i]), _to_float(b[i])
+        if (fa, fb) == (None, None):
+            if a[i] != b[i]:
+                return False
+        elif fa != fb:
+            return False
+    return True
+
+
+def parse_time(value):
+    """'2026-05-12' / '2026-05-12T08:30' / スナップショットID ('20260512_082248') を datetime にする"""
+    for fmt in ('%Y%m%d_%H%M%S', '%Y-%m-%d', '%Y-%m-%dT%H:%M', '%Y-%m-%dT%H:%M:%S', '%Y-%m-%d %H:%M'):
+        try:
+            parsed = datetime.strptime(value, fmt)
+        except ValueError:
+            continue
+        # 日付だけの指定はその日の終わりまでを含める
+        if fmt == '%Y-%m-%d':
+            parsed = parsed.replace(hour=23, minute=59, second=59)
+        return parsed
+    raise ValueError(f"Unknown time format: {value}")
+
+
+class RestoreIndex:
+    """
+    索引ファイルの形式:
+        rows:      行の一覧（同じ行は1回だけ）
+        contents:  CSV の sha256 -> rows の番号のリスト
+        snapshots: スナップショットID -> {'created_at', 'csv': sha256}
+    """
+    def __init__(self, store=None, path=INDEX_PATH):
+        self.store = store or BackupStore()
+        self.path = path
+        self.rows = []
+        self.contents = {}
+        self.snapshots = {}
+        self._row_ids = {}
+        self._load()
+
+    def _load(self):
+        if not os.path.exists(self.path):
+            return
+        try:
+            with open(self.path, 'r', encoding='utf-8') as f:
+                data = json.load(f)
+        except (OSError, ValueError):
+            return
+        if data.get('version') != INDEX_VERSION:
+            return
+        self.rows = data['rows']
+        self.contents = data['contents']
+        self.snapshots = data['snapshots']
+        self._row_ids = {tuple(row): i for i, row in enumerate(self.rows)}
+
+    def save(self):
+        os.makedirs(os.path.dirname(self.path), exist_ok=True)
+        tmp_path = f"{self.path}.tmp"
+        with open(tmp_path, 'w', encoding='utf-8') as f:
+            json.dump({
+                'version': INDEX_VERSION,
+                'rows': self.rows,
+                'contents': self.contents,
+                'snapshots': self.snapshots,
+            }, f, ensure_ascii=False, separators=(',', ':'))
+        os.replace(tmp_path, self.path)
+
+    def _row_id(self, row):
+        key = tuple(row)
+        row_id = self._row_ids.get(key)
+        if row_id is None:
+            row_id = len(self.rows)
+            self.rows.append(list(row))
+            self._row_ids[key] = row_id
+        return row_id
+
+    def update(self):
+        """
+        未索引のスナップショットを索引に加え、消えたスナップショットを除く。
+        (追加したスナップショット数, 新たに読んだ CSV 数) を返す。
+        """
+        current = set(self.store.snapshot_ids())
+        added = 0
+        parsed = 0
+        for snapshot_id in sorted(current - set(self.snapshots)):
+            manifest = self.store.load_manifest(snapshot_id)
+            entry = manifest['files'].get(CSV_NAME)
+            if entry is None:
+                continue
+            digest = entry['sha256']
+            if digest not in self.contents:
+                data = self.store.read_file(snapshot_id, CSV_NAME, manifest)
+                self.contents[digest] = [self._row_id(row) for row in parse_csv_bytes(data)]
+                parsed += 1
+            self.snapshots[snapshot_id] = {'created_at': manifest['created_at'], 'csv': digest}
+            added += 1
+
+        removed = set(self.snapshots) - current
+        for snapshot_id in removed:
+            del self.snapshots[snapshot_id]
+        if added or removed:
+            self._compact()
+            self.save()
+        return added, parsed
+
+    def _compact(self):
+        """どのスナップショットからも参照されなくなった CSV・行を索引から除く"""
+        used = {info['csv'] for info in self.snapshots.values()}
+        self.contents = {digest: ids for digest, ids in self.contents.items() if digest in used}
+        live = sorted({i for ids in self.contents.values() for i in ids})
+        if len(live) == len(self.rows):
+            return
+        remap = {old: new for new, old in enumerate(live)}
+        self.rows = [self.rows[i] for i in live]
+        self.contents = {digest: [remap[i] for i in ids] for digest, ids in self.contents.items()}
+        self._row_ids = {tuple(row): i for i, row in enumerate(self.rows)}
+
+    # --- 問い合わせ ---
+
+    def snapshot_list(self):
+        """(スナップショットID, 作成日時, 行数) を古い順に返す"""
+        return [
+            (snapshot_id, info['created_at'], len(self.contents[info['csv']]))
+            for snapshot_id, info in sorted(self.snapshots.items(), key=lambda item: (item[1]['created_at'], item[0]))
+        ]
+
+    def snapshot_at(self, when):
+        """when（datetime または文字列）時点で最新のスナップショットID（無ければ None）"""
+        if isinstance(when, str):
+            when = parse_time(when)
+        found = None
+        for snapshot_id, created_at, _ in self.snapshot_list():
+            if datetime.fromisoformat(created_at) <= when:
+                found = snapshot_id
+            else:
+                break
+        return found
+
+    def rows_at(self, snapshot_id):
+        """スナップショットの行を (日付, 港, サイズ, 船名) -> 行 の辞書で返す"""
+        digest = self.snapshots[snapshot_id]['csv']
+        return {row_key(self.rows[i]): self.rows[i] for i in self.contents[digest]}
+
+    def series_at(self, when, port, size):
+        """when 時点の (港, サイズ) の系列を日付順の行リストで返す"""
+        snapshot_id = self.snapshot_at(when)
+        if snapshot_id is None:
+            return None, []
+        rows = [row for row in self.rows_at(snapshot_id).values() if row[1] == port and row[2] == size]
+        return snapshot_id, sorted(rows, key=row_key)
+
+    def diff(self, old_id, new_id):
+        """{'added': [行], 'removed': [行], 'changed': [(旧行, 新行)]} を返す"""
+        if self.snapshots[old_id]['csv'] == self.snapshots[new_id]['csv']:
+            return {'added': [], 'removed': [], 'changed': []}
+        old, new = self.rows_at(old_id), self.rows_at(new_id)
+        return {
+            'added': [new[key] for key in sorted(new.keys() - old.keys())],
+            'removed': [old[key] for key in sorted(old.keys() - new.keys())],
+            'changed': [
+                (old[key], new[key]) for key in sorted(old.keys() & new.keys())
+                if not same_values(old[key], new[key])
+            ],
+        }
+
+    def merged_rows(self, snapshot_ids, ports=PORTS):
+        """
+        複数スナップショットの行を1つにまとめる（同じキーは後に指定したスナップショットの行を採用）。
+        港名が文字化けしている行など、ports 以外の行は除く。
+        """
+        merged = {}
+        for snapshot_id in snapshot_ids:
+            for key, row in self.rows_at(snapshot_id).items():
+                if row[1] in ports:
+                    merged[key] = row
+        return [merged[key] for key in sorted(merged)]
+
+
+def resolve_snapshot(index, value):
+    """スナップショットIDか時刻の指定をスナップショットIDにする"""
+    if value in index.snapshots:
+        return value
+    snapshot_id = index.snapshot_at(value)
+    if snapshot_id is None:
+        raise KeyError(f"No snapshot at or before {value}")
+    return snapshot_id
+
+
+def main():
+    parser = argparse.ArgumentParser(description='バックアップの行単位の索引・時点指定の復元・差分')
+    sub = parser.add_subparsers(dest='command', required=True)
+    sub.add_parser('list', help='索引済みスナップショットの一覧')
+    series_parser = sub.add_parser('series', help='指定時点の系列を表示')
+    series_parser.add_argument('--at', required=True, help='日時またはスナップショットID')
+    series_parser.add_argument('--port', required=True)
+    series_parser.add_argument('--size', required=True)
+    diff_parser = sub.add_parser('diff', help='2時点の行単位の差分')
+    diff_parser.add_argument('old', help='日時またはスナップショットID')
+    diff_parser.add_argument('new', help='日時またはスナップショットID')
+    restore_parser = sub.add_parser('restore', help='スナップショットの行をマージして復元')
+    restore_parser.add_argument('--from', dest='sources', action='append', required=True,
+                                help='日時またはスナップショットID（複数指定可。後の指定が優先）')
+    restore_parser.add_argument('--output', help='書き出すCSV（省略時は market_input.csv に不足行だけ追加）')
+    args = parser.parse_args()
+
+    index = RestoreIndex()
+    added, parsed = index.update()
+    if added:
+        print(f"Indexed {added} snapshots ({parsed} CSV files read).")
+
+    try:
+        if args.command == 'list':
+            for snapshot_id, created_at, count in index.snapshot_list():
+                print(f"{snapshot_id}\t{created_at}\t{count} rows")
+
+        elif args.command == 'series':
+            snapshot_id, rows = index.series_at(args.at, args.port, args.size)
+            if snapshot_id is None:
+                print(f"No snapshot at or before {args.at}")
+                return 1
+            print(f"# {args.port} {args.size} as of {snapshot_id} ({len(rows)} rows)")
+            for row in rows:
+                print(','.join(row))
+
+        elif args.command == 'diff':
+            old_id, new_id = resolve_snapshot(index, args.old), resolve_snapshot(index, args.new)
+            result = index.diff(old_id, new_id)
+            print(f"# {old_id} -> {new_id}: {len(result['added'])} added, "
+                  f"{len(result['removed'])} removed, {len(result['changed'])} changed")
+            for row in result['added']:
+                print('+ ' + ','.join(row))
+            for row in result['removed']:
+                print('- ' + ','.join(row))
+            for before, after in result['changed']:
+                print(f"~ {','.join(after)} (was {before[3]} / {before[4]})")
+
+        elif args.command == 'restore':
+            snapshot_ids = [resolve_snapshot(index, value) for value in args.sources]
+            rows = index.merged_rows(snapshot_ids)
+            if args.output:
+                if os.path.exists(args.output):
+                    print(f"Output already exists: {args.output}")
+                    return 1
+                added_rows, _ = MarketRepository(args.output).upsert(rows)
+                print(f"Wrote {added_rows} rows from {', '.join(snapshot_ids)} to {args.output}")
+            else:
+                # 現在のCSVの値は上書きせず、失われた行だけを戻す
+                added_rows, _ = MarketRepository().upsert(rows, overwrite=False)
+                print(f"market_input.csv: {added_rows} rows restored from {', '.join(snapshot_ids)}.")
+    except (KeyError, ValueError) as e:
+        print(f"Error: {e.args[0]}")
+        return 1
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,130 @@
+"""
+表示用JSONを (港, サイズ) ごとのファイルに分割して書き出す
+
+    data/series/index.json          各系列の最新レコード・期間・件数・ハッシュ
+    data/series/<港>/<サイズ>.json    系列ごとのレコード配列
+
+ダッシュボードは index.json を先に読み、必要な系列だけを後から取得する。
+内容が変わっていない系列のファイルは書き直さない。
+index.json の rules_fingerprint は系列に適用済みのルール（market_rules.py）を表す。
+"""
+import hashlib
+import json
+import os
+import shutil
+import sys
+
+sys.path.insert(0, os.path.dirname(__file__))
+from market_rules import load_rules
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+SERIES_DIR = os.path.join(ROOT, 'data', 'series')
+INDEX_VERSION = 1
+
+
+def _dump_compact(data):
+    return json.dumps(data, ensure_ascii=False, separators=(',', ':'))
+
+
+def series_file_name(name):
+    """サイズ名をファイル名に使えるようにする（パス区切りだけ置き換える）"""
+    return name.replace('/', '／').replace('\\', '＼') + '.json'
+
+
+def series_hash(records):
+    return hashlib.sha256(_dump_compact(records).encode('utf-8')).hexdigest()
+
+
+def load_index(series_dir=SERIES_DIR):
+    path = os.path.join(series_dir, 'index.json')
+    if not os.path.exists(path):
+        return None
+    try:
+        with open(path, 'r', encoding='utf-8') as f:
+            index = json.load(f)
+    except (OSError, ValueError):
+        return None
+    return index if index.get('version') == INDEX_VERSION else None
+
+
+def build_series_entry(path, records, digest):
+    return {
+        'path': path,
+        'count': len(records),
+        'first_date': records[0]['date'] if records else None,
+        'last_date': records[-1]['date'] if records else None,
+        'latest': records[-1] if records else None,
+        'previous': records[-2] if len(records) > 1 else None,
+        'hash': digest,
+    }
+
+
+def write_series_shards(data, series_dir=SERIES_DIR, rules_fingerprint=None):
+    """
+    data (港 -> サイズ -> レコード配列) を系列ファイルと index.json に書き出す。
+    戻り値は書き直した (港, サイズ) のリスト。
+    """
+    series = ((port, size, records) for port, sizes in data.items() for size, records in sizes.items())
+    return write_series_stream(series, series_dir, rules_fingerprint)
+
+
+def write_series_stream(series, series_dir=SERIES_DIR, rules_fingerprint=None):
+    """
+    (港, サイズ, レコード配列) を1系列ずつ受け取って書き出す。
+    全系列を同時にメモリへ載せずに済む（stream_ingest.py 用）。
+    """
+    old_index = load_index(series_dir) or {'ports': {}}
+    old_ports = old_index.get('ports', {})
+
+    ports = {}
+    written = []
+    last_update = None
+    for port, size, records in series:
+        ports.setdefault(port, {})
+        digest = series_hash(records)
+        rel_path = f"{port}/{series_file_name(size)}"
+        file_path = os.path.join(series_dir, port, series_file_name(size))
+
+        old = old_ports.get(port, {}).get(size)
+        if not old or old.get('hash') != digest or not os.path.exists(file_path):
+            os.makedirs(os.path.dirname(file_path), exist_ok=True)
+            with open(file_path, 'w', encoding='utf-8') as f:
+                f.write(_dump_compact(records))
+            written.append((port, size))
+
+        entry = build_series_entry(rel_path, records, digest)
+        ports[port][size] = entry
+        if entry['last_date'] and (last_update is None or entry['last_date'] > last_update):
+            last_update = entry['last_date']
+
+    # 無くなった系列のファイルを片付ける
+    for port, sizes in old_ports.items():
+        for size, old in sizes.items():
+            if size in ports.get(port, {}):
+                continue
+            stale = os.path.join(series_dir, old['path'])
+            if os.path.exists(stale):
+                os.remove(stale)
+        port_dir = os.path.join(series_dir, port)
+        if port not in ports and os.path.isdir(port_dir) and not os.listdir(port_dir):
+            shutil.rmtree(port_dir)
+
+    index_path = os.path.join(series_dir, 'index.json')
+    tmp_path = f"{index_path}.tmp"
+    with open(tmp_path, 'w', encoding='utf-8') as f:
+        json.dump({
+            'version': INDEX_VERSION,
+            'last_update': last_update,
+            'rules_fingerprint': rules_fingerprint,
+            'ports': ports,
+        }, f, ensure_ascii=False, indent=2)
+    os.replace(tmp_path, index_path)
+    return written
+
+
+if __name__ == "__main__":
+    json_path = os.path.join(ROOT, 'data', 'katsuo_market_data.json')
+    with open(json_path, 'r', encoding='utf-8') as f:
+        market_data = json.load(f)
+    written = write_series_shards(market_data, rules_fingerprint=load_rules().fingerprint)
+    print(f"Series shards written to {SERIES_DIR} ({len(written)} files updated).")
@@ -0,0 +1,295 @@
+"""
+大きな相場CSVを逐次処理で取り込む（katsuo_fetcher.py のストリーミング版）
+
+pandas で全件を読み込む代わりに、CSVを1行ずつ読み、
+検証・価格フィルタ（10円〜600円）・日付の正規化をジェネレータで行う。
+行は (港, サイズ) ごとの一時ファイルに書き出しておき、
+最後に1系列ずつ読み戻し、data/market_rules.json のルールを適用して
+katsuo_market_data.json・系列ファイル・最新スナップショットへ書き出す。
+メモリに載るのは一度に1系列分だけなので、CSV全体の大きさには依存しない。
+
+    python scripts/stream_ingest.py [CSVパス] [--json 出力JSONパス]
+"""
+import argparse
+import codecs
+import csv
+import json
+import math
+import os
+import sys
+import tempfile
+from datetime import datetime
+
+sys.path.insert(0, os.path.dirname(__file__))
+from latest_snapshot import SNAPSHOT_PATH, write_latest_snapshot
+from market_rules import load_rules
+from series_shards import SERIES_DIR, write_series_stream
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+PORTS = ["焼津", "枕崎", "山川"]
+MIN_PRICE = 10
+MAX_PRICE = 600
+# 文字コード判定に使う先頭のバイト数
+SAMPLE_SIZE = 64 * 1024
+CANDIDATE_ENCODINGS = ('utf-8-sig', 'cp932')
+DATE_FORMATS = ('%Y-%m-%d', '%Y/%m/%d')
+# 系列ごとにこの行数が溜まったら一時ファイルへ書き出す
+SPILL_ROWS = 1000
+
+
+def detect_encoding(path, sample_size=SAMPLE_SIZE):
+    """
+    ファイル先頭のサンプルだけで文字コードを判定する（UTF-8 → cp932 の順）。
+    どちらでも読めない場合は None。
+    """
+    with open(path, 'rb') as f:
+        sample = f.read(sample_size)
+    for encoding in CANDIDATE_ENCODINGS:
+        try:
+            # サンプル末尾で多バイト文字が切れていてもエラーにしない
+            codecs.getincrementaldecoder(encoding)().decode(sample, final=False)
+            return encoding
+        except UnicodeDecodeError:
+            continue
+    return None
+
+
+def read_rows(csv_path, encoding):
+    with open(csv_path, 'r', encoding=encoding, newline='') as f:
+        yield from csv.DictReader(f)
+
+
+def parse_date(value):
+    for fmt in DATE_FORMATS:
+        try:
+            return datetime.strptime((value or '').strip(), fmt).strftime('%Y-%m-%d')
+        except ValueError:
+            continue
+    return None
+
+
+def _parse_float(value):
+    """空欄は NaN、数値でなければ None"""
+    if value is None or value.strip() == '':
+        return math.nan
+    try:
+        return float(value)
+    except ValueError:
+        return None
+
+
+def clean_rows(rows, ports=PORTS, stats=None):
+    """
+    CSVの行(dict)を検証し、(港, サイズ, レコード) を返すジェネレータ。
+    katsuo_fetcher.py の __main__ と同じく、価格が 10円〜600円 の範囲外の行は除外する。
+    """
+    ports = set(ports)
+    for row in rows:
+        if stats is not None:
+            stats['read'] += 1
+        port = row.get('port')
+        if port not in ports:
+            continue
+        price = _parse_float(row.get('price'))
+        volume = _parse_float(row.get('volume'))
+        if price is None or volume is None or not (MIN_PRICE < price < MAX_PRICE):
+            continue
+        date = parse_date(row.get('date'))
+        if date is None:
+            continue
+
+        record = {'date': date, 'price': price, 'volume': volume}
+        if row.get('vessel'):
+            record['vessel'] = row['vessel']
+        if stats is not None:
+            stats['kept'] += 1
+        yield port, row.get('size') or '', record
+
+
+class SeriesSpill:
+    """
+    (港, サイズ) ごとに行を一時ファイルへ追記しておき、後で1系列ずつ読み戻す
+    """
+    def __init__(self, tmp_dir, spill_rows=SPILL_ROWS):
+        self.tmp_dir = tmp_dir
+        self.spill_rows = spill_rows
+        self.series = {}
+
+    def add(self, port, size, record):
+        key = (port, size)
+        state = self.series.get(key)
+        if state is None:
+            state = self.series[key] = {
+                'path': os.path.join(self.tmp_dir, f"{len(self.series)}.jsonl"),
+                'buffer': [],
+                'first_date': record['date'],
+                'last_date': record['date'],
+                'in_order': True,
+            }
+        if record['date'] < state['last_date']:
+            state['in_order'] = False
+        state['first_date'] = min(state['first_date'], record['date'])
+        state['last_date'] = max(state['last_date'], record['date'])
+        state['buffer'].append(record)
+        if len(state['buffer']) >= self.spill_rows:
+            self._flush(state)
+
+    def _flush(self, state):
+        if not state['buffer']:
+            return
+        with open(state['path'], 'a', encoding='utf-8') as f:
+            for record in state['buffer']:
+                f.write(json.dumps(record, ensure_ascii=False))
+                f.write('\n')
+        state['buffer'] = []
+
+    def ordered_keys(self, ports=PORTS):
+        """
+        港は ports の順、サイズは日付順に並べたときの出現順
+        （katsuo_fetcher.py の export_grouped と同じ並び）
+        """
+        order = {port: i for i, port in enumerate(ports)}
+        return sorted(
+            self.series,
+            key=lambda key: (order[key[0]], self.series[key]['first_date'], key[1]),
+        )
+
+    def load(self, port, size):
+        """1系列分のレコードを日付順で返す（同じ日付はCSVの順のまま）"""
+        state = self.series[(port, size)]
+        records = []
+        if os.path.exists(state['path']):
+            with open(state['path'], 'r', encoding='utf-8') as f:
+                records = [json.loads(line) for line in f]
+        records.extend(state['buffer'])
+        if not state['in_order']:
+            records.sort(key=lambda r: r['date'])
+        return records
+
+
+class MarketJsonWriter:
+    """
+    katsuo_market_data.json を系列ごとに書き足していく。
+    出力は json.dump(..., ensure_ascii=False, indent=2) と同じ形式。
+    """
+    def __init__(self, json_path, ports=PORTS):
+        self.json_path = json_path
+        self.tmp_path = f"{json_path}.tmp"
+        self.ports = list(ports)
+        self.f = open(self.tmp_path, 'w', encoding='utf-8')
+        self.f.write('{')
+        self.next_port = 0
+        self.current_port = None
+        self.first_size = True
+
+    def _open_port(self, port):
+        self._close_port()
+        self.f.write(f"{',' if self.next_port else ''}\n  {json.dumps(port, ensure_ascii=False)}: {{")
+        self.current_port = port
+        self.next_port += 1
+        self.first_size = True
+
+    def _close_port(self):
+        if self.current_port is not None:
+            self.f.write('}' if self.first_size else '\n  }')
+            self.current_port = None
+
+    def add(self, port, size, records):
+        # 系列の無い港も空の {} として出力する
+        while self.current_port != port:
+            self._open_port(self.ports[self.next_port])
+        body = json.dumps(records, ensure_ascii=False, indent=2).replace('\n', '\n    ')
+        self.f.write(f"{'' if self.first_size else ','}\n    {json.dumps(size, ensure_ascii=False)}: {body}")
+        self.first_size = False
+
+    def close(self):
+        while self.next_port < len(self.ports):
+            self._open_port(self.ports[self.next_port])
+        self._close_port()
+        self.f.write('\n}' if self.ports else '}')
+        self.f.close()
+        os.replace(self.tmp_path, self.json_path)
+
+    def abort(self):
+        self.f.close()
+        if os.path.exists(self.tmp_path):
+            os.remove(self.tmp_path)
+
+
+def stream_ingest(csv_path, json_path, ports=PORTS, series_dir=SERIES_DIR, snapshot_path=SNAPSHOT_PATH, rules=None):
+    """
+    CSVを逐次処理で取り込み、JSON・系列ファイル・最新スナップショットを書き出す。
+    戻り値は {'encoding', 'read', 'kept', 'series'}（データが無い場合は None）。
+    """
+    encoding = detect_encoding(csv_path)
+    if encoding is None:
+        print(f"Error: {csv_path} の文字コードを判定できませんでした。")
+        return None
+
+    stats = {'encoding': encoding, 'read': 0, 'kept': 0, 'series': 0}
+    rules = rules or load_rules()
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        spill = SeriesSpill(tmp_dir)
+        for port, size, record in clean_rows(read_rows(csv_path, encoding), ports, stats):
+            spill.add(port, size, record)
+
+        if not spill.series:
+            print("No data to save.")
+            return None
+
+        # 最新スナップショットは各系列の末尾2件だけで作れる
+        tails = {}
+        writer = MarketJsonWriter(json_path, ports)
+
+        def iter_series():
+            for port, size in spill.ordered_keys(ports):
+                records = rules.sanitize_series(port, size, spill.load(port, size))
+                if records is None:
+                    continue
+                writer.add(port, size, records)
+                tails.setdefault(port, {})[size] = records[-2:]
+                stats['series'] += 1
+                yield port, size, records
+
+        try:
+            write_series_stream(iter_series(), series_dir, rules.fingerprint)
+        except BaseException:
+            writer.abort()
+            raise
+        writer.close()
+
+    write_latest_snapshot(tails, snapshot_path, rules.fingerprint)
+    return stats
+
+
+def main():
+    parser = argparse.ArgumentParser(description='相場CSVを逐次処理で取り込む')
+    parser.add_argument('csv_path', nargs='?', default=os.path.join(ROOT, 'data', 'market_input.csv'))
+    parser.add_argument('--json', dest='json_path', default=os.path.join(ROOT, 'data', 'katsuo_market_data.json'))
+    args = parser.parse_args()
+
+    if not os.path.exists(args.csv_path):
+        print(f"Error: {args.csv_path} not found.")
+        return 1
+
+    # 読み込みの前にバックアップを取得（データ破損対策）
+    try:
+        from backup_manager import create_backup
+        create_backup()
+    except ImportError:
+        pass
+
+    stats = stream_ingest(args.csv_path, args.json_path)
+    if stats is None:
+        return 1
+    print(f"Loaded {stats['kept']}/{stats['read']} rows from {args.csv_path} ({stats['encoding']}).")
+    print(f"Data saved to {args.json_path} ({stats['series']} series).")
+
+    # 入札予定・異常値検知・事前圧縮（系列ファイルとスナップショットは取り込みと同時に書き出し済み）
+    from post_build import finish_build
+    finish_build(json_path=args.json_path, series_written=True)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -1,10 +1,13 @@
 import os
 import json
 import feedparser
-import google.generativeai as genai
-import requests
 from datetime import datetime
-import time
+from concurrent.futures import Future
+
+from feed_index import CACHE_DIR, FEED_STATE_PATH, PENDING_PATH, SEEN_IDS_PATH, FeedState, SeenIndex, entry_id
+from fetch_pool import FetchPool
+from link_health import CACHE_PATH as LINK_CACHE_PATH, LinkHealthCache
+from news_summarizer import CACHE_PATH as SUMMARY_CACHE_PATH, FAILED, NO_API_KEY, NewsSummarizer, SummaryCache, gemini_llm
 
 # 設定: ニュース取得元 (RSSフィード)
 RSS_FEEDS = [
@@ -13,84 +16,151 @@ RSS_FEEDS = [
     "https://prtimes.jp/main/html/searchrlp/ct1/000000057/rss.xml", # PR TIMES 食品・飲料
 ]
 
-def check_url_active(url):
-    """URLが有効か（404等でないか）を確認する"""
-    try:
-        response = requests.head(url, timeout=5, allow_redirects=True)
-        return response.status_code == 200
-    except:
-        return False
-
-def summarize_with_strict_ai(title, description):
+def fetch_feeds(pool, urls, feed_state):
     """
-    AIに『要約のみ』を依頼し、捏造を厳禁する
+    RSSフィードを条件付きGETで並列に取得してエントリをまとめる（フィードの順は RSS_FEEDS のまま）。
+    前回から変わっていない (304) フィードは解析しない。
     """
-    api_key = os.getenv("GEMINI_API_KEY")
-    if not api_key:
-        return "要約不可（APIキー未設定）"
-
-    genai.configure(api_key=api_key)
-    model = genai.GenerativeModel('gemini-1.5-flash')
-
-    prompt = f"""
-あなたはプロの水産業界アナリストです。
-提供されたニュースの【タイトル】と【内容】に基づき、水産・カツオ相場・物流の観点から「専門的な要約」を1つだけ作成してください。
-
-【厳守事項】
-1. 元の文章にない「具体的な数値」「日付」「人名」などを絶対に勝手に捏造・補足しないでください。
-2. 専門用語（漁況、相場、物流2024年問題など）を適切に使用してください。
-3. 日本語で100文字程度で簡潔にまとめてください。
+    futures = [(url, pool.get(url, headers=feed_state.request_headers(url))) for url in urls]
+    entries = []
+    for url, future in futures:
+        response = future.result()
+        if response is not None and response.status_code == 304:
+            print(f"Feed not modified: {url}")
+            continue
+        if response is None or response.status_code != 200:
+            print(f"Skipping feed: {url}")
+            continue
+        feed_state.update(url, response)
+        feed = feedparser.parse(response.content)
+        entries.extend(feed.entries)
+    return entries
 
-【タイトル】: {title}
-【内容】: {description}
+def check_links(pool, link_cache, urls, probed):
+    """
+    リンク確認を開始して url -> Future を返す。
+    キャッシュが期限内のURLは確認せずにキャッシュの結果を使い、実際に確認したURLは probed に加える。
+    """
+    futures = {}
+    for url in urls:
+        if url in futures:
+            continue
+        cached = link_cache.get(url)
+        if cached is None:
+            futures[url] = pool.check_url(url)
+            probed.append(url)
+        else:
+            futures[url] = Future()
+            futures[url].set_result(cached)
+    return futures
 
-要約文のみを出力してください。
-"""
+def main(llm=gemini_llm, feeds=RSS_FEEDS, data_path="data/katsuo_news.json", cache_dir=CACHE_DIR):
+    """
+    llm は news_summarizer.gemini_llm と同じ形の関数（オフライン確認ではスタブを渡す）
+    cache_dir はフィード状態・処理済みID・リンク確認・要約のキャッシュを置くディレクトリ
+    （テストでは一時ディレクトリを渡し、data/news_cache を書き換えない）
+    """
+    def cache_file(path):
+        return os.path.join(cache_dir, os.path.basename(path))
 
-    try:
-        response = model.generate_content(prompt)
-        return response.text.strip()
-    except Exception as e:
-        print(f"AI Summarization Error: {e}")
-        return "要約の生成に失敗しました。"
+    # 既存データの読み込み
+    existing_data = []
+    if os.path.exists(data_path):
+        with open(data_path, "r", encoding="utf-8") as f:
+            existing_data = json.load(f)
+    # 旧形式のID（URL末尾から作っていた）を、URLのハッシュによるIDに揃える
+    for d in existing_data:
+        d['id'] = entry_id(d['url'])
 
-def main():
-    print("Fetching news from RSS...")
-    entries = []
-    for url in RSS_FEEDS:
-        feed = feedparser.parse(url)
-        entries.extend(feed.entries)
+    feed_state = FeedState(cache_file(FEED_STATE_PATH))
+    seen = SeenIndex(cache_file(SEEN_IDS_PATH), cache_file(PENDING_PATH))
+    # 要約に失敗したまま掲載されている記事は、もう一度要約に回す
+    for d in existing_data:
+        if d.get('summary') in (FAILED, NO_API_KEY) and d['id'] not in seen.pending:
+            seen.defer({k: d.get(k, '') for k in ('id', 'date', 'title', 'source', 'url', 'description')})
+    pool = FetchPool()
+    link_cache = LinkHealthCache(cache_file(LINK_CACHE_PATH))
+    probed = []
+    # 既存データのリンク切れチェックは、フィード取得と同時に始めておく
+    # （前回の確認から期限が切れたURLだけを確認する）
+    print("Fetching news from RSS and checking existing links...")
+    existing_checks = check_links(pool, link_cache, [d['url'] for d in existing_data], probed)
+    entries = fetch_feeds(pool, feeds, feed_state)
     
     # キーワードフィルタリング（カツオ、水産、物流、食品など）
     keywords = ["カツオ", "かつお", "漁", "水産", "相場", "物流", "食品", "だし", "出汁", "魚"]
-    relevant_items = []
+    # 前回要約できなかった記事を先に処理する
+    relevant_items = list(seen.pending.values())
+    run_ids = {item['id'] for item in relevant_items}
     
     for entry in entries:
+        # 処理済みの記事・同じ回で別のフィードに重複して載っている記事は飛ばす
+        item_id = entry_id(entry.get('link'))
+        if item_id in seen or item_id in run_ids:
+            seen.touch(item_id)
+            continue
+        run_ids.add(item_id)
+
         title = entry.get('title', '')
         summary_text = entry.get('summary', '') or entry.get('description', '')
         
         # タイトルか本文にキーワードが含まれているか
         if any(kw in title or kw in summary_text for kw in keywords):
-            # 重複回避用の簡易ID
             relevant_items.append({
-                "id": "rss_" + entry.link.split('/')[-1].replace('.', '_'),
+                "id": item_id,
                 "date": datetime.now().strftime("%Y-%m-%d"),
                 "title": title, # タイトルは原本をそのまま使用
                 "source": "RSS Feed",
                 "url": entry.link, # URLも原本をそのまま使用
                 "description": summary_text
             })
+        else:
+            seen.add(item_id)
 
-    # 最新の5件に絞って要約を生成
+    # 最新の5件に絞り、リンクを並列に確認してから要約を生成
     new_results = []
     print(f"Processing {min(len(relevant_items), 5)} relevant items...")
-    
-    for item in relevant_items[:5]:
-        if not check_url_active(item['url']):
-            print(f"Skipping broken link: {item['url']}")
+    candidates = relevant_items[:5]
+    new_checks = check_links(pool, link_cache, [item['url'] for item in candidates], probed)
+    active_items = []
+    for item in candidates:
+        status = new_checks[item['url']].result()
+        # リンク切れの記事は次回以降処理しない（締め切りで未確認の記事は次回に回す）
+        if status is False:
+            seen.add(item['id'])
+        if status is not True:
+            print(f"Skipping {'broken' if status is False else 'unchecked'} link: {item['url']}")
             continue
-            
-        print(f"Summarizing: {item['title']}")
+        active_items.append(item)
+
+    # 既存データからも404を除去（締め切りまでに確認できなかったものは残す）
+    valid_existing = [d for d in existing_data if existing_checks[d['url']].result() is not False]
+    pool.close()
+
+    # 確認結果をキャッシュに保存（締め切りで確認できなかったものは記録しない）
+    all_checks = {**existing_checks, **new_checks}
+    for url in probed:
+        status = all_checks[url].result()
+        if status is not None:
+            link_cache.record(url, status)
+    link_cache.prune(all_checks)
+    link_cache.save()
+    print(f"Link checks: {len(probed)} probed, {len(all_checks) - len(probed)} served from cache.")
+
+    # 要約はキャッシュに無い記事だけをまとめて生成する
+    summarizer = NewsSummarizer(llm, SummaryCache(cache_file(SUMMARY_CACHE_PATH)))
+    summaries = summarizer.summarize_items(active_items)
+    summarizer.cache.prune()
+    summarizer.cache.save()
+    print(f"Summaries: {len(active_items)} items, {summarizer.requests} AI requests.")
+
+    for item, summary in zip(active_items, summaries):
+        # 要約できた記事だけを処理済みにする（失敗した記事は次回もう一度要約する）
+        if summary in (FAILED, NO_API_KEY):
+            seen.defer(item)
+        else:
+            seen.add(item['id'])
+
         # カテゴリ判定（簡易）
         category = "市場"
         if any(kw in item['title'] for kw in ["漁", "不漁", "豊漁", "水揚げ"]): category = "漁況"
@@ -98,8 +168,6 @@ def main():
         elif any(kw in item['title'] for kw in ["物流", "2024"]): category = "物流"
         elif any(kw in item['title'] for kw in ["新商品", "発売", "開発"]): category = "新商品"
         
-        summary = summarize_with_strict_ai(item['title'], item['description'])
-        
         new_results.append({
             "id": item['id'],
             "date": item['date'],
@@ -109,19 +177,7 @@ def main():
             "category": category,
             "summary": summary
         })
-        time.sleep(1) # Rate limit避剤
-
-    # 既存データの読み込みとマージ
-    data_path = "data/katsuo_news.json"
-    existing_data = []
-    if os.path.exists(data_path):
-        with open(data_path, "r", encoding="utf-8") as f:
-            existing_data = json.load(f)
 
-    # リンク切れチェック（既存データからも404を除去）
-    print("Checking existing links...")
-    valid_existing = [d for d in existing_data if check_url_active(d['url'])]
-    
     # マージ（ID重複排除）
     existing_ids = {d['id'] for d in new_results}
     combined = new_results + [d for d in valid_existing if d['id'] not in existing_ids]
@@ -133,6 +189,9 @@ def main():
     with open(data_path, "w", encoding="utf-8") as f:
         json.dump(combined, f, ensure_ascii=False, indent=4)
     
+    # 書き込みが終わってからフィードの状態と処理済みIDを保存する
+    feed_state.save()
+    seen.save()
     print(f"Successfully updated. Current news count: {len(combined)}")
 
 if __name__ == "__main__":
@@ -1,94 +1,212 @@
+import argparse
 import csv
+import hashlib
 import json
+import os
 import sys
 from pathlib import Path
 
+sys.path.insert(0, os.path.dirname(__file__))
+from market_rules import RULES_PATH, load_rules
+
 
 ROOT = Path(__file__).resolve().parents[1]
 MARKET_CSV = ROOT / "data" / "market_input.csv"
 MARKET_JSON = ROOT / "data" / "katsuo_market_data.json"
-
-YAIZU_PORT = "焼津"
-YAIZU_ALLOWED_MARKET_SIZES = {"4.5kg上", "2.5kg上", "1.8kg上", "1.8kg下"}
-YAIZU_EXCLUDED_VESSEL_KEYWORDS = ("日光丸", "亀洋丸")
-
-
-def validate_market_csv():
+# --incremental 用の検証済み位置（検証に通ったときだけ保存する）
+STATE_PATH = ROOT / "data" / "market_rules_state.json"
+
+
+def _sha256_prefix(path, length):
+    """ファイル先頭 length バイトの sha256"""
+    digest = hashlib.sha256()
+    with path.open("rb") as f:
+        remaining = length
+        while remaining > 0:
+            block = f.read(min(remaining, 1 << 20))
+            if not block:
+                break
+            digest.update(block)
+            remaining -= len(block)
+    return digest.hexdigest()
+
+
+class _LineReader:
+    """バイナリのCSVを1行ずつ文字列にし、読んだバイト数を数える（csv.reader に渡す）"""
+    def __init__(self, f):
+        self.f = f
+        self.offset = f.tell()
+        self.ends_with_newline = True
+
+    def __iter__(self):
+        for line in self.f:
+            self.offset += len(line)
+            self.ends_with_newline = line.endswith(b"\n")
+            yield line.decode("utf-8")
+
+
+def validate_market_csv(rules, state=None):
+    """
+    CSVを1回だけ読み、各行に全ルールを適用する。
+    state（前回の検証済み位置）があれば、その位置以降に追加された行だけを検証する。
+    戻り値は (違反のリスト, 次回用の state)。
+    """
     violations = []
-    yaizu_date_size_counts = {}
-
-    with MARKET_CSV.open("r", encoding="utf-8", newline="") as f:
-        for line_no, row in enumerate(csv.DictReader(f), start=2):
-            if row.get("port") != YAIZU_PORT:
+    state = dict(state) if state else None
+    if state:
+        # 検証済みの部分が書き換えられていたら最初から検証し直す
+        size = MARKET_CSV.stat().st_size
+        if size < state["offset"] or _sha256_prefix(MARKET_CSV, state["offset"]) != state["prefix_sha256"]:
+            state = None
+
+    if state:
+        header = state["header"]
+        line_no = state["line_no"]
+        date_size_counts = {tuple(key.split("|", 2)): 1 for key in state["date_size_keys"]}
+        offset = state["offset"]
+    else:
+        header = None
+        line_no = 1
+        date_size_counts = {}
+        offset = 0
+
+    with MARKET_CSV.open("rb") as f:
+        f.seek(offset)
+        lines = _LineReader(f)
+        reader = csv.reader(lines)
+        if header is None:
+            header = next(reader, [])
+        columns = {name: i for i, name in enumerate(header)}
+        port_col, size_col = columns.get("port"), columns.get("size")
+        date_col, vessel_col = columns.get("date"), columns.get("vessel")
+
+        for row in reader:
+            line_no += 1
+            if not row:
+                continue
+            value = lambda col: row[col] if col is not None and col < len(row) else ""
+            port_rules = rules.for_port(value(port_col))
+            if port_rules is None:
                 continue
 
-            size = row.get("size", "")
-            vessel = row.get("vessel", "")
+            port = port_rules.port
+            size = value(size_col)
+            vessel = value(vessel_col)
 
-            if size not in YAIZU_ALLOWED_MARKET_SIZES:
+            if not port_rules.size_allowed(size):
                 violations.append(
-                    f"{MARKET_CSV}:{line_no}: 焼津の相場CSVに対象外サイズ {size} が入っています"
+                    f"{MARKET_CSV}:{line_no}: {port}の相場CSVに対象外サイズ {size} が入っています"
                 )
 
-            if any(keyword in vessel for keyword in YAIZU_EXCLUDED_VESSEL_KEYWORDS):
+            if port_rules.excluded_vessel(vessel):
                 violations.append(
-                    f"{MARKET_CSV}:{line_no}: 焼津の相場CSVに一本釣り船 {vessel} が入っています"
+                    f"{MARKET_CSV}:{line_no}: {port}の相場CSVに{port_rules.excluded_vessel_label} {vessel} が入っています"
                 )
 
-            key = (row.get("date", ""), size)
-            yaizu_date_size_counts[key] = yaizu_date_size_counts.get(key, 0) + 1
+            if port_rules.one_record_per_date:
+                key = (port, value(date_col), size)
+                date_size_counts[key] = date_size_counts.get(key, 0) + 1
 
-    for (date, size), count in yaizu_date_size_counts.items():
+    for (port, date, size), count in date_size_counts.items():
         if count > 1:
             violations.append(
-                f"{MARKET_CSV}: 焼津 {date} {size} が {count} 行あります。同一日の縦線グラフ防止のため1行にしてください"
+                f"{MARKET_CSV}: {port} {date} {size} が {count} 行あります。同一日の縦線グラフ防止のため1行にしてください"
             )
 
-    return violations
-
-
-def validate_market_json():
+    next_state = None
+    if lines.ends_with_newline:
+        next_state = {
+            "offset": lines.offset,
+            "prefix_sha256": _sha256_prefix(MARKET_CSV, lines.offset),
+            "line_no": line_no,
+            "header": header,
+            "date_size_keys": sorted("|".join(key) for key in date_size_counts),
+        }
+    return violations, next_state
+
+
+def validate_market_json(rules, state=None):
+    """
+    表示JSONを1回だけ走査して全ルールを適用する。
+    state の sha256 と内容が同じなら（前回検証に通っているので）検証しない。
+    """
     violations = []
-
-    with MARKET_JSON.open("r", encoding="utf-8") as f:
-        data = json.load(f)
-
-    yaizu_data = data.get(YAIZU_PORT, {})
-    for size in yaizu_data:
-        if size not in YAIZU_ALLOWED_MARKET_SIZES:
-            violations.append(
-                f"{MARKET_JSON}: 焼津の表示JSONに対象外サイズ {size} が入っています"
-            )
-
-    for size, records in yaizu_data.items():
-        date_counts = {}
-        for index, record in enumerate(records):
-            date = record.get("date", "")
-            date_counts[date] = date_counts.get(date, 0) + 1
-
-            vessel = record.get("vessel", "")
-            if any(keyword in vessel for keyword in YAIZU_EXCLUDED_VESSEL_KEYWORDS):
+    with MARKET_JSON.open("rb") as f:
+        raw = f.read()
+    digest = hashlib.sha256(raw).hexdigest()
+    if state and state.get("sha256") == digest:
+        return violations, state
+
+    data = json.loads(raw.decode("utf-8"))
+    for port, port_rules in rules.ports.items():
+        for size, records in data.get(port, {}).items():
+            if not port_rules.size_allowed(size):
                 violations.append(
-                    f"{MARKET_JSON}: 焼津 {size} record #{index + 1} に一本釣り船 {vessel} が入っています"
+                    f"{MARKET_JSON}: {port}の表示JSONに対象外サイズ {size} が入っています"
                 )
 
-        for date, count in date_counts.items():
-            if count > 1:
-                violations.append(
-                    f"{MARKET_JSON}: 焼津 {date} {size} が {count} 件あります。同一日の縦線グラフ防止のため1件にしてください"
-                )
-
-    return violations
-
-
-def main():
-    violations = validate_market_csv() + validate_market_json()
+            date_counts = {}
+            for index, record in enumerate(records):
+                date = record.get("date", "")
+                date_counts[date] = date_counts.get(date, 0) + 1
+
+                vessel = record.get("vessel", "")
+                if port_rules.excluded_vessel(vessel):
+                    violations.append(
+                        f"{MARKET_JSON}: {port} {size} record #{index + 1} に{port_rules.excluded_vessel_label} {vessel} が入っています"
+                    )
+
+            if port_rules.one_record_per_date:
+                for date, count in date_counts.items():
+                    if count > 1:
+                        violations.append(
+                            f"{MARKET_JSON}: {port} {date} {size} が {count} 件あります。同一日の縦線グラフ防止のため1件にしてください"
+                        )
+
+    return violations, {"sha256": digest}
+
+
+def _load_state(rules_sha256):
+    if not STATE_PATH.exists():
+        return {}
+    try:
+        with STATE_PATH.open("r", encoding="utf-8") as f:
+            state = json.load(f)
+    except (OSError, ValueError):
+        return {}
+    # ルールが変わったら全件を検証し直す
+    return state if state.get("rules_sha256") == rules_sha256 else {}
+
+
+def _save_state(state):
+    tmp_path = STATE_PATH.with_name(STATE_PATH.name + ".tmp")
+    with tmp_path.open("w", encoding="utf-8") as f:
+        json.dump(state, f, ensure_ascii=False, indent=2)
+    os.replace(tmp_path, STATE_PATH)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="相場CSV・表示JSONが data/market_rules.json のルールに沿っているか検証する")
+    parser.add_argument("--incremental", action="store_true",
+                        help="前回検証に通った位置以降にCSVへ追加された行と、変更された表示JSONだけを検証する")
+    args = parser.parse_args(argv)
+
+    with open(RULES_PATH, "rb") as f:
+        rules_sha256 = hashlib.sha256(f.read()).hexdigest()
+    rules = load_rules()
+    state = _load_state(rules_sha256) if args.incremental else {}
+
+    csv_violations, csv_state = validate_market_csv(rules, state.get("csv"))
+    json_violations, json_state = validate_market_json(rules, state.get("json"))
+    violations = csv_violations + json_violations
     if violations:
         print("Market rule validation failed:")
         for violation in violations:
             print(f"- {violation}")
         return 1
 
+    if csv_state is not None:
+        _save_state({"rules_sha256": rules_sha256, "csv": csv_state, "json": json_state})
     print("Market rule validation passed.")
     return 0
 
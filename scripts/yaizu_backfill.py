@@ -0,0 +1,235 @@
+"""
+焼津の過去相場ページを日付範囲でまとめて取得し、market_input.csv に取り込む
+
+日付ごとのページ URL は --url-template で指定する（{date:%Y%m%d} などの形式で日付を埋め込む）。
+取得はスレッドプールで並列に行い、全体で一定間隔以上あけてリクエストを送る。
+一時的なエラーは間隔をあけて再試行する。
+
+進捗は data/yaizu_backfill_checkpoint.json に日付ごとに記録するので、
+途中で止めても同じコマンドで続きから再開できる（取得済みの日付は取り直さない）。
+解析は yaizu_scraper.parse_yaizu_html（現在ページと同じ正規化・集計）で行い、
+最後に MarketRepository でまとめて1回だけCSVへ書き込む。
+
+    python scripts/yaizu_backfill.py 2025-06-01 2025-09-30
+    python scripts/yaizu_backfill.py 2025-06-01 2025-09-30 --url-template "http://localhost:8001/{date:%Y%m%d}.html"
+"""
+import argparse
+import json
+import os
+import sys
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from datetime import date, datetime, timedelta
+
+import requests
+
+sys.path.insert(0, os.path.dirname(__file__))
+from market_repository import MarketRepository
+from yaizu_scraper import YAIZU_URL, parse_yaizu_html
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+CHECKPOINT_PATH = os.path.join(ROOT, 'data', 'yaizu_backfill_checkpoint.json')
+ARCHIVE_URL_TEMPLATE = YAIZU_URL + "?date={date:%Y%m%d}"
+
+MAX_WORKERS = 4
+# リクエストの最小間隔（秒）。組合のサイトに負荷をかけないよう全スレッド合計で制限する
+MIN_INTERVAL = 1.0
+MAX_RETRIES = 3
+RETRY_BACKOFF = 2.0
+TIMEOUT = 10
+
+# 取り直さない状態（error だけは次回実行時に再試行する）
+# ok: 取得済み・未反映 / merged: CSV反映済み / empty: 相場なし / missing: 404 / mismatch: 別の日付のページ
+DONE_STATUSES = ('ok', 'merged', 'empty', 'missing', 'mismatch')
+
+
+class RateLimiter:
+    """全スレッドで共有する、リクエスト開始間隔の下限"""
+    def __init__(self, min_interval=MIN_INTERVAL):
+        self.min_interval = min_interval
+        self.lock = threading.Lock()
+        self.next_time = 0.0
+
+    def wait(self):
+        with self.lock:
+            now = time.monotonic()
+            wait = self.next_time - now
+            self.next_time = max(now, self.next_time) + self.min_interval
+        if wait > 0:
+            time.sleep(wait)
+
+
+class Checkpoint:
+    """
+    日付ごとの取得結果（状態と解析済みの行）を保存する。複数スレッドから更新される。
+    """
+    def __init__(self, path=CHECKPOINT_PATH, url_template=ARCHIVE_URL_TEMPLATE):
+        self.path = path
+        self.lock = threading.Lock()
+        self.data = {'url_template': url_template, 'dates': {}}
+        if os.path.exists(path):
+            with open(path, 'r', encoding='utf-8') as f:
+                saved = json.load(f)
+            # 取得先が変わった場合は別の取得として最初からやり直す
+            if saved.get('url_template') == url_template:
+                self.data = saved
+
+    @property
+    def dates(self):
+        return self.data['dates']
+
+    def is_done(self, date_str):
+        return self.dates.get(date_str, {}).get('status') in DONE_STATUSES
+
+    def record(self, date_str, status, rows=None, error=None):
+        with self.lock:
+            entry = {'status': status, 'checked_at': datetime.now().isoformat(timespec='seconds')}
+            if rows:
+                entry['rows'] = rows
+            if error:
+                entry['error'] = error
+            self.dates[date_str] = entry
+            self.save()
+
+    def save(self):
+        os.makedirs(os.path.dirname(self.path), exist_ok=True)
+        tmp_path = f"{self.path}.tmp"
+        with open(tmp_path, 'w', encoding='utf-8') as f:
+            json.dump(self.data, f, ensure_ascii=False, indent=2)
+        os.replace(tmp_path, self.path)
+
+
+def date_range(start, end):
+    day = start
+    while day <= end:
+        yield day
+        day += timedelta(days=1)
+
+
+_local = threading.local()
+
+
+def _session():
+    # requests.Session はスレッドごとに持つ（接続は使い回す）
+    if not hasattr(_local, 'session'):
+        _local.session = requests.Session()
+    return _local.session
+
+
+def fetch_page(url, limiter, retries=MAX_RETRIES, backoff=RETRY_BACKOFF, timeout=TIMEOUT):
+    """
+    ページ本文を返す。404 は None。接続エラー・5xx・429 は再試行し、最後は例外を送出する。
+    """
+    for attempt in range(retries + 1):
+        limiter.wait()
+        try:
+            response = _session().get(url, timeout=timeout)
+            if response.status_code == 404:
+                return None
+            if response.status_code == 429 or response.status_code >= 500:
+                raise requests.HTTPError(f"HTTP {response.status_code}", response=response)
+            response.raise_for_status()
+            response.encoding = 'utf-8'
+            return response.text
+        except (requests.ConnectionError, requests.Timeout, requests.HTTPError) as e:
+            retryable = e.response is None or e.response.status_code == 429 or e.response.status_code >= 500
+            if not retryable or attempt == retries:
+                raise
+            time.sleep(backoff * (2 ** attempt))
+
+
+def backfill_date(day, url_template, limiter, checkpoint):
+    """1日分を取得・解析してチェックポイントに記録し、状態を返す"""
+    date_str = day.isoformat()
+    url = url_template.format(date=day)
+    try:
+        html = fetch_page(url, limiter)
+    except Exception as e:
+        checkpoint.record(date_str, 'error', error=str(e))
+        return 'error'
+    if html is None:
+        checkpoint.record(date_str, 'missing')
+        return 'missing'
+
+    records = parse_yaizu_html(html, verbose=False)
+    if not records:
+        checkpoint.record(date_str, 'empty')
+        return 'empty'
+    # 存在しない日付で現在のページに転送されるサイトもあるため、ページ内の日付を確認する
+    if any(rec['date'] != date_str for rec in records):
+        checkpoint.record(date_str, 'mismatch', error=f"page date {records[0]['date']}")
+        return 'mismatch'
+
+    rows = [
+        [rec['date'], rec['port'], rec['size'], repr(round(float(rec['price']), 2)), repr(round(float(rec['volume']), 2)), '']
+        for rec in records
+    ]
+    checkpoint.record(date_str, 'ok', rows=rows)
+    return 'ok'
+
+
+def merge_checkpoint(checkpoint, repository, overwrite=False):
+    """取得済み (ok) の行をまとめてCSVに反映し、merged にする。戻り値は (追加件数, 更新件数)"""
+    pending = [d for d, entry in sorted(checkpoint.dates.items()) if entry.get('status') == 'ok']
+    rows = [row for d in pending for row in checkpoint.dates[d].get('rows', [])]
+    added, updated = repository.upsert(rows, overwrite=overwrite) if rows else (0, 0)
+    with checkpoint.lock:
+        for d in pending:
+            checkpoint.dates[d]['status'] = 'merged'
+        checkpoint.save()
+    return added, updated
+
+
+def run_backfill(start, end, url_template=ARCHIVE_URL_TEMPLATE, workers=MAX_WORKERS,
+                 min_interval=MIN_INTERVAL, checkpoint_path=CHECKPOINT_PATH, repository=None, overwrite=False):
+    checkpoint = Checkpoint(checkpoint_path, url_template)
+    limiter = RateLimiter(min_interval)
+    todo = [day for day in date_range(start, end) if not checkpoint.is_done(day.isoformat())]
+    print(f"Backfill {start} .. {end}: {len(todo)} pages to fetch (workers={workers}, interval={min_interval}s)")
+
+    counts = {}
+    with ThreadPoolExecutor(max_workers=workers) as executor:
+        futures = {executor.submit(backfill_date, day, url_template, limiter, checkpoint): day for day in todo}
+        for done, future in enumerate(as_completed(futures), 1):
+            status = future.result()
+            counts[status] = counts.get(status, 0) + 1
+            print(f"  [{done}/{len(todo)}] {futures[future]} {status}")
+
+    # 空の MarketRepository は len() が 0 で偽になるため、None かどうかで判定する
+    if repository is None:
+        repository = MarketRepository()
+    added, updated = merge_checkpoint(checkpoint, repository, overwrite=overwrite)
+    return counts, added, updated
+
+
+def main():
+    parser = argparse.ArgumentParser(description='焼津の過去相場ページを一括取得する')
+    parser.add_argument('start', type=date.fromisoformat, help='開始日 (YYYY-MM-DD)')
+    parser.add_argument('end', type=date.fromisoformat, help='終了日 (YYYY-MM-DD)')
+    parser.add_argument('--url-template', default=ARCHIVE_URL_TEMPLATE,
+                        help='日付ごとのURL。{date:%%Y%%m%%d} のように日付を埋め込む')
+    parser.add_argument('--workers', type=int, default=MAX_WORKERS)
+    parser.add_argument('--interval', type=float, default=MIN_INTERVAL, help='リクエストの最小間隔（秒）')
+    parser.add_argument('--checkpoint', default=CHECKPOINT_PATH)
+    parser.add_argument('--overwrite', action='store_true', help='既存の行も取得した値で上書きする')
+    args = parser.parse_args()
+
+    if args.start > args.end:
+        print("Error: 開始日が終了日より後になっています。")
+        return 1
+
+    counts, added, updated = run_backfill(
+        args.start, args.end, args.url_template, args.workers, args.interval, args.checkpoint,
+        overwrite=args.overwrite,
+    )
+    summary = ', '.join(f"{status}={count}" for status, count in sorted(counts.items())) or 'nothing to fetch'
+    print(f"Done: {summary}")
+    print(f"market_input.csv: {added} rows added, {updated} rows updated.")
+    if counts.get('error'):
+        print("エラーになった日付は、同じコマンドを再実行すると取り直します。")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
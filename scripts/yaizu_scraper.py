@@ -3,111 +3,240 @@ from bs4 import BeautifulSoup
 import pandas as pd
 import os
 import re
+import sys
 from datetime import datetime
 
-def scrape_yaizu_current():
-    url = "https://www.yaizu-gyokyo.or.jp/itiba/msinfo/"
+# lxml は任意（無ければ BeautifulSoup の html.parser で解析する）
+try:
+    import lxml.html
+except ImportError:
+    lxml = None
+
+from http_cache import ConditionalFetcher
+
+YAIZU_URL = "https://www.yaizu-gyokyo.or.jp/itiba/msinfo/"
+
+def scrape_yaizu_current(url=YAIZU_URL):
     print(f"Fetching {url}...")
     
     try:
         response = requests.get(url, timeout=10)
         response.encoding = 'utf-8'
-        soup = BeautifulSoup(response.text, 'html.parser')
-        
+        return parse_yaizu_html(response.text)
+    except Exception as e:
+        print(f"Error scraping Yaizu: {e}")
+        return []
+
+def scrape_yaizu_if_changed(fetcher, url=YAIZU_URL):
+    """
+    条件付きGET (http_cache.ConditionalFetcher) で取得し、変更があった場合だけ解析する。
+    戻り値は (取得結果, レコード)。ページが前回と同じならレコードは None、取得失敗時は (None, [])。
+    処理が終わったら fetcher.commit(取得結果) でキャッシュを更新すること。
+    """
+    print(f"Fetching {url} (conditional)...")
+    try:
+        result = fetcher.fetch(url, timeout=10)
+    except Exception as e:
+        print(f"Error scraping Yaizu: {e}")
+        return None, []
+    if not result.changed:
+        print(f"Page not modified since last check (HTTP {result.status}).")
+        return result, None
+    return result, parse_yaizu_html(result.text)
+
+# 対象（旋網冷凍かつお）と除外（一本釣・他魚種）のキーワード
+INCLUDE_KEYWORDS = ["旋網冷凍かつお"]
+EXCLUDE_KEYWORDS = ["一本釣", "一本つり", "南方一本釣り", "遠方一本釣", "ビンナガ", "トンボ", "キハダ", "メバチ"]
+# 両方を1つの正規表現にまとめ、テキストを1回走査するだけで判定する
+KEYWORD_RE = re.compile(
+    f"(?P<exclude>{'|'.join(map(re.escape, EXCLUDE_KEYWORDS))})"
+    f"|(?P<include>{'|'.join(map(re.escape, INCLUDE_KEYWORDS))})"
+)
+DATE_RE = re.compile(r'(\d{4}/\d{2}/\d{2})')
+SIZE_RE = re.compile(r'(\d+\.?\d*)([上下])')
+NON_NUMERIC_RE = re.compile(r'[^\d.]')
+# テーブル直前の見出しとして扱うタグ
+CONTEXT_TAGS = ('h3', 'h4', 'div', 'p')
+
+
+def is_target_table(*texts):
+    """いずれかのテキストに対象キーワードがあり、除外キーワードがどこにも無ければ True"""
+    included = False
+    for text in texts:
+        for match in KEYWORD_RE.finditer(text):
+            if match.lastgroup == 'exclude':
+                return False
+            included = True
+    return included
+
+
+def _tables_bs4(html):
+    """
+    BeautifulSoup (html.parser) による解析。
+    戻り値は (ページ全体のテキスト, (見出し, テーブルのテキスト, 行ごとのセル文字列) のイテレータ)
+    """
+    soup = BeautifulSoup(html, 'html.parser')
+
+    def tables():
+        for table in soup.find_all('table'):
+            prev_node = table.find_previous_sibling(list(CONTEXT_TAGS))
+            rows = ([td.text for td in tr.find_all('td')] for tr in table.find_all('tr'))
+            yield (prev_node.get_text() if prev_node else ""), table.get_text(), rows
+
+    return soup.get_text(), tables()
+
+
+def _tables_lxml(html):
+    """lxml による解析（C実装のため BeautifulSoup より大幅に速い）。戻り値は _tables_bs4 と同じ"""
+    root = lxml.html.document_fromstring(html.encode('utf-8'), parser=lxml.html.HTMLParser(encoding='utf-8'))
+
+    def tables():
+        for table in root.iter('table'):
+            prev_node = next((node for node in table.itersiblings(preceding=True) if node.tag in CONTEXT_TAGS), None)
+            rows = ([td.text_content() for td in tr.iter('td')] for tr in table.iter('tr'))
+            yield (prev_node.text_content() if prev_node is not None else ""), table.text_content(), rows
+
+    return root.text_content(), tables()
+
+
+PARSER_BACKENDS = {'bs4': _tables_bs4}
+if lxml is not None:
+    PARSER_BACKENDS['lxml'] = _tables_lxml
+# lxml があればそちらを使い、無ければ BeautifulSoup にフォールバックする
+DEFAULT_BACKEND = 'lxml' if 'lxml' in PARSER_BACKENDS else 'bs4'
+
+
+def _to_float(s):
+    """数値抽出 (数値以外を除去)"""
+    s = NON_NUMERIC_RE.sub('', s)
+    try:
+        return float(s) if s else 0.0
+    except ValueError:
+        return 0.0
+
+
+def normalize_size(size_raw):
+    """サイズ表記の正規化 (例: "4.5上" -> "4.5kg上", "1.8下" -> "1.8kg下")"""
+    size = size_raw.strip().replace(' ', '').replace('\u3000', '')
+    # 数字+「上」または「下」の形式を「kg」入りに統一
+    return SIZE_RE.sub(r'\1kg\2', size)
+
+
+def aggregate_records(data):
+    """
+    重複削除 (複数船の情報がある場合は平均化)。
+    同じ日付・拠点・サイズの価格は平均、数量は合計をとる。
+    """
+    if not data:
+        return []
+    df_temp = pd.DataFrame(data)
+    df_grouped = df_temp.groupby(['date', 'port', 'size']).agg({'price': 'mean', 'volume': 'sum'}).reset_index()
+    return df_grouped.to_dict('records')
+
+
+def parse_yaizu_html(html, backend=None, verbose=True):
+    """
+    焼津の相場ページのHTMLから 旋網冷凍かつお のサイズ別相場を取り出す。
+    backend は PARSER_BACKENDS のキー（省略時は DEFAULT_BACKEND）。
+    verbose=False でテーブルごとの進捗表示を省く（一括取得用）。
+    """
+    try:
+        page_text, tables = PARSER_BACKENDS[backend or DEFAULT_BACKEND](html)
+
         # 1. 日付を取得
-        date_str = ""
         # ページ内の「2026/02/13相場情報」といったテキストを探す
-        content_text = soup.get_text()
-        date_match = re.search(r'(\d{4}/\d{2}/\d{2})', content_text)
+        date_match = DATE_RE.search(page_text)
         if date_match:
             date_str = date_match.group(1).replace('/', '-')
         else:
             date_str = datetime.now().strftime("%Y-%m-%d")
 
         data = []
-        
-        # 2. すべてのテーブルを走査してかつお情報を探す
-        tables = soup.find_all('table')
-        print(f"Found {len(tables)} tables.")
-        for table in tables:
-            # テーブルの直前にある見出し（船名や魚種）を確認
-            prev_node = table.find_previous_sibling(['h3', 'h4', 'div', 'p'])
-            context_text = prev_node.get_text() if prev_node else ""
-            
-            # 「かつお」が含まれるか、テーブル内のテキストを確認
-            table_text = table.get_text()
-            # 「旋網冷凍かつお」が含まれるか確認（「一本釣」は除外）
-            include_keywords = ["旋網冷凍かつお"]
-            exclude_keywords = ["一本釣", "一本つり", "南方一本釣り", "遠方一本釣", "ビンナガ", "トンボ", "キハダ", "メバチ"]
-            
-            is_valid_context = any(kw in context_text or kw in table_text for kw in include_keywords)
-            is_excluded = any(kw in context_text or kw in table_text for kw in exclude_keywords)
-
-            if is_valid_context and not is_excluded:
+        table_count = 0
+
+        # 2. すべてのテーブルを1回だけ走査してかつお情報を探す
+        for context_text, table_text, rows in tables:
+            table_count += 1
+            # 「旋網冷凍かつお」が含まれるか確認（「一本釣」などは除外）
+            if not is_target_table(context_text, table_text):
+                continue
+
+            if verbose:
                 print(f"Processing valid table: {context_text[:50]}...")
-                rows = table.find_all('tr')
-                for row in rows:
-                    cols = row.find_all('td')
-                    if len(cols) >= 4:
-                        size_raw = cols[0].text.strip()
-                        
-                        # サイズ表記の正規化 (例: "4.5上" -> "4.5kg上", "1.8下" -> "1.8kg下")
-                        size = size_raw.replace(' ', '').replace('\u3000', '')
-                        # 数字+「上」または「下」の形式を「kg」入りに統一
-                        size = re.sub(r'(\d+\.?\d*)([上下])', r'\1kg\2', size)
-                        
-                        if size:
-                            # 数値抽出 (数値以外を除去)
-                            def to_float(s):
-                                s = re.sub(r'[^\d.]', '', s)
-                                try:
-                                    return float(s) if s else 0.0
-                                except:
-                                    return 0.0
-                            
-                            p_high = to_float(cols[1].text.strip())
-                            p_low = to_float(cols[2].text.strip())
-                            vol = to_float(cols[3].text.strip())
-                            
-                            # 平均価格
-                            avg_p = (p_high + p_low) / 2 if p_high > 0 and p_low > 0 else (p_high if p_high > 0 else p_low)
-                            
-                            if avg_p > 0:
-                                data.append({
-                                    "date": date_str,
-                                    "port": "焼津",
-                                    "size": size,
-                                    "price": avg_p,
-                                    "volume": vol
-                                })
-        
-        # 重複削除 (複数船の情報がある場合は平均化または最新を採用)
-        if data:
-            df_temp = pd.DataFrame(data)
-            # 同じ日付・拠点・サイズで平均をとる
-            df_grouped = df_temp.groupby(['date', 'port', 'size']).agg({'price': 'mean', 'volume': 'sum'}).reset_index()
-            return df_grouped.to_dict('records')
-            
-        return []
+            for cols in rows:
+                if len(cols) < 4:
+                    continue
+                size = normalize_size(cols[0])
+                if not size:
+                    continue
+
+                p_high = _to_float(cols[1].strip())
+                p_low = _to_float(cols[2].strip())
+                vol = _to_float(cols[3].strip())
+
+                # 平均価格
+                avg_p = (p_high + p_low) / 2 if p_high > 0 and p_low > 0 else (p_high if p_high > 0 else p_low)
+
+                if avg_p > 0:
+                    data.append({
+                        "date": date_str,
+                        "port": "焼津",
+                        "size": size,
+                        "price": avg_p,
+                        "volume": vol
+                    })
+        if verbose:
+            print(f"Found {table_count} tables.")
+
+        return aggregate_records(data)
     except Exception as e:
-        print(f"Error scraping Yaizu: {e}")
+        print(f"Error parsing Yaizu page: {e}")
         return []
 
-if __name__ == "__main__":
-    yaizu_data = scrape_yaizu_current()
-    if yaizu_data:
+def merge_into_csv(yaizu_data, csv_path="data/market_input.csv"):
+    """解析したレコードを market_input.csv に統合する（同じ日・港・サイズは新しい値で上書き）"""
+    df_new = pd.DataFrame(yaizu_data)
+    if os.path.exists(csv_path):
+        df_old = pd.read_csv(csv_path)
+        # 既存データと統合（同じ日のデータは最新で上書き）
+        df_combined = pd.concat([df_old, df_new]).drop_duplicates(subset=['date', 'port', 'size'], keep='last')
+        df_combined.to_csv(csv_path, index=False, encoding='utf-8')
+        print(f"Updated {csv_path}")
+    else:
+        df_new.to_csv(csv_path, index=False, encoding='utf-8')
+        print(f"Created {csv_path}")
+
+def update_if_changed(fetcher, url=YAIZU_URL, csv_path="data/market_input.csv", merge=merge_into_csv):
+    """
+    ページが前回から変わっていれば解析して CSV に統合する。
+    戻り値は統合したレコード数（変更なしは None、取得・解析できなかった場合は 0）。
+    変更なし、または CSV の更新まで終わった時点でキャッシュを記録する。
+    途中で失敗した回（merge の例外はそのまま送出する）・解析できなかったページは記録せず、次回取り直す。
+    """
+    result, yaizu_data = scrape_yaizu_if_changed(fetcher, url)
+    if yaizu_data is None:
+        print("No changes. Skipped parsing and CSV update.")
+    elif yaizu_data:
         print(f"Successfully scraped {len(yaizu_data)} entries.")
-        csv_path = "data/market_input.csv"
-        df_new = pd.DataFrame(yaizu_data)
-        
-        if os.path.exists(csv_path):
-            df_old = pd.read_csv(csv_path)
-            # 既存データと統合（同じ日のデータは最新で上書き）
-            df_combined = pd.concat([df_old, df_new]).drop_duplicates(subset=['date', 'port', 'size'], keep='last')
-            df_combined.to_csv(csv_path, index=False, encoding='utf-8')
-            print(f"Updated {csv_path}")
-        else:
-            df_new.to_csv(csv_path, index=False, encoding='utf-8')
-            print(f"Created {csv_path}")
+        merge(yaizu_data, csv_path)
     else:
         print("No valid data found.")
+
+    if result is not None and (yaizu_data is None or yaizu_data):
+        fetcher.commit(result)
+    return None if yaizu_data is None else len(yaizu_data)
+
+if __name__ == "__main__":
+    # --url で取得先を変更できる（ローカルのテスト用サーバーなど）
+    # --no-cache で条件付きGETを使わずに毎回取得・解析する
+    args = sys.argv[1:]
+    url = args[args.index('--url') + 1] if '--url' in args else YAIZU_URL
+    if '--no-cache' in args:
+        yaizu_data = scrape_yaizu_current(url)
+        if yaizu_data:
+            print(f"Successfully scraped {len(yaizu_data)} entries.")
+            merge_into_csv(yaizu_data)
+        else:
+            print("No valid data found.")
+    else:
+        update_if_changed(ConditionalFetcher(), url)
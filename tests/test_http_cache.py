@@ -0,0 +1,123 @@
+"""
+scripts/http_cache.py の条件付きGETと、yaizu_scraper.update_if_changed のテスト
+（ローカルの http.server で scripts/fixtures のページを配信する）
+
+    python -m unittest tests.test_http_cache
+"""
+import contextlib
+import io
+import json
+import os
+import sys
+import tempfile
+import threading
+import unittest
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from unittest import mock
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, os.path.join(ROOT, 'scripts'))
+import yaizu_scraper
+from http_cache import ConditionalFetcher
+
+with open(os.path.join(ROOT, 'scripts', 'fixtures', 'yaizu_msinfo_sample.html'), 'rb') as f:
+    FIXTURE = f.read()
+
+
+class FixtureHandler(BaseHTTPRequestHandler):
+    """server.page の本文を返す。ETag があれば If-None-Match が一致したとき 304 を返す"""
+    def do_GET(self):
+        page = self.server.page
+        if page['etag'] and self.headers.get('If-None-Match') == page['etag']:
+            self.server.statuses.append(304)
+            self.send_response(304)
+            self.end_headers()
+        else:
+            self.server.statuses.append(200)
+            self.send_response(200)
+            self.send_header('Content-Type', 'text/html; charset=utf-8')
+            self.send_header('Content-Length', str(len(page['body'])))
+            if page['etag']:
+                self.send_header('ETag', page['etag'])
+            self.end_headers()
+            self.wfile.write(page['body'])
+
+    def log_message(self, format, *args):
+        pass
+
+
+class ConditionalFetchTest(unittest.TestCase):
+    def setUp(self):
+        self.server = ThreadingHTTPServer(('127.0.0.1', 0), FixtureHandler)
+        self.server.page = {'body': FIXTURE, 'etag': '"v1"'}
+        self.server.statuses = []
+        threading.Thread(target=self.server.serve_forever, daemon=True).start()
+        self.url = f"http://127.0.0.1:{self.server.server_address[1]}/itiba/msinfo/"
+
+        self.tmp = tempfile.TemporaryDirectory()
+        self.cache_path = os.path.join(self.tmp.name, 'http_cache.json')
+        self.csv_path = os.path.join(self.tmp.name, 'market_input.csv')
+        self.merged = []
+
+    def tearDown(self):
+        self.server.shutdown()
+        self.server.server_close()
+        self.tmp.cleanup()
+
+    def merge(self, records, csv_path):
+        self.merged.append(records)
+
+    def update(self, merge=None):
+        """新しい ConditionalFetcher（キャッシュファイルから読み直す）で1回更新する"""
+        with contextlib.redirect_stdout(io.StringIO()):
+            return yaizu_scraper.update_if_changed(
+                ConditionalFetcher(self.cache_path), self.url, self.csv_path, merge=merge or self.merge)
+
+    def cached_entry(self):
+        with open(self.cache_path, 'r', encoding='utf-8') as f:
+            return json.load(f)[self.url]
+
+    def test_200_then_304_skips_parse_and_merge(self):
+        with mock.patch.object(yaizu_scraper, 'parse_yaizu_html', wraps=yaizu_scraper.parse_yaizu_html) as parse:
+            self.assertEqual(self.update(merge=yaizu_scraper.merge_into_csv), 4)
+            self.assertEqual(self.cached_entry()['etag'], '"v1"')
+            with open(self.csv_path, 'r', encoding='utf-8') as f:
+                self.assertEqual(len(f.read().splitlines()), 5)
+
+            self.assertIsNone(self.update())
+            self.assertEqual(parse.call_count, 1)
+        self.assertEqual(self.server.statuses, [200, 304])
+        self.assertEqual(self.merged, [])
+
+    def test_unchanged_body_without_validators_skips_parse_and_merge(self):
+        self.server.page['etag'] = None
+        with mock.patch.object(yaizu_scraper, 'parse_yaizu_html', wraps=yaizu_scraper.parse_yaizu_html) as parse:
+            self.assertEqual(self.update(), 4)
+            self.assertIsNone(self.update())
+            self.assertEqual(parse.call_count, 1)
+        # 検証子が無いので 304 にはならず、本文のハッシュで変更なしと判定する
+        self.assertEqual(self.server.statuses, [200, 200])
+        self.assertEqual(len(self.merged), 1)
+
+    def test_failed_merge_does_not_commit_new_etag(self):
+        self.update()
+        self.assertEqual(self.cached_entry()['etag'], '"v1"')
+
+        self.server.page = {'body': FIXTURE.replace(b'<td>311</td>', b'<td>321</td>'), 'etag': '"v2"'}
+
+        def broken_merge(records, csv_path):
+            raise OSError('disk full')
+
+        with self.assertRaises(OSError):
+            self.update(merge=broken_merge)
+        self.assertEqual(self.cached_entry()['etag'], '"v1"')
+
+        # 記録されていないので、次の回は新しいページを取り直して統合する
+        self.assertEqual(self.update(), 4)
+        self.assertEqual(self.cached_entry()['etag'], '"v2"')
+        self.assertEqual(len(self.merged), 2)
+        self.assertEqual(self.server.statuses, [200, 200, 200])
+
+
+if __name__ == "__main__":
+    unittest.main()
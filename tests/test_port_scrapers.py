@@ -0,0 +1,139 @@
+"""
+scripts/port_scrapers.py のアダプターとランナーのテスト（scripts/fixtures の保存済みページを使う）
+
+    python -m unittest tests.test_port_scrapers
+"""
+import os
+import sys
+import unittest
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, os.path.join(ROOT, 'scripts'))
+from port_scrapers import (
+    MakurazakiAdapter,
+    PortAdapter,
+    YaizuAdapter,
+    YamagawaAdapter,
+    normalize_size_label,
+    run_adapters,
+)
+
+FIXTURES = os.path.join(ROOT, 'scripts', 'fixtures')
+
+
+def fixture(name):
+    return os.path.join(FIXTURES, name)
+
+
+class NormalizeSizeLabelTest(unittest.TestCase):
+    def test_adds_kg(self):
+        self.assertEqual(normalize_size_label('4.5上'), '4.5kg上')
+        self.assertEqual(normalize_size_label('4.5 上'), '4.5kg上')
+
+    def test_full_width(self):
+        self.assertEqual(normalize_size_label('１．８上'), '1.8kg上')
+        self.assertEqual(normalize_size_label('１．８ｋｇ 下'), '1.8kg下')
+
+    def test_keeps_prefix_and_suffix(self):
+        self.assertEqual(normalize_size_label('キワ・キメ　1.5上'), 'キワ・キメ 1.5kg上')
+        self.assertEqual(normalize_size_label('1.5下ダル混'), '1.5kg下ダル混')
+
+
+class YaizuAdapterTest(unittest.TestCase):
+    def test_parse_fixture(self):
+        rows = YaizuAdapter(fixture('yaizu_msinfo_sample.html')).run()
+        # 旋網冷凍かつおの表だけを、サイズごとに船をまとめて取り込む（一本釣り・キハダ・ビンナガは対象外）
+        self.assertEqual(sorted(rows), [
+            ['2026-02-16', '焼津', '1.8kg上', '283.25', '155.0', ''],
+            ['2026-02-16', '焼津', '1.8kg下', '258.5', '40.0', ''],
+            ['2026-02-16', '焼津', '2.5kg上', '300.0', '200.0', ''],
+            ['2026-02-16', '焼津', '4.5kg上', '310.0', '55.0', ''],
+        ])
+
+
+class MakurazakiAdapterTest(unittest.TestCase):
+    def setUp(self):
+        self.rows = MakurazakiAdapter(fixture('makurazaki_sample.html')).run()
+
+    def test_date_port_vessel(self):
+        self.assertEqual({(row[0], row[1], row[5]) for row in self.rows}, {('2026-07-07', '枕崎', '7わかば丸')})
+
+    def test_sizes_are_normalized(self):
+        by_size = {row[2]: row for row in self.rows}
+        self.assertEqual(by_size['4.5kg上'][3:5], ['328.1', '20.0'])
+        # 全角の "１．８上" と数値
+        self.assertEqual(by_size['1.8kg上'][3:5], ['337.4', '70.0'])
+        self.assertEqual(by_size['キワ・キメ 1.5kg上'][3:5], ['296.2', '3.0'])
+        # 数量が "-" の行は 0、単価が "-" の行は取り込まない
+        self.assertEqual(by_size['B品2.5kg上'][3:5], ['318.0', '0.0'])
+        self.assertNotIn('キメジキス', by_size)
+        self.assertEqual(len(self.rows), 10)
+
+
+class YamagawaAdapterTest(unittest.TestCase):
+    def test_parse_fixture(self):
+        rows = YamagawaAdapter(fixture('yamagawa_sample.html')).run()
+        self.assertEqual(rows, [
+            ['2026-07-09', '山川', '8.0kg上', '331.0', '5.0', '18宮丸'],
+            ['2026-07-09', '山川', '4.5kg上', '318.5', '40.0', '18宮丸'],
+            ['2026-07-09', '山川', '2.5kg上', '326.0', '150.0', '18宮丸'],
+            ['2026-07-09', '山川', '1.8kg上', '321.2', '60.0', '18宮丸'],
+            ['2026-07-09', '山川', '2.5kg上変形', '300.0', '2.0', '18宮丸'],
+            ['2026-07-09', '山川', 'キメジ3.0kg下', '280.0', '1.0', '18宮丸'],
+        ])
+
+
+class StaticAdapter(PortAdapter):
+    """決まった行を返すアダプター（取得は行わない）"""
+    def __init__(self, port, rows=None, error=None):
+        super().__init__('static')
+        self.port = port
+        self.rows = rows or []
+        self.error = error
+
+    def run(self):
+        if self.error is not None:
+            raise self.error
+        return self.rows
+
+
+class RunAdaptersTest(unittest.TestCase):
+    def test_dedupes_by_key_and_keeps_the_later_row(self):
+        first = StaticAdapter('枕崎', [
+            ['2026-07-07', '枕崎', '2.5kg上', '343.8', '200.0', '7わかば丸'],
+            ['2026-07-07', '枕崎', '1.8kg上', '337.4', '70.0', '7わかば丸'],
+        ])
+        second = StaticAdapter('山川', [
+            ['2026-07-07', '枕崎', '2.5kg上', '345.0', '200.0', '7わかば丸'],
+            # 船名が違えば別の行
+            ['2026-07-07', '枕崎', '2.5kg上', '330.0', '50.0', '18宮丸'],
+        ])
+        rows, results = run_adapters([first, second])
+        self.assertEqual(rows, [
+            ['2026-07-07', '枕崎', '1.8kg上', '337.4', '70.0', '7わかば丸'],
+            ['2026-07-07', '枕崎', '2.5kg上', '330.0', '50.0', '18宮丸'],
+            ['2026-07-07', '枕崎', '2.5kg上', '345.0', '200.0', '7わかば丸'],
+        ])
+        self.assertEqual(results, {'枕崎': 2, '山川': 2})
+
+    def test_failed_adapter_does_not_stop_others(self):
+        ok = StaticAdapter('焼津', [['2026-02-16', '焼津', '2.5kg上', '300.0', '200.0', '']])
+        failed = StaticAdapter('山川', error=RuntimeError('timeout'))
+        rows, results = run_adapters([ok, failed])
+        self.assertEqual(rows, ok.rows)
+        self.assertEqual(results, {'焼津': 1, '山川': None})
+
+    def test_fixture_adapters_together(self):
+        rows, results = run_adapters([
+            YaizuAdapter(fixture('yaizu_msinfo_sample.html')),
+            MakurazakiAdapter(fixture('makurazaki_sample.html')),
+            YamagawaAdapter(fixture('yamagawa_sample.html')),
+            # 同じページを2回読んでも行は増えない
+            YamagawaAdapter(fixture('yamagawa_sample.html')),
+        ])
+        self.assertEqual(results, {'焼津': 4, '枕崎': 10, '山川': 6})
+        self.assertEqual(len(rows), 20)
+
+
+if __name__ == "__main__":
+    unittest.main()
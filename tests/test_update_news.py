@@ -0,0 +1,157 @@
+"""
+scripts/update_news.py のオフラインテスト（スタブの LLM と、ローカルの http.server で配信する RSS・記事ページ）
+
+    python -m unittest tests.test_update_news
+"""
+import contextlib
+import io
+import json
+import os
+import sys
+import tempfile
+import threading
+import unittest
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, os.path.join(ROOT, 'scripts'))
+import update_news
+from feed_index import entry_id
+from news_summarizer import FAILED
+
+TITLES = ['カツオ相場が上昇', '焼津港でカツオの水揚げ好調', '水産物の物流に遅れ']
+
+
+def rss(base_url):
+    items = "".join(
+        f"<item><title>{title}</title><link>{base_url}/articles/{i}</link>"
+        f"<description>{title}についての記事です。</description></item>"
+        for i, title in enumerate(TITLES)
+    )
+    # キーワードを含まない記事は要約に回らない
+    items += f"<item><title>天気予報</title><link>{base_url}/articles/weather</link><description>晴れ</description></item>"
+    return f'<?xml version="1.0" encoding="UTF-8"?><rss version="2.0"><channel><title>test</title>{items}</channel></rss>'
+
+
+class NewsHandler(BaseHTTPRequestHandler):
+    """/feed.xml と /articles/<n> を返す"""
+    def do_HEAD(self):
+        self.respond(head=True)
+
+    def do_GET(self):
+        self.respond(head=False)
+
+    def respond(self, head):
+        if self.path == '/feed.xml':
+            body = rss(self.server.base_url).encode('utf-8')
+        elif self.path.startswith('/articles/'):
+            body = b'<html>article</html>'
+        else:
+            self.send_error(404)
+            return
+        self.send_response(200)
+        self.send_header('Content-Length', str(len(body)))
+        self.end_headers()
+        if not head:
+            self.wfile.write(body)
+
+    def log_message(self, format, *args):
+        pass
+
+
+class StubLLM:
+    """news_summarizer.gemini_llm と同じ形のスタブ。呼び出しを記録する"""
+    def __init__(self, error=None):
+        self.calls = []
+        self.error = error
+
+    def __call__(self, prompt, json_mode=False):
+        self.calls.append(json_mode)
+        if self.error is not None:
+            raise self.error
+        count = prompt.count('--- id:') if json_mode else 1
+        if not json_mode:
+            return "スタブの要約"
+        return json.dumps([{'id': i, 'summary': f"スタブの要約 {i}"} for i in range(count)], ensure_ascii=False)
+
+
+class UpdateNewsTest(unittest.TestCase):
+    def setUp(self):
+        self.server = ThreadingHTTPServer(('127.0.0.1', 0), NewsHandler)
+        self.server.base_url = f"http://127.0.0.1:{self.server.server_address[1]}"
+        threading.Thread(target=self.server.serve_forever, daemon=True).start()
+        self.feeds = [f"{self.server.base_url}/feed.xml"]
+
+        self.tmp = tempfile.TemporaryDirectory()
+        self.cache_dir = os.path.join(self.tmp.name, 'news_cache')
+        self.data_path = os.path.join(self.tmp.name, 'katsuo_news.json')
+        self.ids = {entry_id(f"{self.server.base_url}/articles/{i}") for i in range(len(TITLES))}
+
+    def tearDown(self):
+        self.server.shutdown()
+        self.server.server_close()
+        self.tmp.cleanup()
+
+    def run_main(self, llm):
+        with contextlib.redirect_stdout(io.StringIO()):
+            update_news.main(llm=llm, feeds=self.feeds, data_path=self.data_path, cache_dir=self.cache_dir)
+
+    def load(self, name):
+        with open(os.path.join(self.cache_dir, name), 'r', encoding='utf-8') as f:
+            return json.load(f)
+
+    def news(self):
+        with open(self.data_path, 'r', encoding='utf-8') as f:
+            return {item['id']: item['summary'] for item in json.load(f)}
+
+    def test_batches_and_memoizes_summaries(self):
+        llm = StubLLM()
+        self.run_main(llm)
+        # 3件を1回のバッチ要約で生成する
+        self.assertEqual(llm.calls, [True])
+        self.assertEqual(set(self.news()), self.ids)
+        self.assertEqual(set(self.load('seen_ids.json')), self.ids | {entry_id(f"{self.server.base_url}/articles/weather")})
+        self.assertEqual(len(self.load('summaries.json')), 3)
+
+        # 2回目は処理済みの記事なので要約しない
+        llm = StubLLM()
+        self.run_main(llm)
+        self.assertEqual(llm.calls, [])
+
+        # 処理済みIDを消しても、要約はキャッシュから使う
+        for name in ('seen_ids.json', 'feed_state.json'):
+            os.remove(os.path.join(self.cache_dir, name))
+        self.run_main(llm)
+        self.assertEqual(llm.calls, [])
+        self.assertEqual(sorted(self.news().values()), [f"スタブの要約 {i}" for i in range(3)])
+
+    def test_failed_summaries_are_not_marked_seen(self):
+        llm = StubLLM(error=RuntimeError('quota exceeded'))
+        self.run_main(llm)
+        # バッチ1回 + 1件ずつの再試行3回、すべて失敗
+        self.assertEqual(llm.calls, [True, False, False, False])
+        self.assertFalse(self.ids & set(self.load('seen_ids.json')))
+        self.assertEqual(set(self.load('pending_items.json')), self.ids)
+        self.assertEqual(set(self.news().values()), {FAILED})
+        self.assertEqual(self.load('summaries.json'), {})
+
+        # 次の回は保留していた記事をもう一度要約する
+        llm = StubLLM()
+        self.run_main(llm)
+        self.assertEqual(llm.calls, [True])
+        self.assertTrue(self.ids <= set(self.load('seen_ids.json')))
+        self.assertEqual(self.load('pending_items.json'), {})
+        self.assertNotIn(FAILED, self.news().values())
+
+    def test_does_not_touch_the_committed_cache(self):
+        committed = os.path.join(ROOT, 'data', 'news_cache')
+        before = {name: os.path.getmtime(os.path.join(committed, name)) for name in os.listdir(committed)} \
+            if os.path.isdir(committed) else {}
+        self.run_main(StubLLM())
+        after = {name: os.path.getmtime(os.path.join(committed, name)) for name in os.listdir(committed)} \
+            if os.path.isdir(committed) else {}
+        self.assertEqual(before, after)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,129 @@
+"""
+scripts/yaizu_backfill.py のテスト（ローカルの http.server で保存済みのページを日付ごとに配信する）
+
+    python -m unittest tests.test_yaizu_backfill
+"""
+import contextlib
+import io
+import json
+import os
+import sys
+import tempfile
+import threading
+import unittest
+from datetime import date
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from unittest import mock
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, os.path.join(ROOT, 'scripts'))
+import yaizu_backfill
+from market_repository import MarketRepository
+
+with open(os.path.join(ROOT, 'scripts', 'fixtures', 'yaizu_msinfo_sample.html'), 'rb') as f:
+    FIXTURE = f.read()  # 2026/02/16 の相場ページ
+
+
+def page_for(day):
+    return FIXTURE.replace(b'2026/02/16', day.encode())
+
+
+class ArchiveHandler(BaseHTTPRequestHandler):
+    """
+    /<YYYYMMDD>.html を server.pages に従って返す。
+    値は本文（bytes）か、応答するステータスの列（使い切ったら最後の本文を返す）。
+    """
+    def do_GET(self):
+        name = self.path.strip('/').split('.')[0]
+        self.server.requests.append(name)
+        plan = self.server.pages.get(name)
+        status, body = 404, b''
+        if isinstance(plan, list):
+            status = plan.pop(0) if len(plan) > 1 else 200
+            body = plan[-1] if status == 200 else b''
+        elif plan is not None:
+            status, body = 200, plan
+        self.send_response(status)
+        self.send_header('Content-Type', 'text/html; charset=utf-8')
+        self.send_header('Content-Length', str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, format, *args):
+        pass
+
+
+class BackfillTest(unittest.TestCase):
+    def setUp(self):
+        self.server = ThreadingHTTPServer(('127.0.0.1', 0), ArchiveHandler)
+        self.server.requests = []
+        self.server.pages = {
+            '20260216': FIXTURE,
+            # 20260217 は 404
+            '20260218': [500, 500, 500, 500, page_for('2026/02/18')],  # 1回目の実行では再試行を使い切る
+            '20260219': [500, page_for('2026/02/19')],                 # 1回再試行すれば取れる
+            '20260220': FIXTURE,                                       # 別の日付のページ
+        }
+        threading.Thread(target=self.server.serve_forever, daemon=True).start()
+        self.url_template = f"http://127.0.0.1:{self.server.server_address[1]}/{{date:%Y%m%d}}.html"
+
+        self.tmp = tempfile.TemporaryDirectory()
+        self.checkpoint_path = os.path.join(self.tmp.name, 'checkpoint.json')
+        self.repository = MarketRepository(os.path.join(self.tmp.name, 'market_input.csv'))
+        # 再試行の待ち時間は飛ばす
+        patcher = mock.patch.object(yaizu_backfill.time, 'sleep')
+        patcher.start()
+        self.addCleanup(patcher.stop)
+
+    def tearDown(self):
+        self.server.shutdown()
+        self.server.server_close()
+        self.tmp.cleanup()
+
+    def run_backfill(self):
+        with mock.patch.object(self.repository, 'upsert', wraps=self.repository.upsert) as upsert, \
+                contextlib.redirect_stdout(io.StringIO()):
+            counts, added, updated = yaizu_backfill.run_backfill(
+                date(2026, 2, 16), date(2026, 2, 20), self.url_template, workers=3, min_interval=0,
+                checkpoint_path=self.checkpoint_path, repository=self.repository,
+            )
+        return counts, added, upsert.call_count
+
+    def statuses(self):
+        with open(self.checkpoint_path, 'r', encoding='utf-8') as f:
+            return {d: entry['status'] for d, entry in json.load(f)['dates'].items()}
+
+    def test_statuses_resume_and_merge(self):
+        counts, added, upserts = self.run_backfill()
+        self.assertEqual(counts, {'ok': 2, 'missing': 1, 'error': 1, 'mismatch': 1})
+        self.assertEqual(self.statuses(), {
+            '2026-02-16': 'merged',
+            '2026-02-17': 'missing',
+            '2026-02-18': 'error',
+            '2026-02-19': 'merged',
+            '2026-02-20': 'mismatch',
+        })
+        self.assertEqual((added, upserts), (8, 1))
+        self.assertEqual(self.server.requests.count('20260218'), yaizu_backfill.MAX_RETRIES + 1)
+        self.assertEqual(self.server.requests.count('20260219'), 2)
+
+        # 再開すると error の日付だけを取り直し、他の日付は取得しない
+        self.server.requests.clear()
+        counts, added, upserts = self.run_backfill()
+        self.assertEqual(self.server.requests, ['20260218'])
+        self.assertEqual(counts, {'ok': 1})
+        self.assertEqual(self.statuses()['2026-02-18'], 'merged')
+        self.assertEqual((added, upserts), (4, 1))
+
+        self.assertEqual(sorted({row[0] for row in self.repository.load().rows}),
+                         ['2026-02-16', '2026-02-18', '2026-02-19'])
+        self.assertEqual(len(self.repository), 12)
+
+        # 全て取得済みなら何も取得せず、CSV にも書き込まない
+        self.server.requests.clear()
+        counts, added, upserts = self.run_backfill()
+        self.assertEqual((self.server.requests, counts, added, upserts), ([], {}, 0, 0))
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -9,7 +9,14 @@ const themes = {
 };
 
 let currentData = null;
-let bidScheduleData = null;
+let bidScheduleData = null; // 入札予定（bids/active.json の bids、無ければ bid_schedule.json の全件）
+let bidArchiveMonths = []; // bids/active.json の archive_months（新しい順。アーカイブを開いたときに月ごとに読む）
+let bidActiveFrom = ''; // bids/active.json の active_from（これより前の入札日の予定はアーカイブにある）
+const bidArchiveLoaded = new Map(); // 月 -> 入札予定の配列（取得中は null）
+let seriesIndex = null; // data/series/index.json（系列ごとの最新レコード・期間）
+let latestSnapshot = null; // data/latest_snapshot.json（初回描画用の最新相場）
+let dashboardReady = false;
+const seriesRequests = new Map();
 
 let currentRange = '30';
 let currentSize = '2.5kg上';
@@ -18,31 +25,84 @@ let currentCompare = 'none';
 let activeTab = 'summary';
 let mainChart = null;
 
-const YAIZU_PORT = '焼津';
-const YAIZU_ALLOWED_MARKET_SIZES = new Set(['4.5kg上', '2.5kg上', '1.8kg上', '1.8kg下']);
-const YAIZU_EXCLUDED_VESSEL_KEYWORDS = ['日光丸', '亀洋丸'];
+// --- 港ごとのルール (data/market_rules.json) ---
+// ビルド時に適用済みのデータ（series/index.json の rules_fingerprint が一致）は再適用しない
+let marketRules = null; // 港 -> { allowedSizes, vesselMatcher, oneRecordPerDate }
+let rulesAppliedAtBuild = false;
+
+function compileMarketRules(config) {
+    const compiled = {};
+    Object.entries((config && config.ports) || {}).forEach(([port, rules]) => {
+        const keywords = (rules.excluded_vessel_keywords || []).slice().sort((a, b) => b.length - a.length);
+        compiled[port] = {
+            allowedSizes: rules.allowed_sizes ? new Set(rules.allowed_sizes) : null,
+            vesselMatcher: keywords.length
+                ? new RegExp(keywords.map(k => k.replace(/[.*+?^${}()|[\]\\]/g, '\\$&')).join('|'))
+                : null,
+            oneRecordPerDate: !!rules.one_record_per_date
+        };
+    });
+    return compiled;
+}
 
-function sanitizeMarketData(rawData) {
-    if (!rawData || !rawData[YAIZU_PORT]) return rawData;
+// キー順を揃えたJSON（scripts/market_rules.py の rules_fingerprint と同じ正規化）
+function canonicalJson(value) {
+    if (Array.isArray(value)) return `[${value.map(canonicalJson).join(',')}]`;
+    if (value && typeof value === 'object') {
+        return `{${Object.keys(value).sort().map(k => `${JSON.stringify(k)}:${canonicalJson(value[k])}`).join(',')}}`;
+    }
+    return JSON.stringify(value);
+}
 
-    const cleanedYaizu = {};
-    Object.entries(rawData[YAIZU_PORT]).forEach(([size, records]) => {
-        if (!YAIZU_ALLOWED_MARKET_SIZES.has(size)) return;
+// ルールの sha256（Web Crypto が使えない環境では null = 常にブラウザ側で適用）
+async function rulesFingerprint(config) {
+    if (!globalThis.crypto || !crypto.subtle || typeof TextEncoder === 'undefined') return null;
+    const digest = await crypto.subtle.digest('SHA-256', new TextEncoder().encode(canonicalJson(config)));
+    return Array.from(new Uint8Array(digest)).map(b => b.toString(16).padStart(2, '0')).join('');
+}
 
-        const filteredRecords = (records || []).filter(record => {
-            const vessel = record.vessel || '';
-            return !YAIZU_EXCLUDED_VESSEL_KEYWORDS.some(keyword => vessel.includes(keyword));
-        });
+async function setMarketRules(config, builtFingerprint) {
+    marketRules = config ? compileMarketRules(config) : null;
+    rulesAppliedAtBuild = false;
+    if (config && builtFingerprint) {
+        rulesAppliedAtBuild = (await rulesFingerprint(config).catch(() => null)) === builtFingerprint;
+    }
+}
 
-        if (filteredRecords.length > 0) {
-            cleanedYaizu[size] = collapseDuplicateDates(filteredRecords);
-        }
-    });
+function isSizeAllowed(port, size) {
+    const rules = marketRules && marketRules[port];
+    return !rules || !rules.allowedSizes || rules.allowedSizes.has(size);
+}
 
-    rawData[YAIZU_PORT] = cleanedYaizu;
+function sanitizeMarketData(rawData) {
+    if (!rawData || !marketRules || rulesAppliedAtBuild) return rawData;
+
+    Object.keys(marketRules).forEach(port => {
+        if (!rawData[port]) return;
+        const cleanedPort = {};
+        Object.entries(rawData[port]).forEach(([size, records]) => {
+            const cleaned = sanitizeSeries(port, size, records);
+            if (cleaned) cleanedPort[size] = cleaned;
+        });
+        rawData[port] = cleanedPort;
+    });
     return rawData;
 }
 
+// 1系列分のルール適用（対象外サイズ・空になった系列は null）
+function sanitizeSeries(port, size, records) {
+    const rules = marketRules && marketRules[port];
+    if (!rules || rulesAppliedAtBuild) return records;
+    if (!isSizeAllowed(port, size)) return null;
+
+    let filteredRecords = records || [];
+    if (rules.vesselMatcher) {
+        filteredRecords = filteredRecords.filter(record => !rules.vesselMatcher.test(record.vessel || ''));
+    }
+    if (rules.oneRecordPerDate) filteredRecords = collapseDuplicateDates(filteredRecords);
+    return filteredRecords.length > 0 ? filteredRecords : null;
+}
+
 function collapseDuplicateDates(records) {
     const byDate = new Map();
     records.forEach(record => {
@@ -54,57 +114,223 @@ function collapseDuplicateDates(records) {
     return Array.from(byDate.values()).sort((a, b) => String(a.date).localeCompare(String(b.date)));
 }
 
+// --- 系列の日付索引 ---
+// 日付順の系列を読み込み時に1回だけ日数(Int32Array)へ変換し、
+// 期間の切り出しは二分探索で行う（再描画のたびに Date を生成しない）
+const DAY_MS = 24 * 60 * 60 * 1000;
+const recordIndexCache = new WeakMap();
+
+// 'YYYY-MM-DD' → 1970-01-01 からの日数
+function dateStrToEpochDay(str) {
+    let y = +str.substring(0, 4);
+    const m = +str.substring(5, 7), d = +str.substring(8, 10);
+    if (m <= 2) y -= 1;
+    const era = Math.floor(y / 400);
+    const yoe = y - era * 400;
+    const doy = Math.floor((153 * (m > 2 ? m - 3 : m + 9) + 2) / 5) + d - 1;
+    const doe = yoe * 365 + Math.floor(yoe / 4) - Math.floor(yoe / 100) + doy;
+    return era * 146097 + doe - 719468;
+}
+
+// 1970-01-01 からの日数 → 'YYYY-MM-DD'
+function epochDayToDateStr(day) {
+    const z = day + 719468;
+    const era = Math.floor(z / 146097);
+    const doe = z - era * 146097;
+    const yoe = Math.floor((doe - Math.floor(doe / 1460) + Math.floor(doe / 36524) - Math.floor(doe / 146096)) / 365);
+    const doy = doe - (365 * yoe + Math.floor(yoe / 4) - Math.floor(yoe / 100));
+    const mp = Math.floor((5 * doy + 2) / 153);
+    const d = doy - Math.floor((153 * mp + 2) / 5) + 1;
+    const m = mp < 10 ? mp + 3 : mp - 9;
+    const y = yoe + era * 400 + (m <= 2 ? 1 : 0);
+    return `${y}-${String(m).padStart(2, '0')}-${String(d).padStart(2, '0')}`;
+}
+
+function getRecordIndex(records) {
+    let index = recordIndexCache.get(records);
+    if (!index) {
+        const days = new Int32Array(records.length);
+        for (let i = 0; i < records.length; i++) days[i] = dateStrToEpochDay(records[i].date);
+        index = { days };
+        recordIndexCache.set(records, index);
+    }
+    return index;
+}
+
+// days[i] >= value となる最初の位置
+function lowerBound(days, value) {
+    let lo = 0, hi = days.length;
+    while (lo < hi) {
+        const mid = (lo + hi) >>> 1;
+        if (days[mid] < value) lo = mid + 1; else hi = mid;
+    }
+    return lo;
+}
+
+// days[i] > value となる最初の位置
+function upperBound(days, value) {
+    let lo = 0, hi = days.length;
+    while (lo < hi) {
+        const mid = (lo + hi) >>> 1;
+        if (days[mid] <= value) lo = mid + 1; else hi = mid;
+    }
+    return lo;
+}
+
+// data/ 配下のJSONを取得（相対パスで失敗した場合はルートからのパスで再試行）
+// 毎回サーバーに ETag で確認し、変わっていなければ 304 でキャッシュを使う
+async function fetchDataJson(path) {
+    const encoded = path.split('/').map(encodeURIComponent).join('/');
+    let res = await fetch(`../data/${encoded}`, { cache: 'no-cache' }).catch(e => ({ ok: false }));
+    if (!res.ok) res = await fetch(`/data/${encoded}`, { cache: 'no-cache' }).catch(e => ({ ok: false }));
+    return res.ok ? res.json() : null;
+}
+
+function getSeriesMeta(port, size) {
+    if (!seriesIndex || !seriesIndex.ports || !seriesIndex.ports[port]) return null;
+    return seriesIndex.ports[port][size] || null;
+}
+
+// 系列を1本取得して currentData に格納する（取得済み・取得中なら再取得しない）
+function loadSeries(port, size) {
+    if (currentData && currentData[port] && currentData[port][size]) return Promise.resolve(currentData[port][size]);
+    const meta = getSeriesMeta(port, size);
+    if (!meta) return Promise.resolve(null);
+
+    const key = `${port}/${size}`;
+    if (!seriesRequests.has(key)) {
+        seriesRequests.set(key, fetchDataJson(`series/${meta.path}`).then(records => {
+            if (!records) {
+                seriesRequests.delete(key);
+                return null;
+            }
+            const cleaned = sanitizeSeries(port, size, records);
+            if (cleaned) {
+                if (!currentData[port]) currentData[port] = {};
+                currentData[port][size] = cleaned;
+                getRecordIndex(cleaned);
+            }
+            return cleaned;
+        }));
+    }
+    return seriesRequests.get(key);
+}
+
+function loadSeriesForSizes(sizes) {
+    return Promise.all(ports.flatMap(port => sizes.map(size => loadSeries(port, size))));
+}
+
+function getSnapshotEntry(port, size) {
+    if (!latestSnapshot || !latestSnapshot.ports || !latestSnapshot.ports[port]) return null;
+    return (latestSnapshot.ports[port].sizes || {})[size] || null;
+}
+
+// 港のサイズ一覧（未取得の系列も index.json・スナップショットから含める）
+function getPortSizes(port) {
+    const sizes = [];
+    const addSize = size => {
+        if (!isSizeAllowed(port, size)) return;
+        if (!sizes.includes(size)) sizes.push(size);
+    };
+    const indexSizes = seriesIndex && seriesIndex.ports ? seriesIndex.ports[port] : null;
+    Object.keys(indexSizes || {}).forEach(addSize);
+    const snapshotPort = latestSnapshot && latestSnapshot.ports ? latestSnapshot.ports[port] : null;
+    Object.keys((snapshotPort && snapshotPort.sizes) || {}).forEach(addSize);
+    Object.keys((currentData && currentData[port]) || {}).forEach(addSize);
+    return sizes;
+}
+
+// 系列の最新・直前レコード（未取得の系列は index.json → スナップショットの順で補う）
+function getSeriesTail(port, size) {
+    const arr = currentData && currentData[port] ? currentData[port][size] : null;
+    if (arr) {
+        return { latest: arr[arr.length - 1] || null, previous: arr.length > 1 ? arr[arr.length - 2] : null };
+    }
+    const meta = getSeriesMeta(port, size);
+    if (meta) return { latest: meta.latest, previous: meta.previous };
+
+    const snap = getSnapshotEntry(port, size);
+    if (!snap) return { latest: null, previous: null };
+    const latest = { date: snap.date, price: snap.price, volume: snap.volume };
+    if (snap.vessel) latest.vessel = snap.vessel;
+    const previous = snap.previous_price !== null && snap.previous_price !== undefined
+        ? { date: snap.previous_date, price: snap.previous_price }
+        : null;
+    return { latest, previous };
+}
+
+// 指定日の取引とその直前の取引（未取得の系列は最新・直前レコードで代用）
+function getEntryOnDate(port, size, dateStr) {
+    const arr = currentData && currentData[port] ? currentData[port][size] : null;
+    if (arr) {
+        const latest = arr.find(v => v.date === dateStr);
+        if (!latest) return null;
+        return { latest, previous: arr.length > 1 ? arr[arr.indexOf(latest) - 1] || null : null };
+    }
+    const tail = getSeriesTail(port, size);
+    return tail.latest && tail.latest.date === dateStr ? tail : null;
+}
+
 async function initDashboard() {
     console.log("Initializing Dashboard...");
     try {
         const startTime = Date.now();
 
-        // データの並列ロード
-        const [marketRes, bidRes] = await Promise.all([
-            fetch(`../data/katsuo_market_data.json?v=${Date.now()}`).catch(e => ({ ok: false })),
-            fetch(`../data/bid_schedule.json?v=${Date.now()}`).catch(e => ({ ok: false }))
+        // 最新相場スナップショット（数KB）だけで先にカードと一覧を描画する
+        const [snapshotJson, rulesJson] = await Promise.all([
+            fetchDataJson('latest_snapshot.json'),
+            fetchDataJson('market_rules.json')
         ]);
+        latestSnapshot = snapshotJson;
+        await setMarketRules(rulesJson, latestSnapshot && latestSnapshot.rules_fingerprint);
+        if (latestSnapshot) {
+            currentData = {};
+            ports.forEach(p => { currentData[p] = {}; });
+            setupDashboard(startTime);
+        }
 
-        let mRes = marketRes;
-        if (!mRes.ok) mRes = await fetch(`/data/katsuo_market_data.json?v=${Date.now()}`).catch(e => ({ ok: false }));
-        if (mRes.ok) currentData = sanitizeMarketData(await mRes.json());
+        // 履歴・入札予定は裏で読み込み、揃ったらグラフを含めて再描画する
+        const [indexJson, activeBidJson] = await Promise.all([
+            fetchDataJson('series/index.json'),
+            fetchDataJson('bids/active.json')
+        ]);
+        if (activeBidJson) {
+            bidScheduleData = activeBidJson.bids || [];
+            bidArchiveMonths = activeBidJson.archive_months || [];
+            bidActiveFrom = activeBidJson.active_from || '';
+            await loadUpcomingBidArchives();
+        } else {
+            // 月別分割ファイルが無い環境では従来どおり全件を読む
+            bidScheduleData = await fetchDataJson('bid_schedule.json');
+        }
 
-        let bRes = bidRes;
-        if (!bRes.ok) bRes = await fetch(`/data/bid_schedule.json?v=${Date.now()}`).catch(e => ({ ok: false }));
-        if (bRes.ok) bidScheduleData = await bRes.json();
+        if (indexJson) {
+            // 初期表示に必要な主要サイズだけ先に取得し、それ以外はサイズ切替時に読む
+            seriesIndex = indexJson;
+            await setMarketRules(rulesJson, indexJson.rules_fingerprint);
+            if (!currentData) {
+                currentData = {};
+                ports.forEach(p => { currentData[p] = {}; });
+            }
+            await loadSeriesForSizes(Array.from(new Set([...mainSizes, currentSize])));
+        } else {
+            // 分割ファイルが無い環境では従来どおり全件JSONを読む（ルールはブラウザ側で適用）
+            await setMarketRules(rulesJson, null);
+            const marketJson = await fetchDataJson('katsuo_market_data.json');
+            if (marketJson) {
+                currentData = sanitizeMarketData(marketJson);
+                Object.values(currentData).forEach(sizes => Object.values(sizes).forEach(getRecordIndex));
+            }
+        }
 
         if (!currentData) throw new Error("Market data could not be loaded.");
 
-        // データ最終更新日の特定とヘッダーへの表示
-        updateLastUpdateTime();
-
-        // テーマの読み込み
-        let savedTheme = 'dark';
-        try { savedTheme = localStorage.getItem('katsuo_theme') || 'dark'; } catch(e) {}
-        currentTheme = savedTheme;
-        document.body.className = `theme-${savedTheme}`;
-
-        // 各種セットアップ
-        setupFilters();
-        setupThemeSwitcher();
-        setupTabs();
-        setupModal();
-        setupSpeciesModal();
-        setupHolidayModal();
-        setupMemoModal();
-        setupSettings();
-        loadAllSettings();
-
-        // 初回レンダリング
-        renderDashboard();
-
-        // スプラッシュ解除
-        const elapsed = Date.now() - startTime;
-        const delay = Math.max(0, 800 - elapsed);
-        setTimeout(() => {
-            const splash = document.getElementById('splash-screen');
-            if (splash) splash.classList.add('fade-out');
-        }, delay);
+        if (dashboardReady) {
+            updateLastUpdateTime();
+            renderDashboard();
+        } else {
+            setupDashboard(startTime);
+        }
 
     } catch (error) {
         console.error('Fatal Error during Dashboard Init:', error);
@@ -115,15 +341,56 @@ async function initDashboard() {
     }
 }
 
+// 初回描画（UIのセットアップとスプラッシュ解除は1回だけ）
+function setupDashboard(startTime) {
+    dashboardReady = true;
+
+    // データ最終更新日の特定とヘッダーへの表示
+    updateLastUpdateTime();
+
+    // テーマの読み込み
+    let savedTheme = 'dark';
+    try { savedTheme = localStorage.getItem('katsuo_theme') || 'dark'; } catch(e) {}
+    currentTheme = savedTheme;
+    document.body.className = `theme-${savedTheme}`;
+
+    // 各種セットアップ
+    setupFilters();
+    setupThemeSwitcher();
+    setupTabs();
+    setupModal();
+    setupBidArchive();
+    setupSpeciesModal();
+    setupHolidayModal();
+    setupMemoModal();
+    setupSettings();
+    loadAllSettings();
+
+    // 初回レンダリング
+    renderDashboard();
+
+    // スプラッシュ解除
+    const elapsed = Date.now() - startTime;
+    const delay = Math.max(0, 800 - elapsed);
+    setTimeout(() => {
+        const splash = document.getElementById('splash-screen');
+        if (splash) splash.classList.add('fade-out');
+    }, delay);
+}
+
 function updateLastUpdateTime() {
-    let latestDates = [];
-    ports.forEach(p => {
-        Object.keys(currentData[p] || {}).forEach(s => {
-            const arr = currentData[p][s];
-            if (arr && arr.length > 0) latestDates.push(arr[arr.length - 1].date);
+    // スナップショットの last_update を使う（スナップショットが無い環境では全系列の最新日付から求める）
+    let maxDate = latestSnapshot && latestSnapshot.last_update;
+    if (!maxDate) {
+        const latestDates = [];
+        ports.forEach(p => {
+            getPortSizes(p).forEach(s => {
+                const { latest } = getSeriesTail(p, s);
+                if (latest) latestDates.push(latest.date);
+            });
         });
-    });
-    const maxDate = latestDates.sort().reverse()[0] || "不明";
+        maxDate = latestDates.sort().reverse()[0] || "不明";
+    }
     const el = document.getElementById('last-update-time');
     if (el) el.textContent = maxDate;
 }
@@ -152,11 +419,9 @@ function renderSummary() {
 
             // 港の最新取引日を取得
             let latestDateStr = "";
-            Object.keys(portData).forEach(size => {
-                if (portData[size] && portData[size].length > 0) {
-                    const date = portData[size][portData[size].length - 1].date;
-                    if (!latestDateStr || date > latestDateStr) latestDateStr = date;
-                }
+            getPortSizes(port).forEach(size => {
+                const { latest } = getSeriesTail(port, size);
+                if (latest && (!latestDateStr || latest.date > latestDateStr)) latestDateStr = latest.date;
             });
 
             if (!latestDateStr) return;
@@ -169,9 +434,9 @@ function renderSummary() {
             
             // 主要サイズをループして行を生成
             mainSizes.forEach(size => {
-                const dataArr = portData[size] || [];
-                const latestEntry = dataArr.find(v => v.date === latestDateStr);
-                const prevEntry = dataArr.length > 1 ? (latestEntry ? dataArr[dataArr.indexOf(latestEntry) - 1] : dataArr[dataArr.length - 1]) : null;
+                const entry = getEntryOnDate(port, size, latestDateStr);
+                const latestEntry = entry ? entry.latest : null;
+                const prevEntry = entry ? entry.previous : null;
 
                 let priceHtml = '-', volHtml = '-', diffHtml = '', trendHtml = '', trendClass = 'trend-equal';
                 if (latestEntry) {
@@ -423,40 +688,25 @@ function getComparisonLabel(compareValue) {
 
 // 過去データを抽出（日付をオフセットして現在のグラフX軸に合わせる）
 function getHistoricalData(portData, dayOffset, currentRange) {
-    if (!portData || dayOffset <= 0) return [];
+    if (!portData || portData.length === 0 || dayOffset <= 0) return [];
 
-    // 現在の時間範囲の最新日を取得
-    let latestDate = null;
-    portData.forEach(d => {
-        const date = new Date(d.date);
-        if (!latestDate || date > latestDate) latestDate = date;
-    });
-    
-    if (!latestDate) return [];
-
-    // 過去のデータ期間を計算
-    const targetEndDate = new Date(latestDate.getTime() - dayOffset * 24 * 60 * 60 * 1000);
-    const rangeMs = currentRange === 'all' ? Infinity : parseInt(currentRange) * 24 * 60 * 60 * 1000;
-    const targetStartDate = new Date(targetEndDate.getTime() - rangeMs);
-
-    // 過去のデータを抽出
-    const historicalData = portData.filter(d => {
-        const date = new Date(d.date);
-        return date >= targetStartDate && date <= targetEndDate;
-    });
+    // 系列は日付順なので、最新日は末尾。過去の期間は二分探索で切り出す
+    const { days } = getRecordIndex(portData);
+    const targetEndDay = days[days.length - 1] - dayOffset;
+    const start = currentRange === 'all' ? 0 : lowerBound(days, targetEndDay - parseInt(currentRange));
+    const end = upperBound(days, targetEndDay);
 
     // 日付を現在のグラフに合わせてオフセット
-    const offsetData = historicalData.map(d => {
-        const pastDate = new Date(d.date);
-        const currentDate = new Date(pastDate.getTime() + dayOffset * 24 * 60 * 60 * 1000);
-        return {
-            date: currentDate.toISOString().split('T')[0],
+    const offsetData = [];
+    for (let i = start; i < end; i++) {
+        const d = portData[i];
+        offsetData.push({
+            date: epochDayToDateStr(days[i] + dayOffset),
             price: d.price,
             volume: d.volume,
             prevPrice: d.prevPrice
-        };
-    });
-
+        });
+    }
     return offsetData;
 }
 
@@ -474,12 +724,10 @@ function renderAllSizesTable() {
         const portData = currentData[port];
         if (!portData) return;
 
-        Object.keys(portData).forEach(size => {
-            const arr = portData[size];
-            if (!arr || arr.length === 0) return;
+        getPortSizes(port).forEach(size => {
+            const { latest, previous: prev } = getSeriesTail(port, size);
+            if (!latest) return;
 
-            const latest = arr[arr.length - 1];
-            const prev = arr.length > 1 ? arr[arr.length - 2] : null;
             let diffVal = '-';
             let diffClass = '';
 
@@ -535,12 +783,10 @@ function renderAllSizesTable() {
 
 function filterDataByRange(data, range) {
     if (!data || range === 'all') return data;
-    const now = typeof moment !== 'undefined' ? moment() : new Date();
-    return data.filter(d => {
-        const date = new Date(d.date);
-        const diffDays = (now - date) / (1000 * 60 * 60 * 24);
-        return diffDays <= parseInt(range);
-    });
+    const nowMs = typeof moment !== 'undefined' ? moment().valueOf() : Date.now();
+    // 「今日から range 日以内」= 日数が startDay 以上の末尾区間
+    const startDay = Math.ceil((nowMs - parseInt(range) * DAY_MS) / DAY_MS);
+    return data.slice(lowerBound(getRecordIndex(data).days, startDay));
 }
 
 function showDetail(port, portData, latestDateStr) {
@@ -548,10 +794,20 @@ function showDetail(port, portData, latestDateStr) {
     if (!modal || !modalBody || !portData) return;
 
     let rowsHtml = '';
-    Object.keys(portData).forEach(size => {
-        const arr = portData[size], latest = arr.find(v => v.date === latestDateStr);
-        if (!latest) return;
-        const prev = arr.length > 1 ? (arr[arr.indexOf(latest) - 1] || arr[arr.length - 2]) : null;
+    getPortSizes(port).forEach(size => {
+        const arr = portData[size];
+        let latest, prev;
+        if (arr) {
+            latest = arr.find(v => v.date === latestDateStr);
+            if (!latest) return;
+            prev = arr.length > 1 ? (arr[arr.indexOf(latest) - 1] || arr[arr.length - 2]) : null;
+        } else {
+            // 未取得の系列は index.json の最新・直前レコードで表示する
+            const tail = getSeriesTail(port, size);
+            if (!tail.latest || tail.latest.date !== latestDateStr) return;
+            latest = tail.latest;
+            prev = tail.previous;
+        }
         let diffHtml = '';
         if (prev) {
             const diff = latest.price - prev.price;
@@ -571,21 +827,74 @@ function showDetail(port, portData, latestDateStr) {
     modal.classList.add('active');
 }
 
-function renderBidSchedule() {
-    const latestC = document.getElementById('latest-bid-container'), archiveC = document.getElementById('archive-bid-container');
-    if (!latestC || !bidScheduleData) return;
-    latestC.innerHTML = ''; archiveC.innerHTML = '';
+// 次に読むアーカイブの月（全て読み込み済み・取得中なら null）
+function nextBidArchiveMonth() {
+    return bidArchiveMonths.find(entry => !bidArchiveLoaded.has(entry.month)) || null;
+}
 
+async function loadNextBidArchiveMonth() {
+    const entry = nextBidArchiveMonth();
+    if (!entry) return false;
+    bidArchiveLoaded.set(entry.month, null);
+    renderBidSchedule();
+    const bids = await fetchDataJson(`bids/${entry.path}`);
+    if (bids) {
+        bidArchiveLoaded.set(entry.month, bids);
+    } else {
+        bidArchiveLoaded.delete(entry.month);
+    }
+    renderBidSchedule();
+    return !!bids;
+}
+
+// active.json の範囲（active_from 以降）が今日より後なら、今日以降の予定がアーカイブにあり得るので、その月を先に読む
+async function loadUpcomingBidArchives() {
+    const todayStr = localDateString();
+    if (!bidActiveFrom || todayStr >= bidActiveFrom) return;
+    let entry;
+    while ((entry = nextBidArchiveMonth()) && entry.month >= todayStr.slice(0, 7)) {
+        if (!(await loadNextBidArchiveMonth())) break;
+    }
+}
+
+// 端末のタイムゾーンでの今日 (YYYY-MM-DD)
+function localDateString() {
     const now = new Date();
     const year = now.getFullYear();
     const month = String(now.getMonth() + 1).padStart(2, '0');
     const day = String(now.getDate()).padStart(2, '0');
-    const todayStr = `${year}-${month}-${day}`;
+    return `${year}-${month}-${day}`;
+}
+
+function setupBidArchive() {
+    const details = document.querySelector('.archive-section details');
+    if (!details) return;
+    // 初めて開いたときに最新の月を読む
+    details.addEventListener('toggle', () => {
+        if (details.open && bidArchiveLoaded.size === 0) loadNextBidArchiveMonth();
+    });
+    const archiveC = document.getElementById('archive-bid-container');
+    if (archiveC) {
+        archiveC.addEventListener('click', (e) => {
+            if (e.target.closest('.archive-load-more')) loadNextBidArchiveMonth();
+        });
+    }
+}
+
+function renderBidSchedule() {
+    const latestC = document.getElementById('latest-bid-container'), archiveC = document.getElementById('archive-bid-container');
+    if (!latestC || !bidScheduleData) return;
+    latestC.innerHTML = ''; archiveC.innerHTML = '';
+
+    const allBids = bidScheduleData.slice();
+    bidArchiveLoaded.forEach(bids => { if (bids) allBids.push(...bids); });
+
+    const todayStr = localDateString();
 
     const upcomingBids = [];
     const pastBids = [];
 
-    bidScheduleData.forEach(bid => {
+    allBids.forEach(bid => {
         if (bid.bid_date >= todayStr) {
             upcomingBids.push(bid);
         } else {
@@ -632,8 +941,19 @@ function renderBidSchedule() {
     activeBids.forEach(bid => latestC.appendChild(createBidCard(bid, false)));
     archivedBids.forEach(bid => archiveC.appendChild(createBidCard(bid, true)));
 
+    // まだ読んでいない月があれば「さらに前の月」ボタンを出す
+    const nextMonth = nextBidArchiveMonth();
+    const loading = Array.from(bidArchiveLoaded.values()).includes(null);
+    if (nextMonth || loading) {
+        const more = document.createElement('button');
+        more.className = 'archive-load-more';
+        more.disabled = loading;
+        more.textContent = loading ? '読み込み中...' : `${nextMonth.month} の入札予定を読み込む（${nextMonth.count}件）`;
+        archiveC.appendChild(more);
+    }
+
     const arcSec = document.querySelector('.archive-section');
-    if (arcSec) arcSec.style.display = archivedBids.length > 0 ? 'block' : 'none';
+    if (arcSec) arcSec.style.display = (archivedBids.length > 0 || nextMonth || loading) ? 'block' : 'none';
 }
 
 function setupFilters() {
@@ -648,8 +968,9 @@ function setupFilters() {
     // サイズフィルター
     const sizeSelector = document.getElementById('chart-size-selector');
     if (sizeSelector) {
-        sizeSelector.addEventListener('change', (e) => {
+        sizeSelector.addEventListener('change', async (e) => {
             currentSize = e.target.value;
+            await loadSeriesForSizes([currentSize]);
             renderMainChart();
         });
     }